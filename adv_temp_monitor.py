@@ -4,34 +4,66 @@ Advanced Temperature Monitor with Robust Serial Communication
 """
 
 import argparse
-import concurrent.futures
 import json
 import logging
 import os
 import re
-import serial
 import signal
+import statistics
 import subprocess
 import sys
 import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+from port_watcher import PortWatcher
+from results_writer import ResultsWriter
+from serial_session import SessionPool
+from temp_metrics import MetricsServer, MonitorMetrics, write_textfile
+from temp_store import STATUS_OK, STATUS_OVERHEAT, STATUS_PREDICTED, TempStore
+from temp_poller import TemperaturePoller
 
 # Default configuration
 DEFAULT_CONFIG = {
     "devices": ["txpaa1", "txpaa2", "txpaa3"],
     "max_temp": 180.0,
     "check_interval": 300,
+    "adaptive_interval": True,  # Poll each device more often as it nears max_temp
+    "min_interval": 10,         # Shortest per-device interval (s)
+    "max_interval": 900,        # Longest per-device interval, for devices far below max_temp (s)
+    "near_margin": 30.0,        # Within this many °C of max_temp the interval shrinks towards min_interval
+    "far_margin": 100.0,        # More than this many °C below max_temp the interval grows to max_interval
+    "trend_safety": 3,          # Poll at least this many times before a rising device could reach max_temp
+    "interval_window": 5,       # Recent readings whose maximum sets the interval band
+    "interval_growth": 2.0,     # Largest factor the interval may grow by from one poll to the next
+    "predictive_trip": True,    # Power off when a device is projected to pass max_temp within trip_horizon
+    "trip_horizon": 120,        # Projection horizon (s)
+    "slope_alpha": 0.5,         # EWMA weight of the newest rate-of-rise sample (0-1]
+    "min_trend_readings": 3,    # Readings needed before the rate of rise is trusted
+    "predictive_confirmations": 2,  # Consecutive projections over max_temp needed to trip
     "hysteresis_threshold": 2,
     "retry_count": 3,
     "retry_delay": 0.5,
+    "burst_size": 1,            # Readings per device per poll; >1 enables burst oversampling
+    "burst_filter": "median",   # "median" or "trimmed_mean" of a burst
+    "burst_trim": 0.2,          # Fraction cut from each end for trimmed_mean
+    "burst_outlier_limit": 10.0,  # Burst readings further than this (°C) from the median are dropped
+    "device_timeouts": {},  # Per-device reply timeout overrides, e.g. {"txpaa3": 3.0}
     "log_file": "/var/log/temperature_monitor.log",
     "temp_file": "/var/log/temperature_results.txt",
+    "results_buffer_size": 4096,    # Bytes of temp_file lines buffered before a write
+    "results_flush_interval": 60,   # Seconds a temp_file line may stay buffered
+    "results_fsync": "urgent",      # "never", "urgent" (over-threshold readings) or "always"
+    "temp_store": None,         # Directory of a binary temp_store to also record readings in
+    "metrics_port": None,       # Serve Prometheus metrics on this port (e.g. 9105)
+    "metrics_address": "",      # Address the metrics endpoint binds to ("" = all)
+    "metrics_textfile": None,   # Also write them here for node_exporter's textfile collector
     "power_off_command": ["/usr/sbin/powercycle", "chroma", "--power-off"],
     "serial_settings": {
         "baudrate": 115200,
-        "timeout": 1.0,
-        "wakeup_delay": 2.0  # Increased based on communication snippet
+        "timeout": 1.0,  # Default reply timeout per device
+        "wakeup_delay": 2.0  # Boot time after a DTR reset (only paid when opening resets the board)
     }
 }
 
@@ -39,8 +71,21 @@ DEFAULT_CONFIG = {
 config = None
 over_temp_counts = {}
 last_shutdown_attempt = None
+poller = None  # Concurrent poller owning one kept-open serial session per device
+results_writer = None  # Buffered appender for temp_file
+temp_store = None  # Optional binary store of every reading
+metrics = None  # Prometheus metrics, updated every cycle
+metrics_server = None  # Optional HTTP endpoint serving them
+last_readings = {}  # device -> (monotonic time, °C) of the last good reading
+temp_slopes = {}    # device -> EWMA of the rate of change, °C per second
+trend_counts = {}   # device -> readings that went into its slope estimate
+predicted_counts = {}  # device -> consecutive readings projected over max_temp
+recent_temps = {}   # device -> deque of the last interval_window good readings (°C)
+last_intervals = {}  # device -> interval chosen after its previous poll (s)
 logger = logging.getLogger()
 
+TEMPERATURE_PATTERN = re.compile(r'(\d{1,3}\.?\d*)')
+
 def load_config(config_path: str) -> dict:
     """Load configuration from JSON file with fallback to defaults"""
     conf = DEFAULT_CONFIG.copy()
@@ -69,111 +114,270 @@ def setup_logging(log_file: str) -> None:
     console_handler.setLevel(logging.CRITICAL)
     logger.addHandler(console_handler)
 
+def init_monitor(conf: dict) -> None:
+    """Set up the poller, result files and per-device state for a configuration"""
+    global config, poller, results_writer, temp_store, over_temp_counts, metrics, metrics_server
+    config = conf
+    poller = TemperaturePoller(
+        SessionPool(PortWatcher(), boot_delay=config["serial_settings"]["wakeup_delay"]),
+        command=b'R\n',
+        baudrate=config["serial_settings"]["baudrate"],
+        timeout=config["serial_settings"]["timeout"],
+        retry_count=config["retry_count"],
+        retry_delay=config["retry_delay"],
+        device_timeouts=config["device_timeouts"],
+        accept=TEMPERATURE_PATTERN.search,
+        burst=config["burst_size"]
+    )
+    results_writer = ResultsWriter(
+        config["temp_file"],
+        buffer_size=config["results_buffer_size"],
+        flush_interval=config["results_flush_interval"],
+        fsync=config["results_fsync"]
+    )
+    temp_store = TempStore(config["temp_store"]) if config["temp_store"] else None
+    metrics = MonitorMetrics()
+    metrics_server = None
+    if config["metrics_port"] is not None:
+        try:
+            metrics_server = MetricsServer(metrics.registry, config["metrics_port"], config["metrics_address"])
+        except OSError as e:
+            # Metrics are optional; never let them keep the monitor from running
+            logger.error(f"Cannot serve metrics on port {config['metrics_port']}: {e}; continuing without them")
+    over_temp_counts = {device: 0 for device in config["devices"]}
+    for state in (last_readings, temp_slopes, trend_counts, predicted_counts, recent_temps, last_intervals):
+        state.clear()
+
+def close_monitor() -> None:
+    """Flush the result files and close the serial sessions"""
+    global metrics_server
+    results_writer.close()
+    if temp_store:
+        temp_store.close()
+    if metrics_server:
+        metrics_server.close()
+        metrics_server = None
+    poller.close()
+
 def shutdown_handler(signum: int, frame) -> None:
     """Handle graceful shutdown signals"""
     logger.info("Shutdown signal received. Exiting cleanly.")
     sys.exit(0)
 
-def get_temperature(device: str) -> Optional[float]:
+def parse_temperature(device: str, response: Optional[str]) -> Optional[float]:
+    """Extract the temperature from a device reply (None if there is none)"""
+    if response is None:
+        logger.error(f"All temperature read attempts failed for {device}")
+        return None
+    logger.debug(f"Raw response from {device}: '{response}'")
+    
+    # Improved temperature parsing
+    match = TEMPERATURE_PATTERN.search(response)
+    if match:
+        temp = float(match.group(1))
+        logger.debug(f"Parsed temperature from {device}: {temp}°C")
+        return temp
+    
+    logger.warning(f"No temperature value found in response from {device}: '{response}'")
+    return None
+
+def aggregate_burst(device: str, responses: List[str]) -> Tuple[Optional[float], bool]:
     """
-    Robust temperature reading with buffer management
-    Incorporates improvements from the communication snippet
+    Combine a burst of readings into one temperature.
+    
+    Readings further than burst_outlier_limit from the burst median (e.g. digits
+    picked out of a partial line) are dropped, and the rest are reduced with
+    burst_filter. Returns the temperature and whether an overheat is confirmed:
+    a majority of the whole burst agreeing it is over max_temp.
     """
-    serial_settings = config["serial_settings"]
-    device_path = f"/dev/{device}"
+    values = [v for v in (parse_temperature(device, r) for r in responses) if v is not None]
+    if not values:
+        return None, False
     
-    for attempt in range(config["retry_count"]):
-        try:
-            with serial.Serial(
-                port=device_path,
-                baudrate=serial_settings["baudrate"],
-                timeout=serial_settings["timeout"]
-            ) as conn:
-                # Apply wakeup delay
-                time.sleep(serial_settings["wakeup_delay"])
-                
-                # Reset buffers as in the snippet
-                conn.reset_input_buffer()
-                conn.reset_output_buffer()
-                
-                # Send command
-                conn.write(b'R\n')
-                
-                # Read response
-                response = conn.readline().decode().strip()
-                logger.debug(f"Raw response from {device}: '{response}'")
-                
-                # Improved temperature parsing
-                match = re.search(r'(\d{1,3}\.?\d*)', response)
-                if match:
-                    temp = float(match.group(1))
-                    logger.debug(f"Parsed temperature from {device}: {temp}°C")
-                    return temp
-                
-                logger.warning(f"No temperature value found in response from {device}: '{response}'")
-
-        except (serial.SerialException, UnicodeDecodeError, OSError) as e:
-            logger.warning(f"Attempt {attempt+1} failed on {device}: {str(e)}")
-        
-        # Wait before next retry
-        if attempt < config["retry_count"] - 1:
-            time.sleep(config["retry_delay"])
+    median = statistics.median(values)
+    kept = sorted(v for v in values if abs(v - median) <= config["burst_outlier_limit"])
+    if len(kept) < len(values):
+        logger.warning(f"[{device}] Dropped outlier readings: {sorted(set(values) - set(kept))}")
     
-    logger.error(f"All temperature read attempts failed for {device}")
-    return None
+    if config["burst_filter"] == "trimmed_mean":
+        cut = int(len(kept) * config["burst_trim"])
+        trimmed = kept[cut:len(kept) - cut] or kept
+        temp = round(statistics.fmean(trimmed), 1)
+    else:
+        temp = statistics.median(kept)
+    
+    over = sum(1 for v in kept if v > config["max_temp"])
+    confirmed = config["burst_size"] > 1 and over >= config["burst_size"] // 2 + 1
+    return temp, confirmed
+
+def update_trend(device: str, temp: float) -> None:
+    """Track each device's rate of change as an exponentially weighted moving average"""
+    now = time.monotonic()
+    previous = last_readings.get(device)
+    if previous and now > previous[0]:
+        sample = (temp - previous[1]) / (now - previous[0])
+        alpha = config["slope_alpha"]
+        temp_slopes[device] = alpha * sample + (1 - alpha) * temp_slopes.get(device, sample)
+    last_readings[device] = (now, temp)
+    trend_counts[device] = trend_counts.get(device, 0) + 1
+    recent_temps.setdefault(device, deque(maxlen=config["interval_window"])).append(temp)
+
+def projected_temperature(device: str) -> Optional[float]:
+    """Temperature expected trip_horizon seconds from now, or None without a trusted trend"""
+    if trend_counts.get(device, 0) < config["min_trend_readings"]:
+        return None
+    temp = last_readings[device][1]
+    return temp + temp_slopes.get(device, 0.0) * config["trip_horizon"]
+
+def check_rate_of_rise(device: str, temp: float) -> bool:
+    """True when a device below max_temp is projected to pass it within trip_horizon"""
+    projected = projected_temperature(device)
+    if not config["predictive_trip"] or projected is None or projected <= config["max_temp"]:
+        predicted_counts[device] = 0
+        return False
+    
+    predicted_counts[device] = predicted_counts.get(device, 0) + 1
+    logger.warning(
+        f"[{device}] RAPID RISE: {temp}°C rising {temp_slopes[device] * 60:.1f}°C/min, "
+        f"projected {projected:.1f}°C in {config['trip_horizon']}s "
+        f"(Count: {predicted_counts[device]}/{config['predictive_confirmations']})"
+    )
+    return predicted_counts[device] >= config["predictive_confirmations"]
+
+def poll_interval(device: str) -> float:
+    """
+    Seconds until a device should be polled again.
+    
+    The band is chosen from the hottest of the last interval_window readings,
+    so one low reading (e.g. digits picked out of a partial line) cannot
+    stretch the interval. check_interval applies in the normal band. Closer
+    than near_margin to max_temp the interval shrinks linearly to min_interval
+    (min_interval once over it) and never exceeds check_interval, and further
+    than far_margin below it grows to max_interval, by at most interval_growth
+    per poll. A rising device is also polled at least trend_safety times
+    before it could reach max_temp at its current rate.
+    """
+    if not config["adaptive_interval"] or device not in last_readings:
+        return config["check_interval"]
+    
+    temp = max(recent_temps.get(device) or [last_readings[device][1]])
+    margin = config["max_temp"] - temp
+    low, normal, high = config["min_interval"], config["check_interval"], config["max_interval"]
+    
+    if margin <= 0:
+        interval = low
+    elif margin < config["near_margin"]:
+        interval = low + (normal - low) * margin / config["near_margin"]
+    elif margin > config["far_margin"]:
+        interval = high
+    else:
+        interval = normal
+    
+    slope = temp_slopes.get(device, 0.0)
+    if slope > 0 and margin > 0:
+        interval = min(interval, margin / slope / config["trend_safety"])
+    
+    previous = last_intervals.get(device, normal)
+    interval = min(interval, previous * config["interval_growth"])
+    if margin < config["near_margin"]:
+        interval = min(interval, normal)
+    
+    interval = min(max(interval, low), high)
+    last_intervals[device] = interval
+    return interval
 
-def check_temperatures() -> bool:
-    """Check all devices concurrently and process results"""
-    global over_temp_counts, last_shutdown_attempt
+def process_results(
+    results: List[Tuple[str, Optional[float]]],
+    timestamp: str,
+    confirmed: Optional[Set[str]] = None
+) -> bool:
+    """
+    Log readings and apply the over-temperature hysteresis; True means shut down.
+    
+    Devices in `confirmed` had an overheat confirmed by a whole burst and trip
+    without waiting for hysteresis_threshold polls.
+    """
+    global over_temp_counts
+    confirmed = confirmed or set()
     
     emergency = False
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    results = []
 
-    # Concurrent temperature reading
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        device_temps = {
-            executor.submit(get_temperature, device): device
-            for device in config["devices"]
-        }
+    for device, temp in results:
+        # Handle failed reads
+        if temp is None:
+            logger.warning(f"[{device}] Read failure")
+            results_writer.write(f"{timestamp} - [{device}] READ_ERROR")
+            if temp_store:
+                temp_store.append(device, None)
+            continue
+        
+        update_trend(device, temp)
+        
+        # Log temperature; over-threshold readings reach the disk at once
+        log_entry = f"[{device}] {temp}°C"
+        logger.info(log_entry)
+        results_writer.write(f"{timestamp} - {log_entry}", urgent=temp > config["max_temp"])
         
-        for future in concurrent.futures.as_completed(device_temps):
-            device = device_temps[future]
-            try:
-                temp = future.result()
-                results.append((device, temp))
-            except Exception as e:
-                logger.exception(f"Unexpected error with {device}: {e}")
-                results.append((device, None))
-
-    # Process results
-    with open(config["temp_file"], "a") as temp_log:
-        for device, temp in results:
-            # Handle failed reads
-            if temp is None:
-                logger.warning(f"[{device}] Read failure")
-                temp_log.write(f"{timestamp} - [{device}] READ_ERROR\n")
-                continue
+        status = STATUS_OK
+        
+        # Check temperature threshold
+        if temp > config["max_temp"]:
+            status = STATUS_OVERHEAT
+            over_temp_counts[device] = over_temp_counts.get(device, 0) + 1
+            logger.warning(
+                f"[{device}] OVERHEAT: {temp}°C "
+                f"(Count: {over_temp_counts[device]}/{config['hysteresis_threshold']})"
+            )
             
-            # Log temperature
-            log_entry = f"[{device}] {temp}°C"
-            logger.info(log_entry)
-            temp_log.write(f"{timestamp} - {log_entry}\n")
+            if over_temp_counts[device] >= config["hysteresis_threshold"]:
+                emergency = True
+            elif device in confirmed:
+                logger.critical(f"[{device}] Overheat confirmed by burst of {config['burst_size']} readings")
+                emergency = True
+        else:
+            # Reset counter if below threshold
+            over_temp_counts[device] = 0
             
-            # Check temperature threshold
-            if temp > config["max_temp"]:
-                over_temp_counts[device] = over_temp_counts.get(device, 0) + 1
-                logger.warning(
-                    f"[{device}] OVERHEAT: {temp}°C "
-                    f"(Count: {over_temp_counts[device]}/{config['hysteresis_threshold']})"
-                )
-                
-                if over_temp_counts[device] >= config["hysteresis_threshold"]:
-                    emergency = True
-            else:
-                # Reset counter if below threshold
-                over_temp_counts[device] = 0
+            # Trip early on a thermal runaway that would pass the threshold soon
+            if check_rate_of_rise(device, temp):
+                logger.critical(f"[{device}] Projected to exceed {config['max_temp']}°C; tripping early")
+                status = STATUS_PREDICTED
+                emergency = True
+        
+        if temp_store:
+            temp_store.append(device, temp, status)
+
+    if emergency:
+        # Keep the readings that led to the power-off
+        results_writer.flush(sync=config["results_fsync"] != "never")
+    return emergency
 
+def check_temperatures(devices: Optional[List[str]] = None) -> bool:
+    """Query devices (default: all) concurrently and process results"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cycle_start = time.monotonic()
+    
+    # One event loop queries every device at once over its kept-open session
+    results = []
+    confirmed = set()
+    for result in poller.poll(devices or config["devices"]):
+        metrics.record_read(result.device, result.latency, result.attempts, result.response is None)
+        if config["burst_size"] > 1 and result.response is not None:
+            temp, overheat = aggregate_burst(result.device, result.samples)
+            if overheat:
+                confirmed.add(result.device)
+        else:
+            temp = parse_temperature(result.device, result.response)
+        results.append((result.device, temp))
+    logger.debug(f"Polled {len(results)} devices in {time.monotonic() - cycle_start:.3f}s")
+    
+    emergency = process_results(results, timestamp, confirmed)
+    metrics.record_cycle(time.monotonic() - cycle_start, results, over_temp_counts, emergency)
+    if config["metrics_textfile"]:
+        try:
+            write_textfile(metrics.registry, config["metrics_textfile"])
+        except OSError as e:
+            logger.error(f"Cannot write metrics to {config['metrics_textfile']}: {e}")
     return emergency
 
 def power_off_system() -> None:
@@ -207,19 +411,32 @@ def main_loop() -> None:
     logger.info("Temperature monitor started")
     logger.info(f"Monitoring devices: {', '.join(config['devices'])}")
     logger.info(f"Threshold: {config['max_temp']}°C | Check interval: {config['check_interval']}s")
+    if config["adaptive_interval"]:
+        logger.info(f"Adaptive interval: {config['min_interval']}-{config['max_interval']}s")
+    
+    # Each device has its own schedule; devices that fall due together are polled together
+    next_due = {device: time.monotonic() for device in config["devices"]}
     
     while True:
         start_time = time.monotonic()
+        due = [device for device, deadline in next_due.items() if deadline <= start_time]
+        if not due:
+            time.sleep(max(0, min(next_due.values()) - start_time))
+            continue
         
         try:
-            if check_temperatures():
+            if check_temperatures(due):
                 power_off_system()
         except Exception as e:
             logger.exception(f"Critical monitoring error: {e}")
         
-        # Precise sleep accounting for processing time
-        elapsed = time.monotonic() - start_time
-        sleep_time = max(0, config["check_interval"] - elapsed)
+        # Schedule from the start of the poll so processing time does not accumulate
+        for device in due:
+            interval = poll_interval(device)
+            next_due[device] = start_time + interval
+            logger.debug(f"[{device}] Next check in {interval:.0f}s")
+        
+        sleep_time = max(0, min(next_due.values()) - time.monotonic())
         time.sleep(sleep_time)
 
 if __name__ == "__main__":
@@ -237,7 +454,7 @@ if __name__ == "__main__":
 
     # Initialize systems
     setup_logging(config["log_file"])
-    over_temp_counts = {device: 0 for device in config["devices"]}
+    init_monitor(config)
     
     # Register signal handlers
     for sig in (signal.SIGINT, signal.SIGTERM):
@@ -251,3 +468,5 @@ if __name__ == "__main__":
     except Exception as e:
         logger.critical(f"Fatal startup error: {str(e)}")
         sys.exit(1)
+    finally:
+        close_monitor()
@@ -1,12 +1,13 @@
 #!/usr/bin/python3
 
 import serial
-import time
 import logging
 import argparse
 import os
 import json
 
+from serial_session import SerialSession, device_path
+
 def setup_logging():
     """
     Set up logging to 'serial_log.txt' with timestamped entries.
@@ -18,26 +19,22 @@ def setup_logging():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-def send_command(ser, command):
+def send_command(session, command):
     """
-    Send a command via serial port and return the device's response.
+    Send a command via a serial session and return the device's response.
+
+    The reply is complete as soon as the device stops sending, rather than
+    after a fixed one-second wait.
 
     Args:
-        ser (serial.Serial): An open serial port.
+        session (SerialSession): Session for the device.
         command (str): The command string to send.
 
     Returns:
         str: Response from the device (whitespace-trimmed).
     """
     try:
-        ser.write(command.encode())
-        time.sleep(1)  # Allow device time to respond
-
-        response = ""
-        while ser.in_waiting:
-            response += ser.read(ser.in_waiting).decode()
-
-        return response.strip()
+        return session.query(command.encode())
 
     except serial.SerialException as e:
         logging.error(f"Serial communication error: {e}")
@@ -78,26 +75,26 @@ def main(device_name):
     """
     setup_logging()
 
-    device_path = f"/dev/{device_name}"
+    path = device_path(device_name)
     command = "R"
 
-    if not os.path.exists(device_path):
-        error_msg = f"Device {device_path} does not exist"
+    if not os.path.exists(path):
+        error_msg = f"Device {path} does not exist"
         print(create_json_output(device_name, status="error", error=error_msg))
         logging.error(error_msg)
         return
 
+    # Opening the session does not reset the board (HUPCL is cleared), so the
+    # 2-second wake-up wait is only paid right after the board is plugged in
+    session = SerialSession(device_name, 115200, timeout=1)
     try:
-        with serial.Serial(device_path, 115200, timeout=1) as ser:
-            time.sleep(2)
-
-            result = send_command(ser, command)
+        result = send_command(session, command)
 
-            print(create_json_output(device_name, result))
-            logging.info(f"{device_name}: {result}")
+        print(create_json_output(device_name, result))
+        logging.info(f"{device_name}: {result}")
 
     except serial.SerialException as e:
-        error_msg = f"Error opening serial port {device_path}: {e}"
+        error_msg = f"Error opening serial port {path}: {e}"
         print(create_json_output(device_name, status="error", error=error_msg))
         logging.error(error_msg)
 
@@ -106,6 +103,9 @@ def main(device_name):
         print(create_json_output(device_name, status="error", error=error_msg))
         logging.error(error_msg)
 
+    finally:
+        session.close()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Send a command to a serial device and receive a response.",
@@ -11,7 +11,6 @@ Logs:
 - Temperature history: /var/log/temperature_results.txt
 """
 
-import serial
 import subprocess
 import logging
 from datetime import datetime
@@ -20,6 +19,12 @@ import signal
 import sys
 import re
 
+from port_watcher import PortWatcher
+from results_writer import ResultsWriter
+from serial_session import SessionPool
+from temp_store import STATUS_OK, STATUS_OVERHEAT, TempStore
+from temp_poller import TemperaturePoller
+
 # ==============================================================================
 # 🛠️ Configuration Section
 # ==============================================================================
@@ -27,6 +32,9 @@ import re
 # Log files where the program records its actions
 LOG_FILE = '/var/log/temperature_monitor.log'        # Logs what the service does
 RESULTS_FILE = '/var/log/temperature_results.txt'    # Stores historical readings
+RESULTS_FLUSH_INTERVAL = 60                          # Max seconds a reading waits before it is written
+RESULTS_FSYNC = 'urgent'                             # Force high readings to disk before a power cycle
+TEMP_STORE = None                                    # Directory of a binary temp_store to also record readings in (None: off)
 
 # List of temperature sensors to monitor
 # These correspond to serial ports under /dev/
@@ -47,13 +55,17 @@ POWER_CYCLE_COMMAND = ['/usr/sbin/powercycle', 'chroma', '--power-off']
 # ==============================================================================
 # 📜 Logging Setup
 # ==============================================================================
-# Set up logging so we can track everything the script does
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+def setup_logging():
+    """
+    Sets up logging so we can track everything the script does.
+    Called when the service starts, so importing this module leaves logging alone.
+    """
+    logging.basicConfig(
+        filename=LOG_FILE,
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
 
 
 # ==============================================================================
@@ -69,54 +81,75 @@ def handle_termination_signal(signum, frame):
         frame: Current stack frame (not used here)
     """
     logging.info(f"Received termination signal {signum}. Shutting down service.")
+    # The results file is flushed by start_monitoring_service() on the way out;
+    # closing it here could deadlock on a write the signal interrupted
     sys.exit(0)
 
-# Register handlers for keyboard interrupt and system terminate signals
-signal.signal(signal.SIGTERM, handle_termination_signal)
-signal.signal(signal.SIGINT, handle_termination_signal)
+
+# ==============================================================================
+# 📝 Results File
+# ==============================================================================
+# Readings are buffered and appended in batches through one open file (under a
+# lock, so other monitors can share it); high readings are written at once.
+results_writer = None
+
+# The same readings as fixed-width records, for fast range queries and graphs
+temp_store = None
 
 
 # ==============================================================================
 # 💬 Communicating with the Devices
 # ==============================================================================
-def query_temperature_sensor(device_name):
-    """
-    Connects to a single serial device and asks for its current temperature.
-    
-    Args:
-        device_name: Name of the device (e.g., txpaa1)
-    
-    Returns:
-        The raw string response from the device, or None if something went wrong.
-    """
+# Every device is asked at once over its kept-open serial session, so the
+# Arduinos are not reset (and waited for) on every reading and a check takes
+# as long as the slowest device rather than the sum of all of them.
+poller = None
 
-    port_path = f"/dev/{device_name}"  # Full path to serial port
 
-    try:
-        # Open serial connection
-        with serial.Serial(port_path, BAUD_RATE, timeout=1) as serial_connection:
-            time.sleep(2)  # Give the device time to initialize
+def open_service():
+    """
+    Opens the results file, the optional temperature store and the device sessions.
+    Called when the service starts rather than on import, so importing this module
+    starts no threads.
+    """
+    global results_writer, temp_store, poller
+    results_writer = ResultsWriter(RESULTS_FILE, flush_interval=RESULTS_FLUSH_INTERVAL, fsync=RESULTS_FSYNC)
+    temp_store = TempStore(TEMP_STORE) if TEMP_STORE else None
+    # The watcher lets an unplugged device be skipped until its node is back
+    poller = TemperaturePoller(SessionPool(PortWatcher()), command=DEVICE_COMMAND.encode(),
+                               baudrate=BAUD_RATE, retry_count=1)
 
-            # Clear old data before starting
-            serial_connection.reset_input_buffer()
-            serial_connection.reset_output_buffer()
 
-            # Send command to get temperature
-            serial_connection.write(DEVICE_COMMAND.encode())
+def close_service():
+    """
+    Flushes the results and closes everything open_service() opened.
+    """
+    results_writer.close()
+    if temp_store:
+        temp_store.close()
+    poller.close()
 
-            # Read the device's reply
-            response = serial_connection.readline().decode().strip()
 
-        # For debugging: log the raw response
-        logging.debug(f"{device_name} raw response: {response}")
-        return response
+def query_temperature_sensors(device_names):
+    """
+    Asks every serial device for its current temperature, concurrently.
+    
+    Args:
+        device_names: Names of the devices (e.g., txpaa1)
+    
+    Returns:
+        Dict of device name to its raw string response, or None if something went wrong.
+    """
 
-    except serial.SerialException as e:
-        logging.error(f"Serial communication failure on {device_name}: {str(e)}")
-        return None
-    except Exception as e:
-        logging.exception(f"Unexpected error with {device_name}: {str(e)}")
-        return None
+    responses = {}
+    for result in poller.poll(device_names):
+        if result.response is None:
+            logging.error(f"Serial communication failure on {result.device}: {result.error}")
+        else:
+            # For debugging: log the raw response
+            logging.debug(f"{result.device} raw response: {result.response}")
+        responses[result.device] = result.response
+    return responses
 
 
 # ==============================================================================
@@ -151,12 +184,16 @@ def process_temperature_reading():
 
     high_temp_detected = False  # Start with assumption that everything is okay
 
+    responses = query_temperature_sensors(DEVICES)
+
     # Loop through all devices
     for device in DEVICES:
-        raw_response = query_temperature_sensor(device)
+        raw_response = responses[device]
 
         if not raw_response:
             logging.warning(f"No valid response from {device}")
+            if temp_store:
+                temp_store.append(device, None)
             continue  # Skip to next device
 
         try:
@@ -173,9 +210,11 @@ def process_temperature_reading():
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             log_entry = f"{timestamp} - [{device}] Temperature: {current_temp}°C"
 
-            # Save this result to file
-            with open(RESULTS_FILE, 'a') as results_file:
-                results_file.write(log_entry + '\n')
+            # Save this result to file (straight away if it is too hot)
+            results_writer.write(log_entry, urgent=current_temp > TEMPERATURE_THRESHOLD)
+            if temp_store:
+                temp_store.append(device, current_temp,
+                                  STATUS_OVERHEAT if current_temp > TEMPERATURE_THRESHOLD else STATUS_OK)
 
             # Log the temperature to the main log file
             logging.info(f"[{device}] Current temperature: {current_temp:.2f}°C")
@@ -204,6 +243,13 @@ def start_monitoring_service():
     Keeps running until manually stopped or system shuts down.
     """
 
+    setup_logging()
+
+    # Register handlers for keyboard interrupt and system terminate signals
+    signal.signal(signal.SIGTERM, handle_termination_signal)
+    signal.signal(signal.SIGINT, handle_termination_signal)
+
+    open_service()
     logging.info("Temperature monitoring service started")
 
     try:
@@ -221,6 +267,8 @@ def start_monitoring_service():
     except Exception as e:
         logging.critical(f"Critical service failure: {str(e)}", exc_info=True)
         sys.exit(1)
+    finally:
+        close_service()
 
 
 # ==============================================================================
@@ -1,164 +1,338 @@
 #!/usr/bin/env python3
 import tkinter as tk
-from tkinter import ttk, messagebox
-import subprocess
+from tkinter import ttk, messagebox, filedialog
+import argparse
+import bisect
+import queue
 import threading
 import time
 
+from patlite_control import LightState
+from sequence_engine import (
+    DEFAULT_TOWER_IP, FleetSequenceEngine, SequenceHooks, equal_phases, phase_offsets
+)
+from signal_tower import open_tower
+from timeline import Timeline
+from timing_report import report
+
 
 # Configuration
-COLOR_SEQUENCE = [
-    ('green', 10),
-    ('yellow', 9),
-    ('amber', 8),
-    ('red', 7)
-]
-
-CONTROLLER_SCRIPT = "/home/labuser/jazzeryj/la6_controller.py"
 DEFAULT_DURATION_MINUTES = 5
+FRAME_INTERVAL_MS = 50  # Progress redraw period (20 frames per second)
+
+COLOR_MAP = {
+    'green': '#00FF00',
+    'yellow': '#FFFF00',
+    'amber': '#FFA500',
+    'red': '#FF0000',
+    'blue': '#0000FF',
+}
+
+
+def state_color(phase):
+    """Colour swatch for a phase: by name, else from the lights it turns on."""
+    if phase.name in COLOR_MAP:
+        return COLOR_MAP[phase.name]
+    state = phase.state
+    lit = {light for light in ('red', 'amber', 'green', 'blue') if getattr(state, light) != LightState.OFF}
+    if lit == {'amber', 'green'}:
+        return COLOR_MAP['yellow']
+    for light in ('red', 'amber', 'green', 'blue'):
+        if light in lit:
+            return COLOR_MAP[light]
+    return 'gray'
+
+
+class CycleProgress:
+    """Where a cycle is at any instant, computed from its start time and phase offsets."""
+
+    def __init__(self, phases):
+        self.phases = phases
+        self.offsets = phase_offsets(phases)
+        self.start = None
+
+    @property
+    def total_seconds(self):
+        return self.offsets[-1]
+
+    def at(self, now):
+        """Return (phase index, phase fraction, total fraction) at monotonic time `now`."""
+        elapsed = min(max(now - self.start, 0.0), self.total_seconds)
+        index = min(bisect.bisect_right(self.offsets, elapsed) - 1, len(self.phases) - 1)
+        phase_fraction = (elapsed - self.offsets[index]) / self.phases[index].duration
+        return index, min(phase_fraction, 1.0), elapsed / self.total_seconds
+
+
+class TowerRow:
+    """One row of the dashboard: a tower's colour, progress bars and status."""
+
+    def __init__(self, parent, row, ip, phases):
+        self.ip = ip
+        self.progress = CycleProgress(phases)
+        self.shown = None  # (phase index, phase %, total %, remaining s) last drawn
+        self.error = None
+
+        tk.Label(parent, text=ip, width=15, anchor="w").grid(row=row, column=0, padx=5, pady=2)
+        self.color_box = tk.Canvas(parent, width=40, height=20, bg="gray", highlightthickness=0)
+        self.color_box.grid(row=row, column=1, padx=5)
+        self.phase_label = tk.Label(parent, text="-", width=14, anchor="w")
+        self.phase_label.grid(row=row, column=2, padx=5)
+        self.phase_progress = ttk.Progressbar(parent, orient="horizontal", length=160, mode="determinate")
+        self.phase_progress.grid(row=row, column=3, padx=5)
+        self.total_progress = ttk.Progressbar(parent, orient="horizontal", length=160, mode="determinate")
+        self.total_progress.grid(row=row, column=4, padx=5)
+        self.remaining_label = tk.Label(parent, text="--:--", width=6)
+        self.remaining_label.grid(row=row, column=5, padx=5)
+        self.status_label = tk.Label(parent, text="Waiting", width=12, anchor="w")
+        self.status_label.grid(row=row, column=6, padx=5)
+
+    def redraw(self, now):
+        """Update the widgets for time `now`, touching only what changed."""
+        if self.progress.start is None:
+            return
+        index, phase_fraction, total_fraction = self.progress.at(now)
+        remaining = int(self.progress.total_seconds * (1 - total_fraction))
+        frame = (index, int(phase_fraction * 100), int(total_fraction * 100), remaining)
+        if frame == self.shown:
+            return
+
+        if self.shown is None or self.shown[0] != index:
+            phase = self.progress.phases[index]
+            self.color_box.configure(bg=state_color(phase))
+            self.phase_label.config(text=f"{index+1}/{len(self.progress.phases)} {phase.name.capitalize()}")
+        self.phase_progress["value"] = frame[1]
+        self.total_progress["value"] = frame[2]
+        self.remaining_label.config(text=f"{remaining // 60:02d}:{remaining % 60:02d}")
+        self.shown = frame
+
+    def set_status(self, text, color):
+        self.status_label.config(text=text, fg=color)
+
+
+class QueueHooks(SequenceHooks):
+    """Hand engine events to the Tk thread through a queue drained once per frame."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def on_start(self, phases, total_seconds):
+        self.events.put(('start',))
+
+    def on_switch(self, record):
+        self.events.put(('switch', record))
+
+    def on_finish(self, completed):
+        self.events.put(('finish', completed))
 
 
 class LEDCycleApp:
-    def __init__(self, root):
+    def __init__(self, root, ips=(DEFAULT_TOWER_IP,), timing_report=None):
         self.root = root
+        self.timing_report = timing_report
         self.root.title("LA-POE LED Cycle Controller")
-        self.root.geometry("500x400")
         self.running = False
-        self.stop_flag = False
+        self.stop_requested = False
+        self.engine = None
+        self.rows = {}
+        self.events = queue.Queue()
 
         # UI Elements
-        self.create_widgets()
+        self.create_widgets(ips)
+        self.root.after(FRAME_INTERVAL_MS, self.refresh)
 
-    def create_widgets(self):
+    def create_widgets(self, ips):
         # Title Label
         title_label = tk.Label(self.root, text="LED Cycle Controller", font=("Helvetica", 16))
         title_label.pack(pady=10)
 
-        # Duration Entry
-        duration_frame = tk.Frame(self.root)
-        duration_frame.pack(pady=10)
+        settings_frame = tk.Frame(self.root)
+        settings_frame.pack(pady=5, padx=10, fill=tk.X)
+
+        # Tower IPs
+        tk.Label(settings_frame, text="Towers (comma separated):").grid(row=0, column=0, sticky="e")
+        self.towers_entry = tk.Entry(settings_frame, width=45)
+        self.towers_entry.insert(0, ", ".join(ips))
+        self.towers_entry.grid(row=0, column=1, columnspan=2, sticky="w", padx=5)
 
-        tk.Label(duration_frame, text="Duration (minutes):").pack(side=tk.LEFT)
-        self.duration_entry = tk.Entry(duration_frame, width=10)
+        # Duration Entry
+        tk.Label(settings_frame, text="Duration (minutes):").grid(row=1, column=0, sticky="e")
+        self.duration_entry = tk.Entry(settings_frame, width=10)
         self.duration_entry.insert(0, str(DEFAULT_DURATION_MINUTES))
-        self.duration_entry.pack(side=tk.LEFT, padx=5)
+        self.duration_entry.grid(row=1, column=1, sticky="w", padx=5)
 
-        # Start Button
-        self.start_button = tk.Button(self.root, text="Start Cycle", command=self.start_cycle)
-        self.start_button.pack(pady=10)
+        # Optional timeline file
+        tk.Label(settings_frame, text="Timeline file (optional):").grid(row=2, column=0, sticky="e")
+        self.timeline_entry = tk.Entry(settings_frame, width=45)
+        self.timeline_entry.grid(row=2, column=1, sticky="w", padx=5)
+        tk.Button(settings_frame, text="Browse...", command=self.browse_timeline).grid(row=2, column=2)
 
-        # Stop Button
-        self.stop_button = tk.Button(self.root, text="Stop Cycle", command=self.stop_cycle, state=tk.DISABLED)
-        self.stop_button.pack(pady=5)
+        button_frame = tk.Frame(self.root)
+        button_frame.pack(pady=10)
 
-        # Current Color Box
-        self.color_box = tk.Canvas(self.root, width=200, height=100, bg="gray")
-        self.color_box.pack(pady=10)
+        # Start Button
+        self.start_button = tk.Button(button_frame, text="Start Cycle", command=self.start_cycle)
+        self.start_button.pack(side=tk.LEFT, padx=5)
 
-        # Phase Progress Bar
-        tk.Label(self.root, text="Current Phase Progress").pack()
-        self.phase_progress = ttk.Progressbar(self.root, orient="horizontal", length=300, mode="determinate")
-        self.phase_progress.pack(pady=5)
+        # Stop Button
+        self.stop_button = tk.Button(button_frame, text="Stop Cycle", command=self.stop_cycle, state=tk.DISABLED)
+        self.stop_button.pack(side=tk.LEFT, padx=5)
 
-        # Total Cycle Progress Bar
-        tk.Label(self.root, text="Total Cycle Progress").pack()
-        self.total_progress = ttk.Progressbar(self.root, orient="horizontal", length=300, mode="determinate")
-        self.total_progress.pack(pady=5)
+        # One row per tower
+        self.rows_frame = tk.Frame(self.root)
+        self.rows_frame.pack(pady=5, padx=10)
+        for column, heading in enumerate(["Tower", "", "Phase", "Phase Progress", "Total Progress", "Left", "Status"]):
+            tk.Label(self.rows_frame, text=heading, font=("Helvetica", 10, "bold")).grid(row=0, column=column)
 
         # Status Label
         self.status_label = tk.Label(self.root, text="Ready", fg="blue")
         self.status_label.pack(pady=10)
 
-    def start_cycle(self):
+    def browse_timeline(self):
+        path = filedialog.askopenfilename(filetypes=[("Timeline files", "*.json"), ("All files", "*")])
+        if path:
+            self.timeline_entry.delete(0, tk.END)
+            self.timeline_entry.insert(0, path)
+
+    def build_plans(self):
+        """Read the settings into a phase list per tower, or None after showing an error."""
+        ips = list(dict.fromkeys(ip.strip() for ip in self.towers_entry.get().split(",") if ip.strip()))
+        if not ips:
+            messagebox.showerror("Invalid Input", "Please enter at least one tower IP.")
+            return None
+
+        timeline_path = self.timeline_entry.get().strip()
+        if timeline_path:
+            try:
+                timeline = Timeline.load(timeline_path)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Invalid Timeline", str(e))
+                return None
+            return {ip: timeline.compile_phases(ip) for ip in ips}
+
         try:
-            self.duration_minutes = float(self.duration_entry.get())
+            duration_minutes = float(self.duration_entry.get())
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter a valid number for duration.")
-            return
+            return None
 
-        if self.duration_minutes <= 0:
+        if duration_minutes <= 0:
             messagebox.showerror("Invalid Input", "Duration must be greater than zero.")
+            return None
+        return {ip: equal_phases(duration_minutes * 60) for ip in ips}
+
+    def start_cycle(self):
+        plans = self.build_plans()
+        if plans is None:
             return
 
+        for widget in self.rows_frame.grid_slaves():
+            if int(widget.grid_info()["row"]) > 0:
+                widget.destroy()
+        self.rows = {ip: TowerRow(self.rows_frame, n + 1, ip, phases) for n, (ip, phases) in enumerate(plans.items())}
+
         self.running = True
-        self.stop_flag = False
+        self.stop_requested = False
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
-        self.status_label.config(text="Running...", fg="green")
+        self.status_label.config(text="Connecting...", fg="black")
 
-        self.cycle_thread = threading.Thread(target=self.run_cycle)
+        self.cycle_thread = threading.Thread(target=self.run_cycle, args=(plans,), daemon=True)
         self.cycle_thread.start()
 
     def stop_cycle(self):
-        self.stop_flag = True
+        self.stop_requested = True
+        if self.engine:
+            self.engine.stop()
         self.status_label.config(text="Stopping...", fg="orange")
 
-    def update_color_display(self, color_name):
-        color_map = {
-            'green': '#00FF00',
-            'yellow': '#FFFF00',
-            'amber': '#FFA500',
-            'red': '#FF0000'
-        }
-        self.color_box.configure(bg=color_map.get(color_name.lower(), 'gray'))
-
-    def run_cycle(self):
-        total_seconds = self.duration_minutes * 60
-        interval_seconds = total_seconds / len(COLOR_SEQUENCE)
-        total_start = time.monotonic()
-
-        for i, (color_name, color_code) in enumerate(COLOR_SEQUENCE):
-            if self.stop_flag:
-                break
-
-            self.root.after(0, self.update_color_display, color_name)
-            self.root.after(0, self.status_label.config, {'text': f"Phase {i+1}/{len(COLOR_SEQUENCE)}: {color_name.capitalize()}", 'fg': 'black'})
-
-            self.run_led_command(color_code)
-
-            if i < len(COLOR_SEQUENCE) - 1:
-                self.run_phase_timer(interval_seconds, total_seconds, i + 1)
-
-        if not self.stop_flag:
-            self.root.after(0, self.status_label.config, {'text': "✅ Cycle complete!", 'fg': 'green'})
+    def run_cycle(self, plans):
+        """Open the towers and run the engine; its workers sleep until each deadline."""
+        towers = []
+        try:
+            for ip in plans:
+                towers.append(open_tower(ip))
+            self.engine = FleetSequenceEngine(towers, plans, QueueHooks(self.events), tick_interval=float("inf"))
+            if self.stop_requested:
+                self.engine.stop()
+            self.engine.run()
+        except (OSError, ValueError) as e:
+            # Always end the cycle, or the window would stay on "Running..."
+            failed = f"tower {ip}" if len(towers) < len(plans) else "the cycle"
+            self.events.put(('error', f"Unable to run {failed}: {e}"))
+            self.events.put(('finish', False))
+        finally:
+            for tower in towers:
+                tower.close()
+
+    def handle_event(self, event):
+        kind = event[0]
+        if kind == 'start':
+            for row in self.rows.values():
+                row.progress.start = self.engine.start_time
+                row.set_status("Running", "green")
+            self.status_label.config(text="Running...", fg="green")
+        elif kind == 'switch':
+            record = event[1]
+            row = self.rows.get(record.ip)
+            if row and record.error is not None:
+                row.error = record.error
+                row.set_status("Error", "red")
+        elif kind == 'error':
+            messagebox.showerror("Error", event[1])
+        elif kind == 'finish':
+            self.finish_cycle(event[1])
+
+    def finish_cycle(self, completed):
+        if self.engine:
+            error = report(self.engine, self.timing_report)
+            if error is not None:
+                messagebox.showerror("Error", f"Could not write timing report: {error}")
+
+        if completed:
+            self.status_label.config(text="✅ Cycle complete!", fg='green')
+        elif any(row.error for row in self.rows.values()):
+            self.status_label.config(text="⚠ Cycle finished with errors.", fg='red')
         else:
-            self.root.after(0, self.status_label.config, {'text': "🛑 Stopped by user.", 'fg': 'red'})
+            self.status_label.config(text="🛑 Stopped.", fg='red')
 
-        self.root.after(0, self.start_button.config, {'state': tk.NORMAL})
-        self.root.after(0, self.stop_button.config, {'state': tk.DISABLED})
+        now = time.monotonic()
+        for row in self.rows.values():
+            row.redraw(now)
+            if row.error is None:
+                row.set_status("Complete" if completed else "Stopped", "green" if completed else "red")
 
+        self.start_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.DISABLED)
         self.running = False
+        self.engine = None
 
-    def run_phase_timer(self, interval_seconds, total_seconds, phase_number):
-        start_time = time.monotonic()
-        while True:
-            elapsed = time.monotonic() - start_time
-            total_elapsed = time.monotonic() - total_start
-
-            if elapsed >= interval_seconds or self.stop_flag:
-                break
-
-            phase_percent = min(elapsed / interval_seconds, 1.0) * 100
-            total_percent = min(total_elapsed / total_seconds, 1.0) * 100
-
-            self.root.after(0, self.phase_progress["value"].__setattr__, phase_percent)
-            self.root.after(0, self.total_progress["value"].__setattr__, total_percent)
-
-            time.sleep(0.1)
-
-        self.root.after(0, self.phase_progress["value"].__setattr__, 0)
-
-    def run_led_command(self, color_code):
+    def refresh(self):
+        """Frame timer: apply engine events, then redraw every running row."""
         try:
-            subprocess.run([
-                "python3", CONTROLLER_SCRIPT, "T", str(color_code)
-            ], check=True)
-        except subprocess.CalledProcessError as e:
-            self.stop_flag = True
-            self.root.after(0, messagebox.showerror, "Error", f"Failed to set LED color code {color_code}: {e}")
+            while True:
+                self.handle_event(self.events.get_nowait())
+        except queue.Empty:
+            pass
+
+        if self.running:
+            now = time.monotonic()
+            for row in self.rows.values():
+                row.redraw(now)
+        self.root.after(FRAME_INTERVAL_MS, self.refresh)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tk dashboard for timed LED cycles on one or more towers.")
+    parser.add_argument("--ip", action="append",
+                        help=f"Tower IP to pre-fill; repeat for several (default: {DEFAULT_TOWER_IP})")
+    parser.add_argument("--timing-report", metavar="PATH",
+                        help="Export per-phase switch timing to PATH (.csv or .json) after each cycle")
+    args = parser.parse_args()
 
-
-if __name__ == "__main__":
     root = tk.Tk()
-    app = LEDCycleApp(root)
+    LEDCycleApp(root, args.ip or [DEFAULT_TOWER_IP], args.timing_report)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,11 +13,6 @@ import logging
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -369,6 +364,12 @@ def interactive_mode() -> argparse.Namespace:
 def main() -> None:
     """Main function to handle command-line interface."""
     args = parse_arguments()
+
+    # Configure logging here rather than at import so other tools can reuse this module
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     
     # Handle quiet mode
     if args.quiet:
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Monitor Bench - Run the temperature monitors against simulated sensors.
+
+Each monitor is driven in-process against a fresh SensorSimulator with N
+devices, one check per --interval, and measured from the outside:
+
+  * cycle time: how long one check of every device takes (p50/p95/max);
+  * reads/s: good readings the devices served per second of checking;
+  * time-to-trip: after --warmup cycles the first device ramps past the
+    threshold; this is the time from the moment it crossed to the moment
+    the monitor ran its power-off command (negative if it tripped early on
+    a projection). ondemand has no trip logic.
+
+The monitors' power-off commands are replaced by `touch <marker>`, and their
+results files and logs go to a scratch directory.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional
+
+from sensor_sim import SensorProfile, SensorSimulator
+from timing_report import percentile
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+DEVICES = 50
+CYCLES = 10
+INTERVAL = 1.0              # Seconds between the starts of two checks
+WARMUP = 3                  # Cycles before the ramp starts
+THRESHOLD = 180.0           # °C, the monitors' default limit
+RAMP_RATE = 5.0             # °C per second
+TRIP_TIMEOUT = 30.0         # Seconds after the crossing to wait for a trip
+MONITORS = ('adv_temp_monitor', 'eq80_check', 'ondemand')
+
+
+@dataclass
+class MonitorRunner:
+    """One monitor set up against a simulator: check() runs one cycle, close() tears it down."""
+    check: Callable[[], None]
+    close: Callable[[], None]
+
+
+@dataclass
+class BenchResult:
+    """Measurements for one monitor."""
+    monitor: str
+    devices: int
+    cycles: List[float] = field(default_factory=list)     # Seconds per check
+    reads: int = 0                  # Good readings served during checks
+    garbage: int = 0
+    dropped: int = 0
+    disconnects: int = 0
+    trip_after: Optional[float] = None    # Seconds from threshold crossing to power-off
+
+    @property
+    def reads_per_second(self) -> Optional[float]:
+        busy = sum(self.cycles)
+        return self.reads / busy if busy else None
+
+
+def _adv_check(sim: SensorSimulator, args: argparse.Namespace, workdir: str, marker: str) -> MonitorRunner:
+    import adv_temp_monitor
+    conf = dict(adv_temp_monitor.DEFAULT_CONFIG)
+    conf.update(
+        devices=sim.paths,
+        max_temp=args.threshold,
+        temp_file=os.path.join(workdir, 'adv_results.txt'),
+        power_off_command=['touch', marker],
+    )
+    adv_temp_monitor.init_monitor(conf)
+
+    def check() -> None:
+        if adv_temp_monitor.check_temperatures():
+            adv_temp_monitor.power_off_system()
+    return MonitorRunner(check, adv_temp_monitor.close_monitor)
+
+
+def _eq80_check(sim: SensorSimulator, args: argparse.Namespace, workdir: str, marker: str) -> MonitorRunner:
+    import eq80_check
+    eq80_check.DEVICES = sim.paths
+    eq80_check.TEMPERATURE_THRESHOLD = args.threshold
+    eq80_check.POWER_CYCLE_COMMAND = ['touch', marker]
+    eq80_check.RESULTS_FILE = os.path.join(workdir, 'eq80_results.txt')
+    eq80_check.open_service()
+    return MonitorRunner(eq80_check.process_temperature_reading, eq80_check.close_service)
+
+
+def _ondemand_check(sim: SensorSimulator, args: argparse.Namespace, workdir: str, marker: str) -> MonitorRunner:
+    import ondemand
+    poller = ondemand.create_poller()
+
+    def check() -> None:
+        ondemand.query_devices(poller, sim.paths)
+    return MonitorRunner(check, poller.close)
+
+
+RUNNERS = {
+    'adv_temp_monitor': _adv_check,
+    'eq80_check': _eq80_check,
+    'ondemand': _ondemand_check,
+}
+
+
+def bench(monitor: str, profile: SensorProfile, args: argparse.Namespace, workdir: str) -> BenchResult:
+    """Run one monitor against a fresh simulator."""
+    marker = os.path.join(workdir, f"{monitor}.tripped")
+    if os.path.exists(marker):
+        os.remove(marker)
+    result = BenchResult(monitor, args.devices)
+    trips = monitor != 'ondemand'
+
+    with SensorSimulator(args.devices, profile, os.path.join(workdir, monitor), seed=args.seed) as sim:
+        runner = RUNNERS[monitor](sim, args, workdir, marker)
+        crossing = None
+        try:
+            cycle = 0
+            while True:
+                if cycle == args.warmup and trips:
+                    sim.ramp(0, args.ramp_rate, limit=args.threshold + 50)
+                    crossing = sim.crossing_time(0, args.threshold)
+                start = time.monotonic()
+                before = (sim.stats.replies, sim.stats.garbage)
+                runner.check()
+                result.cycles.append(time.monotonic() - start)
+                result.reads += (sim.stats.replies - before[0]) - (sim.stats.garbage - before[1])
+                cycle += 1
+
+                if trips and os.path.exists(marker):
+                    result.trip_after = os.path.getmtime(marker) - time.time() + time.monotonic() - crossing
+                    break
+                waiting_for_trip = crossing is not None and time.monotonic() < crossing + args.trip_timeout
+                if cycle >= args.cycles and not waiting_for_trip:
+                    break
+                time.sleep(max(start + args.interval - time.monotonic(), 0))
+        finally:
+            runner.close()
+        result.garbage = sim.stats.garbage
+        result.dropped = sim.stats.dropped
+        result.disconnects = sim.stats.disconnects
+    return result
+
+
+def format_results(results: List[BenchResult]) -> List[str]:
+    """Printable table of results."""
+    lines = [f"{'monitor':<18}{'devices':>8}{'cycles':>8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}"
+             f"{'reads/s':>9}  time-to-trip"]
+    for r in results:
+        p50, p95 = percentile(r.cycles, 50), percentile(r.cycles, 95)
+        rate = r.reads_per_second
+        if r.monitor == 'ondemand':
+            trip = "n/a"
+        elif r.trip_after is None:
+            trip = "no trip"
+        else:
+            trip = f"{r.trip_after:+.2f} s"
+        lines.append(
+            f"{r.monitor:<18}{r.devices:>8}{len(r.cycles):>8}"
+            f"{(p50 or 0) * 1000:>9.0f}{(p95 or 0) * 1000:>9.0f}{max(r.cycles, default=0) * 1000:>9.0f}"
+            f"{rate or 0:>9.0f}  {trip}"
+        )
+    faults = [r for r in results if r.garbage or r.dropped or r.disconnects]
+    for r in faults:
+        lines.append(f"  {r.monitor}: {r.garbage} garbage, {r.dropped} dropped, {r.disconnects} disconnects")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the temperature monitors against simulated sensors")
+    parser.add_argument('-n', '--devices', type=int, default=DEVICES, help="Simulated devices")
+    parser.add_argument('-m', '--monitor', choices=MONITORS, action='append', help="Monitor to run (default: all)")
+    parser.add_argument('--cycles', type=int, default=CYCLES, help="Checks to time")
+    parser.add_argument('--interval', type=float, default=INTERVAL, help="Seconds between checks")
+    parser.add_argument('--warmup', type=int, default=WARMUP, help="Checks before the ramp starts")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Trip temperature, °C")
+    parser.add_argument('--ramp-rate', type=float, default=RAMP_RATE, help="Ramp of the first device, °C/s")
+    parser.add_argument('--trip-timeout', type=float, default=TRIP_TIMEOUT, help="Seconds to wait for a trip")
+    parser.add_argument('--latency', type=float, default=SensorProfile.latency, help="Mean reply delay, seconds")
+    parser.add_argument('--noise', type=float, default=0.0, help="Reading noise, °C")
+    parser.add_argument('--garbage', type=float, default=0.0, help="Fraction of garbage replies")
+    parser.add_argument('--drop', type=float, default=0.0, help="Fraction of requests left unanswered")
+    parser.add_argument('--disconnect', type=float, default=0.0, help="Fraction of requests that unplug a device")
+    parser.add_argument('--seed', type=int, help="Random seed")
+    parser.add_argument('--workdir', help="Scratch directory (default: a new temporary one)")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='monitor_bench.')
+    os.makedirs(workdir, exist_ok=True)
+    # The monitors only configure logging in their own main(); collect their
+    # messages in the scratch directory
+    logging.basicConfig(
+        filename=os.path.join(workdir, 'bench.log'),
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s'
+    )
+
+    # Start each device 10 seconds below the threshold so a ramp crosses it quickly
+    profile = SensorProfile(
+        base=args.threshold - 10 * args.ramp_rate,
+        noise=args.noise, latency=args.latency,
+        garbage_rate=args.garbage, drop_rate=args.drop, disconnect_rate=args.disconnect
+    )
+    results = []
+    for monitor in args.monitor or MONITORS:
+        print(f"Running {monitor} against {args.devices} devices...", file=sys.stderr)
+        results.append(bench(monitor, profile, args, workdir))
+
+    if args.json:
+        print(json.dumps([dict(asdict(r), reads_per_second=r.reads_per_second) for r in results], indent=2))
+    else:
+        print("\n".join(format_results(results)))
+    print(f"Logs and results files: {workdir}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
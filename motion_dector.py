@@ -1,51 +1,50 @@
 #!/usr/bin/env python3
 
 import serial
-import subprocess
 from datetime import datetime
-import time
+
+from motion_notify import NotificationWorker, SyslogSink, TtySink
 
 # Serial port configuration
 SERIAL_PORT = '/dev/ttyACM2'
 BAUD_RATE = 9600
 USERNAME = 'labuser'
 
-def send_wall_message(message):
-    """Send a wall message to the specified user."""
-    try:
-        subprocess.run(['wall', '-n', f'/dev/pts/[0-9]*'])
-        subprocess.run(['write', USERNAME], input=message.encode(), check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error sending wall message: {e}")
+# Alert delivery: bursts within the window are merged into one message, and
+# USERNAME's terminals get at most one message per interval.
+ALERT_WINDOW = 10     # Seconds
+ALERT_INTERVAL = 30   # Seconds
 
-def monitor_motion():
+def monitor_motion(notifier):
     """Monitor the serial port for motion detection messages."""
     try:
-        # Open serial port
-        with serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1) as ser:
+        # Open serial port. With no timeout, readline() blocks in the kernel
+        # until a full line arrives, so a detection is seen immediately and
+        # the loop uses no CPU while the sensor is idle.
+        with serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=None) as ser:
             print(f"Monitoring {SERIAL_PORT} for motion detection...")
             
             while True:
-                if ser.in_waiting:
-                    # Read line from serial port
-                    line = ser.readline().decode('utf-8').strip()
-                    
-                    # Check for motion detection message
-                    if "Motion detected!" in line:
-                        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        message = f"\nMOTION ALERT: Movement detected at {timestamp}\n"
-                        send_wall_message(message)
-                        print(message)
+                # Read line from serial port
+                line = ser.readline().decode('utf-8', errors='replace').strip()
                 
-                time.sleep(0.1)  # Small delay to prevent CPU hogging
+                # Check for motion detection message
+                if "Motion detected!" in line:
+                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    message = f"MOTION ALERT: Movement detected at {timestamp}"
+                    notifier.notify(message)
+                    print(message)
 
     except serial.SerialException as e:
         print(f"Error opening serial port {SERIAL_PORT}: {e}")
         exit(1)
 
 if __name__ == "__main__":
+    notifier = NotificationWorker([TtySink(USERNAME), SyslogSink()], ALERT_WINDOW, ALERT_INTERVAL)
     try:
-        monitor_motion()
+        monitor_motion(notifier)
     except KeyboardInterrupt:
         print("\nMonitoring stopped by user")
-        exit(0)
+    finally:
+        notifier.close(timeout=5)
+    exit(0)
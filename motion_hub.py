@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Motion Hub - Watch any number of PIR serial ports from a single process.
+
+Every port listed in the JSON config is opened non-blocking and multiplexed
+with `selectors`, so one idle process replaces a motion_monitor per Arduino.
+Each port maps to its own tower (sent through a shared TowerDispatcher) or is
+only logged, and reconnects on its own without disturbing the rest: as soon
+as its device node reappears (port_watcher), or on a retry timer when the node
+exists but cannot be opened.
+Ports are grouped into zones (by default one per port); a zone's towers follow
+its occupancy (see motion_zone.py) rather than every raw PIR edge.
+
+Config format (see motion_hub_example.json):
+
+    {
+      "ports": [
+        {"port": "/dev/ttyACM0", "tower": "172.18.3.200", "zone": "lab"},
+        {"port": "/dev/ttyACM1", "tower": "172.18.3.200", "zone": "lab"},
+        {"port": "/dev/ttyACM2", "tower": "172.18.3.201",
+         "detected": "red", "ended": "off"},
+        {"port": "/dev/ttyACM3", "action": "log"}
+      ],
+      "zones": {"lab": {"min_on_time": 60, "hold_off": 20}},
+      "latency_report": "/home/jazzeryj/logs/motion_latency.json"
+    }
+
+The optional latency report holds serial-arrival -> tower-ACK percentiles
+per sensor and tower (print it with motion_latency.py).
+"""
+
+import argparse
+import json
+import logging
+import os
+import selectors
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import serial
+
+from motion_latency import LatencyTracker
+from motion_zone import MotionZone, ZoneSettings
+from port_watcher import FALLBACK_INTERVAL, PortWatcher
+from signal_tower import DEFAULT_PORT, TowerDispatcher, resolve_state
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_CONFIG = '/etc/motion_hub.json'
+DEFAULT_BAUD_RATE = 9600
+RETRY_DELAY = 10.0          # Seconds between reconnect attempts for one port
+MAX_LINE_LENGTH = 256       # Discard a partial line that grows past this
+MOTION_DETECTED = "Motion detected!"
+MOTION_ENDED = "Motion ended!"
+
+ACTION_TOWER = 'tower'
+ACTION_LOG = 'log'
+ACTIONS = (ACTION_TOWER, ACTION_LOG)
+
+
+@dataclass
+class PortConfig:
+    """What to watch on one serial port and what to do about it."""
+    port: str
+    baud: int = DEFAULT_BAUD_RATE
+    action: str = ACTION_TOWER
+    tower: Optional[str] = None
+    tower_port: int = DEFAULT_PORT
+    protocol: Optional[str] = None
+    detected: str = 'blue'      # Tower state on "Motion detected!"
+    ended: str = 'green'        # Tower state on "Motion ended!"
+    name: Optional[str] = None  # Label used in logs (defaults to the port)
+    zone: Optional[str] = None  # Occupancy zone (defaults to the name)
+
+    def __post_init__(self) -> None:
+        if self.action not in ACTIONS:
+            raise ValueError(f"{self.port}: unknown action '{self.action}'. Choose from: {', '.join(ACTIONS)}")
+        if self.action == ACTION_TOWER and not self.tower:
+            raise ValueError(f"{self.port}: action 'tower' needs a 'tower' IP")
+        resolve_state(self.detected)
+        resolve_state(self.ended)
+        if self.name is None:
+            self.name = self.port
+        if self.zone is None:
+            self.zone = self.name
+
+
+@dataclass
+class HubConfig:
+    """Everything in a hub config file."""
+    ports: List[PortConfig]
+    zones: Dict[str, ZoneSettings] = field(default_factory=dict)
+    latency_report: Optional[str] = None
+
+
+def load_config(path: str) -> HubConfig:
+    """Read and validate a hub config file."""
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('ports'), list):
+        raise ValueError(f"{path}: expected an object with a 'ports' list")
+    if not data['ports']:
+        raise ValueError(f"{path}: the 'ports' list is empty")
+    configs = []
+    for entry in data['ports']:
+        try:
+            configs.append(PortConfig(**entry))
+        except TypeError as e:
+            raise ValueError(f"{path}: invalid port entry {entry!r}: {e}") from None
+    ports = [c.port for c in configs]
+    if len(set(ports)) != len(ports):
+        raise ValueError(f"{path}: a serial port is listed more than once")
+    zones = {}
+    for name, settings in data.get('zones', {}).items():
+        try:
+            zones[name] = ZoneSettings(**settings)
+        except TypeError as e:
+            raise ValueError(f"{path}: invalid zone '{name}': {e}") from None
+    return HubConfig(configs, zones, data.get('latency_report'))
+
+
+class SensorPort:
+    """One motion serial port: its connection, line buffer and reconnect timer."""
+
+    def __init__(self, config: PortConfig, dispatcher: Optional[TowerDispatcher]) -> None:
+        self.config = config
+        self.dispatcher = dispatcher
+        self.serial: Optional[serial.Serial] = None
+        self.buffer = b''
+        self.next_attempt = 0.0     # Monotonic time of the next reconnect attempt
+
+    def open(self) -> bool:
+        """Try to open the port non-blocking; schedule a retry on failure."""
+        try:
+            self.serial = serial.Serial(self.config.port, self.config.baud, timeout=0)
+        except serial.SerialException as e:
+            logger.warning(f"[{self.config.name}] Unable to open {self.config.port}: {e}")
+            self.next_attempt = time.monotonic() + RETRY_DELAY
+            return False
+        self.buffer = b''
+        logger.info(f"[{self.config.name}] Connected to {self.config.port}")
+        return True
+
+    def close(self) -> None:
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except serial.SerialException:
+                pass
+            self.serial = None
+        self.next_attempt = time.monotonic() + RETRY_DELAY
+
+    def read_lines(self) -> List[Tuple[str, float]]:
+        """Read whatever has arrived and return the complete lines with their arrival time."""
+        data = self.serial.read(self.serial.in_waiting or 1)
+        arrived = time.monotonic()
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b'\n')
+        if len(self.buffer) > MAX_LINE_LENGTH:
+            logger.debug(f"[{self.config.name}] Discarding overlong partial line")
+            self.buffer = b''
+        decoded = []
+        for line in lines:
+            try:
+                text = line.decode().strip()
+            except UnicodeDecodeError as e:
+                logger.warning(f"[{self.config.name}] Failed to decode serial data: {e}")
+                continue
+            if text:
+                decoded.append((text, arrived))
+        return decoded
+
+    def parse_line(self, line: str) -> Optional[bool]:
+        """True/False for a motion detected/ended message, None for anything else."""
+        if line == MOTION_DETECTED:
+            detected = True
+        elif line == MOTION_ENDED:
+            detected = False
+        else:
+            logger.debug(f"[{self.config.name}] Received unknown serial message: {line}")
+            return None
+        logger.debug(f"[{self.config.name}] {line}")
+        return detected
+
+
+class MotionHub:
+    """Multiplexes every configured port over one selector."""
+
+    def __init__(self, config: HubConfig) -> None:
+        self.selector = selectors.DefaultSelector()
+        self.latency = LatencyTracker(config.latency_report)
+        self.dispatchers: Dict[Tuple[str, int], TowerDispatcher] = {}
+        self.ports = [SensorPort(c, self._dispatcher_for(c)) for c in config.ports]
+        self.watcher = PortWatcher()
+        if self.watcher.available:
+            for port in self.ports:
+                self.watcher.watch(port.config.port)
+            self.selector.register(self.watcher.fileno(), selectors.EVENT_READ, self.watcher)
+        self.zones: Dict[str, MotionZone] = {}
+        self.zone_ports: Dict[str, List[SensorPort]] = {}
+        for port in self.ports:
+            name = port.config.zone
+            if name not in self.zones:
+                self.zones[name] = MotionZone(name, config.zones.get(name))
+                self.zone_ports[name] = []
+            self.zone_ports[name].append(port)
+        self._running = False
+
+    def _dispatcher_for(self, config: PortConfig) -> Optional[TowerDispatcher]:
+        # Sensors that share a tower share its dispatcher (and connection)
+        if config.action != ACTION_TOWER:
+            return None
+        key = (config.tower, config.tower_port)
+        if key not in self.dispatchers:
+            self.dispatchers[key] = TowerDispatcher(
+                config.tower, config.tower_port, config.protocol, on_done=self.latency.on_dispatched
+            )
+        return self.dispatchers[key]
+
+    def _wait_for_node(self, port: SensorPort) -> None:
+        # No point retrying a missing node: the watcher says when it is back
+        if self.watcher.available and not os.path.exists(port.config.port):
+            logger.info(f"[{port.config.name}] Waiting for {port.config.port} to be plugged in")
+            port.next_attempt = float('inf')
+
+    def _connect(self, port: SensorPort) -> None:
+        if port.open():
+            self.selector.register(port.serial.fileno(), selectors.EVENT_READ, port)
+        else:
+            self._wait_for_node(port)
+
+    def _disconnect(self, port: SensorPort, reason: Exception) -> None:
+        logger.warning(f"[{port.config.name}] Lost connection ({reason})")
+        if port.serial is not None:
+            self.selector.unregister(port.serial.fileno())
+        port.close()
+        self._wait_for_node(port)
+        # A sensor that cannot report "Motion ended!" must not hold its zone occupied
+        zone = self.zones[port.config.zone]
+        now = time.monotonic()
+        change = zone.remove(port.config.name, now)
+        if change is not None:
+            self._apply(zone, change, port.config.name, "disconnected", now)
+
+    def _port_events(self) -> None:
+        """Schedule an immediate reconnect for ports whose node (re)appeared."""
+        for path, present in self.watcher.read_events():
+            for port in self.ports:
+                if port.config.port == path and present and port.serial is None:
+                    port.next_attempt = time.monotonic()
+
+    def _reconnect_due(self) -> Optional[float]:
+        """Connect ports whose retry time has come; return seconds until the next one."""
+        now = time.monotonic()
+        waits = []
+        for port in self.ports:
+            if port.serial is not None:
+                continue
+            if port.next_attempt <= now:
+                self._connect(port)
+            if port.serial is None and port.next_attempt != float('inf'):
+                waits.append(port.next_attempt - now)
+        return max(min(waits), 0.0) if waits else None
+
+    def _apply(self, zone: MotionZone, occupied: bool, sensor: str, message: str, arrived: float) -> None:
+        """Send a zone's new occupancy to each of its towers once."""
+        logger.info(f"[{zone.name}] {'Occupied' if occupied else 'Clear'} ({sensor}: {message})")
+        seen = set()
+        for port in self.zone_ports[zone.name]:
+            if port.dispatcher is None or id(port.dispatcher) in seen:
+                continue
+            seen.add(id(port.dispatcher))
+            state = port.config.detected if occupied else port.config.ended
+            port.dispatcher.submit(state, self.latency.start(sensor, port.config.tower, message, arrived))
+
+    def _handle(self, port: SensorPort, line: str, arrived: float) -> None:
+        detected = port.parse_line(line)
+        if detected is None:
+            return
+        zone = self.zones[port.config.zone]
+        change = zone.update(port.config.name, detected, arrived)
+        if change is not None:
+            self._apply(zone, change, port.config.name, line, arrived)
+
+    def _zones_due(self) -> Optional[float]:
+        """Report zones whose hold-off has expired; return seconds until the next one."""
+        now = time.monotonic()
+        waits = []
+        for zone in self.zones.values():
+            if zone.poll(now) is False:
+                self._apply(zone, False, zone.name, "hold-off expired", now)
+            deadline = zone.next_deadline()
+            if deadline is not None:
+                waits.append(deadline - now)
+        return max(min(waits), 0.0) if waits else None
+
+    def stop(self) -> None:
+        self._running = False
+
+    def run(self) -> None:
+        """Serve every port until stop() is called or the process is interrupted."""
+        self._running = True
+        logger.info(f"Watching {len(self.ports)} motion port(s)")
+        try:
+            while self._running:
+                timeouts = [t for t in (self._reconnect_due(), self._zones_due()) if t is not None]
+                timeout = min(timeouts) if timeouts else None
+                if not self.selector.get_map():
+                    # Nothing is connected and there is no watcher; just wait for the next retry
+                    time.sleep(FALLBACK_INTERVAL if timeout is None else timeout)
+                    continue
+                for key, _ in self.selector.select(timeout):
+                    if key.data is self.watcher:
+                        self._port_events()
+                        continue
+                    port = key.data
+                    try:
+                        for line, arrived in port.read_lines():
+                            self._handle(port, line, arrived)
+                    except (serial.SerialException, OSError) as e:
+                        self._disconnect(port, e)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for port in self.ports:
+            if port.serial is not None:
+                self.selector.unregister(port.serial.fileno())
+                port.close()
+        for dispatcher in self.dispatchers.values():
+            dispatcher.close(timeout=RETRY_DELAY)
+        self.latency.export()
+        self.watcher.close()
+        self.selector.close()
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Watch several PIR serial ports and drive their signal towers",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument('-c', '--config', default=DEFAULT_CONFIG, help="JSON port/tower map")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log every serial message")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        logger.error(f"Invalid config: {e}")
+        sys.exit(1)
+
+    try:
+        MotionHub(config).run()
+    except KeyboardInterrupt:
+        logger.info("Motion hub stopped by user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Motion Latency - Trace how long a motion event takes to reach the tower.
+
+Each event is stamped when its serial line arrives, when the tower command is
+issued and when the tower acknowledges it, which splits the delay into:
+
+    queue  - arrival -> issue (dispatcher queue, connect/protocol detection)
+    tower  - issue -> ACK (network and device)
+    total  - arrival -> ACK (what people walking in actually see)
+
+Distributions are kept per (sensor, tower) pair and periodically written to a
+JSON report, which this script can also print.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from timing_report import percentile
+
+logger = logging.getLogger(__name__)
+
+# Constants
+MAX_SAMPLES = 5000          # Traces kept per (sensor, tower) for the percentiles
+REPORT_INTERVAL = 60.0      # Seconds between report file rewrites
+
+
+@dataclass
+class MotionTrace:
+    """Timestamps (monotonic seconds) of one motion event on its way to a tower."""
+    sensor: str
+    tower: str
+    event: str
+    arrived: float
+    issued: Optional[float] = None
+    acked: Optional[float] = None
+    error: Optional[str] = None
+    superseded: bool = False
+
+
+class LatencyTracker:
+    """
+    Collects settled traces and reports latency percentiles.
+
+    Pass on_dispatched as a TowerDispatcher's on_done callback and submit each
+    state together with the MotionTrace from start().
+    """
+
+    def __init__(self, path: Optional[str] = None, interval: float = REPORT_INTERVAL) -> None:
+        self.path = path
+        self.interval = interval
+        self._traces: Dict[Tuple[str, str], Deque[MotionTrace]] = {}
+        self._counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._last_export = time.monotonic()
+
+    def start(self, sensor: str, tower: str, event: str, arrived: Optional[float] = None) -> MotionTrace:
+        """Begin a trace for an event whose serial line arrived at `arrived`."""
+        return MotionTrace(sensor, tower, event, time.monotonic() if arrived is None else arrived)
+
+    def on_dispatched(
+        self,
+        trace: MotionTrace,
+        issued: Optional[float],
+        acked: Optional[float],
+        error: Optional[Exception]
+    ) -> None:
+        """TowerDispatcher callback: fill in the trace and record it."""
+        trace.issued = issued
+        trace.acked = acked
+        trace.error = str(error) if error is not None else None
+        trace.superseded = issued is None and error is None
+        self.record(trace)
+
+    def record(self, trace: MotionTrace) -> None:
+        key = (trace.sensor, trace.tower)
+        with self._lock:
+            if key not in self._traces:
+                self._traces[key] = deque(maxlen=MAX_SAMPLES)
+                self._counts[key] = {"events": 0, "failed": 0, "superseded": 0}
+            counts = self._counts[key]
+            counts["events"] += 1
+            if trace.superseded:
+                counts["superseded"] += 1
+            elif trace.error is not None:
+                counts["failed"] += 1
+            else:
+                self._traces[key].append(trace)
+        if trace.acked is not None:
+            logger.debug(f"[{trace.sensor} -> {trace.tower}] {trace.event}: "
+                         f"{(trace.acked - trace.arrived) * 1000:.1f} ms to ACK")
+        if self.path and time.monotonic() - self._last_export >= self.interval:
+            self.export()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per (sensor, tower) counts and latency percentiles in seconds."""
+        rows = []
+        with self._lock:
+            items = [(key, list(traces), dict(self._counts[key])) for key, traces in self._traces.items()]
+        for (sensor, tower), traces, counts in sorted(items):
+            row: Dict[str, Any] = {"sensor": sensor, "tower": tower, **counts}
+            for name, values in (
+                ("queue", [t.issued - t.arrived for t in traces]),
+                ("tower", [t.acked - t.issued for t in traces]),
+                ("total", [t.acked - t.arrived for t in traces]),
+            ):
+                row[f"{name}_p50"] = percentile(values, 50)
+                row[f"{name}_p95"] = percentile(values, 95)
+                row[f"{name}_max"] = max(values) if values else None
+            rows.append(row)
+        return rows
+
+    def export(self) -> None:
+        """Rewrite the report file atomically."""
+        self._last_export = time.monotonic()
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"generated": time.time(), "pairs": self.summary()}, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.error(f"Failed to write latency report {self.path}: {e}")
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value * 1000:.1f}" if value is not None else "n/a"
+
+
+def format_summary(rows: List[Dict[str, Any]]) -> str:
+    """Render summary rows as a table of milliseconds."""
+    lines = [f"{'Sensor':<16} {'Tower':<16} {'Events':>6} {'Fail':>4} {'Drop':>4}  "
+             f"{'queue p50/p95':>15}  {'tower p50/p95':>15}  {'total p50/p95/max':>22}"]
+    for r in rows:
+        lines.append(
+            f"{r['sensor']:<16} {r['tower']:<16} {r['events']:>6} {r['failed']:>4} {r['superseded']:>4}  "
+            f"{_ms(r['queue_p50']) + '/' + _ms(r['queue_p95']):>15}  "
+            f"{_ms(r['tower_p50']) + '/' + _ms(r['tower_p95']):>15}  "
+            f"{_ms(r['total_p50']) + '/' + _ms(r['total_p95']) + '/' + _ms(r['total_max']):>22}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print a motion-to-light latency report")
+    parser.add_argument('report', help="JSON report written by motion_monitor or motion_hub")
+    args = parser.parse_args()
+    try:
+        with open(args.report) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot read {args.report}: {e}")
+        sys.exit(1)
+    print(f"Latency (ms) as of {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data['generated']))}")
+    print(format_summary(data["pairs"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,18 @@
 
 # Standard imports
 import serial
-import subprocess
 import sys
 import os
 import time
 import logging
 from logging.handlers import RotatingFileHandler
-from typing import Optional
+from typing import Optional, Tuple
+
+from motion_latency import LatencyTracker
+from motion_store import MotionStore
+from motion_zone import MotionZone, ZoneSettings
+from port_watcher import PortWatcher
+from signal_tower import DEFAULT_PORT, TowerDispatcher
 
 # -----------------------------
 # Configuration Section
@@ -18,20 +23,36 @@ from typing import Optional
 SERIAL_PORT = '/dev/ttyACM0'
 BAUD_RATE = 9600  # Communication speed with the device
 
-# Path to the LED control script (ensure this exists)
-SCRIPT_PATH = '/home/jazzeryj/jazzeryj/new_la6.py'
+# Signal tower driven by motion events
+TOWER_IP = '172.18.3.200'
+TOWER_PORT = DEFAULT_PORT
+
+# Named tower states (signal_tower.NAMED_STATES), same as the old T 11 / T 10 codes:
+LED_BLUE = 'blue'    # Motion detected
+LED_GREEN = 'green'  # Motion ended
 
-# LED command codes used by the controller script:
-LED_BLUE = '11'   # Code to activate blue LED
-LED_GREEN = '10'  # Code to activate green LED
+# Occupancy smoothing (see motion_zone.py): the first detection switches the
+# tower at once, but it only returns to green once there has been no motion
+# for HOLD_OFF seconds and the tower has shown blue for at least MIN_ON_TIME.
+MIN_ON_TIME = 30  # Seconds
+HOLD_OFF = 10     # Seconds
 
-# Reconnection settings in case the serial connection drops
+# Reconnection settings in case the serial connection drops. While the device
+# node is missing we wait for it to be plugged back in (port_watcher) instead;
+# these delays only apply when the node exists but cannot be opened.
 MAX_RECONNECT_ATTEMPTS = 5
-RETRY_DELAY = 10  # Wait 10 seconds before retrying
+RETRY_DELAY = 10  # Wait up to 10 seconds before retrying
 
 # Log file path
 LOG_FILENAME = '/home/jazzeryj/logs/controller_app.log'
 
+# Binary motion event store (see motion_store.py for the occupancy report)
+EVENT_STORE = '/home/jazzeryj/logs/motion_events.bin'
+SENSOR_NAME = os.path.basename(SERIAL_PORT)
+
+# Motion-to-light latency report (print it with motion_latency.py)
+LATENCY_REPORT = '/home/jazzeryj/logs/motion_latency.json'
+
 # Delay between full reconnection attempts when everything fails
 FULL_RESTART_DELAY = 30  # Seconds
 
@@ -57,61 +78,55 @@ logging.basicConfig(
 # Function Definitions
 # -----------------------------
 
-def run_led_script(command_code: str) -> None:
-    """
-    Runs the LED control script with the specified command code.
-    
-    The script expects a command code like '10' or '11' to determine which LED to turn on.
-
-    Args:
-        command_code (str): A string representing the LED action.
-    """
-    if not os.path.exists(SCRIPT_PATH):
-        logging.error(f"LED control script not found at: {SCRIPT_PATH}")
-        return
-
-    try:
-        result = subprocess.run([
-            sys.executable, SCRIPT_PATH, 'T', command_code
-        ],
-        check=True,
-        capture_output=True,
-        text=True,
-        timeout=30  # Fail if the script doesn't finish within 30 seconds
-        )
-
-        logging.debug(f"Script output: {result.stdout}")
-
-    except subprocess.CalledProcessError as e:
-        logging.error(f"LED script failed (exit code {e.returncode}): {e.stderr}")
-    except subprocess.TimeoutExpired:
-        logging.error("LED script execution timed out")
-    except Exception as e:
-        logging.exception(f"Unexpected error occurred: {e}")
-
-
-def read_serial_data(connection: serial.Serial) -> Optional[str]:
+def read_serial_data(connection: serial.Serial) -> Tuple[Optional[str], float]:
     """
     Read one line from the serial device.
 
     Returns:
-        Optional[str]: A decoded message string, or None if an error occurred.
+        Tuple[Optional[str], float]: The decoded message string (None if an
+        error occurred) and the monotonic time the line arrived.
     """
     try:
-        line = connection.readline().decode().strip()
+        raw = connection.readline()
+        arrived = time.monotonic()
+        line = raw.decode().strip()
         if line:
             logging.debug(f"Serial received: {line}")
-        return line
+        return line, arrived
 
     except UnicodeDecodeError as e:
         logging.warning(f"Failed to decode serial data: {e}")
-        return None
+        return None, arrived
     except serial.SerialTimeoutException:
         logging.debug("Serial read timeout - no new data.")
-        return None
+        return None, time.monotonic()
+
+
+def record_event(store: MotionStore, detected: bool, arrived: float) -> None:
+    """Append a motion edge to the event store; a storage error is logged, never fatal."""
+    try:
+        store.append(SENSOR_NAME, detected, mono=arrived)
+    except (OSError, ValueError) as e:  # ValueError: e.g. a corrupt sensors.json
+        logging.error(f"Failed to record motion event: {e}")
+
+
+def wait_for_port(watcher: PortWatcher, timeout: float) -> None:
+    """
+    Wait before the next connection attempt.
+
+    A missing device node is waited for until it reappears, so a replugged
+    Arduino is reopened as soon as udev creates it. Otherwise wait up to
+    `timeout` seconds (cut short if the node changes, e.g. its permissions).
+    """
+    if watcher.available and not os.path.exists(SERIAL_PORT):
+        logging.info(f"{SERIAL_PORT} is not present; waiting for the device to be plugged in...")
+        watcher.wait_for(SERIAL_PORT)
+    else:
+        logging.info(f"Retrying in {timeout} seconds...")
+        watcher.wait_for(SERIAL_PORT, timeout)
 
 
-def connect_to_serial() -> Optional[serial.Serial]:
+def connect_to_serial(watcher: PortWatcher) -> Optional[serial.Serial]:
     """
     Attempt to connect to the serial device.
     
@@ -130,8 +145,7 @@ def connect_to_serial() -> Optional[serial.Serial]:
             attempts += 1
             logging.error(f"Connection attempt {attempts} failed: {e}")
             if attempts < MAX_RECONNECT_ATTEMPTS:
-                logging.info(f"Retrying in {RETRY_DELAY} seconds...")
-                time.sleep(RETRY_DELAY)
+                wait_for_port(watcher, RETRY_DELAY)
 
     logging.warning("Unable to connect after maximum retries. Retrying later...")
     return None
@@ -154,30 +168,60 @@ def main() -> None:
     """
     logging.info("Starting motion detection LED service...")
 
+    # Tower updates are sent from a background thread over one kept-open
+    # connection, so a slow or unreachable tower never holds up serial reads.
+    latency = LatencyTracker(LATENCY_REPORT)
+    dispatcher = TowerDispatcher(TOWER_IP, TOWER_PORT, on_done=latency.on_dispatched)
+    event_store = MotionStore(EVENT_STORE)
+    zone = MotionZone(SENSOR_NAME, ZoneSettings(MIN_ON_TIME, HOLD_OFF))
+
+    # Watches the port while waiting to reconnect; wait_for() ignores the
+    # events queued while the port was in use
+    watcher = PortWatcher()
+
     while True:
-        serial_connection = connect_to_serial()
+        serial_connection = connect_to_serial(watcher)
         if not serial_connection:
-            logging.warning(f"Waiting {FULL_RESTART_DELAY} seconds before trying again...")
-            time.sleep(FULL_RESTART_DELAY)
+            wait_for_port(watcher, FULL_RESTART_DELAY)
             continue
 
         try:
             while True:
-                line = read_serial_data(serial_connection)
+                # readline() times out every second, which also drives the hold-off timer
+                line, arrived = read_serial_data(serial_connection)
+                change = None
 
                 if line == "Motion detected!":
-                    logging.info("Motion detected - Activating Blue LED")
-                    run_led_script(LED_BLUE)
+                    logging.debug("Motion detected")
+                    change = zone.update(SENSOR_NAME, True, arrived)
+                    record_event(event_store, detected=True, arrived=arrived)
 
                 elif line == "Motion ended!":
-                    logging.info("Motion ended - Activating Green LED")
-                    run_led_script(LED_GREEN)
+                    logging.debug("Motion ended")
+                    change = zone.update(SENSOR_NAME, False, arrived)
+                    record_event(event_store, detected=False, arrived=arrived)
 
                 elif line:
                     logging.debug(f"Received unknown serial message: {line}")
 
+                if change is None:
+                    change = zone.poll()
+
+                if change is True:
+                    logging.info("Motion detected - Activating Blue LED")
+                    dispatcher.submit(LED_BLUE, latency.start(SENSOR_NAME, TOWER_IP, line, arrived))
+                elif change is False:
+                    logging.info("Area clear - Activating Green LED")
+                    dispatcher.submit(LED_GREEN, latency.start(SENSOR_NAME, TOWER_IP, "Area clear"))
+
         except serial.SerialException:
             logging.warning("Lost connection to serial device. Restarting connection...")
+            # The sensor cannot report "Motion ended!" while it is gone, and the
+            # reconnect wait below cannot run the hold-off timer: clear the zone now
+            zone.remove(SENSOR_NAME)
+            if zone.vacate_at is not None and zone.poll(zone.vacate_at) is False:
+                logging.info("Area clear - Activating Green LED")
+                dispatcher.submit(LED_GREEN, latency.start(SENSOR_NAME, TOWER_IP, "Sensor disconnected"))
         finally:
             serial_connection.close()
 
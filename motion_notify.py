@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Motion Notify - Background, coalescing delivery of motion alerts.
+
+Alerts are queued by the serial reader and delivered by one worker thread.
+An alert reaching a sink that has been quiet for COALESCE_WINDOW goes out at
+once; alerts following it are merged into a single message ("5 motion events
+in 10 s"), and each sink is written to at most once per MIN_INTERVAL;
+anything arriving meanwhile goes out in its next batch.
+Sinks write directly to terminals, syslog or a file, so nothing is forked
+per event.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import pwd
+import queue
+import stat
+import syslog
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Constants
+COALESCE_WINDOW = 10.0      # Seconds to gather alerts into one message
+MIN_INTERVAL = 30.0         # Minimum seconds between two messages to one sink
+TTY_PATTERNS = ('/dev/pts/[0-9]*', '/dev/tty[0-9]*')
+
+Event = Tuple[float, str]   # (wall-clock time, message)
+
+
+def format_batch(events: List[Event]) -> str:
+    """Merge queued alerts into one message."""
+    if len(events) == 1:
+        return events[0][1]
+    first, last = events[0][0], events[-1][0]
+    return (f"MOTION ALERT: {len(events)} motion events in {last - first:.0f} s "
+            f"({datetime.fromtimestamp(first):%H:%M:%S} - {datetime.fromtimestamp(last):%H:%M:%S})")
+
+
+class Sink:
+    """Somewhere to deliver alerts. Subclasses implement send()."""
+    name = 'sink'
+
+    def send(self, message: str) -> None:
+        raise NotImplementedError
+
+
+class TtySink(Sink):
+    """Write to every terminal a user is logged in on, like write(1) without the fork."""
+
+    def __init__(self, user: str) -> None:
+        self.user = user
+        self.name = f"tty:{user}"
+
+    def terminals(self) -> List[str]:
+        """The user's terminals that accept messages (mesg y)."""
+        try:
+            uid = pwd.getpwnam(self.user).pw_uid
+        except KeyError:
+            logger.warning(f"Unknown user '{self.user}'")
+            return []
+        found = []
+        for pattern in TTY_PATTERNS:
+            for path in glob.glob(pattern):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if st.st_uid == uid and st.st_mode & stat.S_IWGRP:
+                    found.append(path)
+        return found
+
+    def send(self, message: str) -> None:
+        text = f"\r\n{message}\r\n".encode()
+        for path in self.terminals():
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_NOCTTY | os.O_NONBLOCK)
+            except OSError as e:
+                logger.debug(f"Cannot open {path}: {e}")
+                continue
+            try:
+                os.write(fd, text)
+            except OSError as e:
+                logger.debug(f"Cannot write to {path}: {e}")
+            finally:
+                os.close(fd)
+
+
+class SyslogSink(Sink):
+    """Send alerts to the system log."""
+    name = 'syslog'
+
+    def __init__(self, ident: str = 'motion-alert', priority: int = syslog.LOG_WARNING) -> None:
+        self.priority = priority
+        syslog.openlog(ident, 0, syslog.LOG_USER)
+
+    def send(self, message: str) -> None:
+        syslog.syslog(self.priority, message)
+
+
+class FileSink(Sink):
+    """Append alerts to a file, one timestamped line each."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.name = f"file:{path}"
+
+    def send(self, message: str) -> None:
+        with open(self.path, 'a') as f:
+            f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S} {message}\n")
+
+
+class _SinkState:
+    """Alerts waiting for one sink and when it last received a message."""
+
+    def __init__(self, sink: Sink) -> None:
+        self.sink = sink
+        self.pending: List[Event] = []
+        self.first_queued = 0.0     # Monotonic time the oldest pending alert arrived
+        self.last_sent = float('-inf')
+
+    def due(self, window: float, min_interval: float) -> Optional[float]:
+        """Monotonic time this sink's batch should go out, or None if empty."""
+        if not self.pending:
+            return None
+        if self.first_queued >= self.last_sent + max(window, min_interval):
+            # The sink was quiet: the first alert goes out at once
+            return self.first_queued
+        return max(self.first_queued + window, self.last_sent + min_interval)
+
+
+class NotificationWorker:
+    """Queue alerts and deliver them to the sinks from a background thread."""
+
+    def __init__(
+        self,
+        sinks: List[Sink],
+        window: float = COALESCE_WINDOW,
+        min_interval: float = MIN_INTERVAL
+    ) -> None:
+        self.window = window
+        self.min_interval = min_interval
+        self._states = [_SinkState(s) for s in sinks]
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="motion-notify", daemon=True)
+        self._thread.start()
+
+    def notify(self, message: str) -> None:
+        """Queue an alert; never blocks."""
+        self._queue.put((time.time(), message))
+
+    def _deliver(self, state: _SinkState) -> None:
+        message = format_batch(state.pending)
+        state.pending = []
+        state.last_sent = time.monotonic()
+        try:
+            state.sink.send(message)
+        except Exception as e:
+            logger.error(f"Failed to deliver alert to {state.sink.name}: {e}")
+
+    def _run(self) -> None:
+        while True:
+            deadlines = [d for d in (s.due(self.window, self.min_interval) for s in self._states) if d is not None]
+            timeout = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            try:
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                event = False
+
+            if event is None:
+                # close(): flush whatever is left and stop
+                for state in self._states:
+                    if state.pending:
+                        self._deliver(state)
+                return
+
+            if event:
+                now = time.monotonic()
+                for state in self._states:
+                    if not state.pending:
+                        state.first_queued = now
+                    state.pending.append(event)
+
+            now = time.monotonic()
+            for state in self._states:
+                due = state.due(self.window, self.min_interval)
+                if due is not None and due <= now:
+                    self._deliver(state)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Deliver pending alerts and stop the worker."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+def build_sinks(ttys: List[str], use_syslog: bool, files: List[str]) -> List[Sink]:
+    """Create sinks from command-line style options."""
+    sinks: List[Sink] = [TtySink(user) for user in ttys]
+    if use_syslog:
+        sinks.append(SyslogSink())
+    sinks.extend(FileSink(path) for path in files)
+    return sinks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Send a test motion alert through the notification sinks")
+    parser.add_argument('message', nargs='?', default="MOTION ALERT: test message")
+    parser.add_argument('--tty', action='append', default=[], metavar='USER', help="Write to USER's terminals")
+    parser.add_argument('--syslog', action='store_true', help="Log to syslog")
+    parser.add_argument('--file', action='append', default=[], metavar='PATH', help="Append to PATH")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    sinks = build_sinks(args.tty, args.syslog, args.file)
+    if not sinks:
+        parser.error("choose at least one sink (--tty, --syslog or --file)")
+    worker = NotificationWorker(sinks, window=0)
+    worker.notify(args.message)
+    worker.close()
+
+
+if __name__ == "__main__":
+    main()
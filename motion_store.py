@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Motion Store - Append-only binary log of motion edges with occupancy analytics.
+
+Every "Motion detected!" / "Motion ended!" edge is stored as one fixed-width
+20-byte record (wall time, monotonic time, sensor id, edge), so a year of
+events from many sensors is a few megabytes that NumPy maps straight into a
+structured array. Sensor names are mapped to ids in a small JSON sidecar
+(`<store>.sensors.json`).
+
+Analytics: dwell durations (detected -> ended), detections per hour of day,
+and the busiest sliding window.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import struct
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from temp_store import local_offsets
+
+# Constants
+DEFAULT_STORE = '/home/jazzeryj/logs/motion_events.bin'
+RECORD_FORMAT = '<ddHBx'    # wall time, monotonic time, sensor id, edge, pad
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+RECORD_DTYPE = np.dtype([
+    ('wall', '<f8'),
+    ('mono', '<f8'),
+    ('sensor', '<u2'),
+    ('edge', 'u1'),
+    ('pad', 'u1'),
+])
+
+EDGE_ENDED = 0
+EDGE_DETECTED = 1
+
+
+class MotionStore:
+    """An append-only file of motion edges."""
+
+    def __init__(self, path: str = DEFAULT_STORE) -> None:
+        self.path = path
+        self.sensor_path = f"{path}.sensors.json"
+        self._sensor_ids: Dict[str, int] = {}
+        self._file = None
+
+    # -- sensor ids ---------------------------------------------------------
+
+    def _read_sensors(self) -> Dict[str, int]:
+        try:
+            with open(self.sensor_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def sensor_id(self, name: str) -> int:
+        """Id for a sensor name, registering it on first use."""
+        if name not in self._sensor_ids:
+            os.makedirs(os.path.dirname(os.path.abspath(self.sensor_path)), exist_ok=True)
+            # Lock so that several writers never hand out the same id twice
+            with open(self.sensor_path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                content = f.read()
+                sensors = json.loads(content) if content else {}
+                if name not in sensors:
+                    sensors[name] = len(sensors)
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(sensors, f, indent=2)
+                    f.flush()
+            self._sensor_ids = sensors
+        return self._sensor_ids[name]
+
+    def sensors(self) -> Dict[int, str]:
+        """Map of sensor id to name."""
+        return {i: name for name, i in self._read_sensors().items()}
+
+    # -- writing -------------------------------------------------------------
+
+    def append(self, sensor: str, detected: bool, wall: Optional[float] = None, mono: Optional[float] = None) -> None:
+        """Record one edge. Each record is written with a single unbuffered write."""
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'ab', buffering=0)
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                size = os.fstat(self._file.fileno()).st_size
+                if size % RECORD_SIZE:
+                    # Drop a record torn by a crash so the records appended next stay aligned
+                    os.ftruncate(self._file.fileno(), size // RECORD_SIZE * RECORD_SIZE)
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+        record = struct.pack(
+            RECORD_FORMAT,
+            time.time() if wall is None else wall,
+            time.monotonic() if mono is None else mono,
+            self.sensor_id(sensor),
+            EDGE_DETECTED if detected else EDGE_ENDED,
+        )
+        self._file.write(record)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # -- reading -------------------------------------------------------------
+
+    def load(self) -> np.ndarray:
+        """Every record as a read-only structured array (memory-mapped)."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        count = size // RECORD_SIZE     # Ignore a torn record at the end
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+    def events(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        sensors: Optional[Sequence[str]] = None
+    ) -> np.ndarray:
+        """
+        Records with start <= wall time < end, optionally for some sensors only.
+
+        Records are appended in time order, so the time range is found with a
+        binary search rather than a scan.
+        """
+        records = self.load()
+        lo = 0 if start is None else np.searchsorted(records['wall'], start, side='left')
+        hi = len(records) if end is None else np.searchsorted(records['wall'], end, side='left')
+        records = records[lo:hi]
+        if sensors is not None:
+            ids = [i for i, name in self.sensors().items() if name in sensors]
+            records = records[np.isin(records['sensor'], ids)]
+        return records
+
+
+# -- analytics -----------------------------------------------------------------
+
+def dwell_durations(events: np.ndarray) -> Dict[int, np.ndarray]:
+    """
+    Seconds from each detected edge to the following ended edge, per sensor id.
+
+    Durations use the monotonic clock when both edges come from the same boot
+    and fall back to the wall clock otherwise.
+    """
+    result = {}
+    for sensor in np.unique(events['sensor']):
+        rows = events[events['sensor'] == sensor]
+        pairs = (rows['edge'][:-1] == EDGE_DETECTED) & (rows['edge'][1:] == EDGE_ENDED)
+        starts, ends = rows[:-1][pairs], rows[1:][pairs]
+        mono = ends['mono'] - starts['mono']
+        wall = ends['wall'] - starts['wall']
+        result[int(sensor)] = np.where((mono >= 0) & (np.abs(mono - wall) < 1.0), mono, wall)
+    return result
+
+
+def hourly_histogram(events: np.ndarray, utc_offset: Optional[float] = None) -> np.ndarray:
+    """
+    Detections per hour of day (24 bins).
+
+    utc_offset is in seconds; by default each event uses the host's offset at
+    its own time, so events across a DST change land in the right hour.
+    """
+    detected = events['wall'][events['edge'] == EDGE_DETECTED]
+    if utc_offset is None:
+        utc_offset = local_offsets(detected)
+    hours = ((detected + utc_offset) // 3600 % 24).astype(np.int64)
+    return np.bincount(hours, minlength=24)
+
+
+def busiest_window(events: np.ndarray, window: float) -> Optional[Tuple[float, int]]:
+    """Start time and detection count of the window-second span with the most detections."""
+    times = np.sort(events['wall'][events['edge'] == EDGE_DETECTED])
+    if len(times) == 0:
+        return None
+    counts = np.searchsorted(times, times + window, side='left') - np.arange(len(times))
+    best = int(np.argmax(counts))
+    return float(times[best]), int(counts[best])
+
+
+def parse_time(value: str) -> float:
+    """Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM[:SS]' local time to a timestamp."""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Invalid time '{value}'")
+
+
+def summarize(store: MotionStore, events: np.ndarray, window: float) -> List[str]:
+    """Printable occupancy report."""
+    names = store.sensors()
+    lines = [f"Events: {len(events)} ({int(np.sum(events['edge'] == EDGE_DETECTED))} detections)"]
+    for sensor, durations in sorted(dwell_durations(events).items()):
+        label = names.get(sensor, f"sensor {sensor}")
+        if len(durations):
+            lines.append(f"  {label}: {len(durations)} visits, dwell median {np.median(durations):.1f}s, "
+                         f"max {durations.max():.1f}s, total {durations.sum() / 3600:.2f}h")
+        else:
+            lines.append(f"  {label}: no complete visits")
+
+    histogram = hourly_histogram(events)
+    peak = max(int(histogram.max()), 1)
+    lines.append("Detections per hour:")
+    for hour, count in enumerate(histogram):
+        lines.append(f"  {hour:02d}:00 {'#' * round(count / peak * 40):<40} {count}")
+
+    busiest = busiest_window(events, window)
+    if busiest:
+        start, count = busiest
+        lines.append(f"Busiest {window:.0f}s window: {count} detections from "
+                     f"{datetime.fromtimestamp(start):%Y-%m-%d %H:%M:%S}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Occupancy report from the motion event store")
+    parser.add_argument('store', nargs='?', default=DEFAULT_STORE, help="Event store file")
+    parser.add_argument('--start', type=parse_time, help="Only events from this local time")
+    parser.add_argument('--end', type=parse_time, help="Only events before this local time")
+    parser.add_argument('--sensor', action='append', help="Only this sensor (repeatable)")
+    parser.add_argument('--window', type=float, default=3600, help="Busiest-window length in seconds")
+    args = parser.parse_args()
+
+    store = MotionStore(args.store)
+    if not os.path.exists(store.path):
+        print(f"Error: {store.path} does not exist")
+        sys.exit(1)
+    events = store.events(args.start, args.end, args.sensor)
+    print("\n".join(summarize(store, events, args.window)))
+
+
+if __name__ == "__main__":
+    main()
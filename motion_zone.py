@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Motion Zone - Host-side occupancy state machine for PIR sensors.
+
+The Arduino sketches only debounce for 50 ms, so a PIR retrigger flips the
+tower on every "Motion ended!"/"Motion detected!" pair. A MotionZone turns the
+raw edges of one or more sensors into occupancy transitions:
+
+  * the first detection in a vacant zone is reported immediately;
+  * the zone stays occupied while any of its sensors sees motion;
+  * after the last sensor ends, the zone is only reported vacant once
+    HOLD_OFF seconds have passed with no new detection, and never before it
+    has been occupied for MIN_ON_TIME seconds.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional, Set
+
+# Defaults
+MIN_ON_TIME = 30.0      # Seconds a zone stays occupied once reported
+HOLD_OFF = 10.0         # Seconds without motion before a zone is reported vacant
+
+
+@dataclass
+class ZoneSettings:
+    """Timing for one zone."""
+    min_on_time: float = MIN_ON_TIME
+    hold_off: float = HOLD_OFF
+
+    def __post_init__(self) -> None:
+        if self.min_on_time < 0 or self.hold_off < 0:
+            raise ValueError("min_on_time and hold_off must not be negative")
+
+
+class MotionZone:
+    """
+    Occupancy of one zone.
+
+    Feed it sensor edges with update() and call poll() when next_deadline()
+    passes; both return True/False when the zone becomes occupied/vacant and
+    None otherwise.
+    """
+
+    def __init__(self, name: str, settings: Optional[ZoneSettings] = None) -> None:
+        self.name = name
+        self.settings = settings or ZoneSettings()
+        self.occupied = False
+        self.active: Set[str] = set()           # Sensors currently seeing motion
+        self.occupied_since = 0.0
+        self.vacate_at: Optional[float] = None  # Monotonic time the zone will be reported vacant
+
+    def update(self, sensor: str, detected: bool, now: Optional[float] = None) -> Optional[bool]:
+        """Apply one sensor edge."""
+        now = time.monotonic() if now is None else now
+        if detected:
+            self.active.add(sensor)
+            self.vacate_at = None
+            if not self.occupied:
+                self.occupied = True
+                self.occupied_since = now
+                return True
+            return None
+
+        self.active.discard(sensor)
+        if self.occupied and not self.active:
+            self.vacate_at = max(now + self.settings.hold_off, self.occupied_since + self.settings.min_on_time)
+            return self.poll(now)
+        return None
+
+    def remove(self, sensor: str, now: Optional[float] = None) -> Optional[bool]:
+        """Forget a sensor that went away (e.g. its port dropped) as if its motion ended."""
+        if sensor not in self.active:
+            return None
+        return self.update(sensor, False, now)
+
+    def poll(self, now: Optional[float] = None) -> Optional[bool]:
+        """Report the zone vacant if its hold-off has expired."""
+        now = time.monotonic() if now is None else now
+        if self.vacate_at is not None and now >= self.vacate_at:
+            self.vacate_at = None
+            self.occupied = False
+            return False
+        return None
+
+    def next_deadline(self) -> Optional[float]:
+        """Monotonic time poll() should next be called, or None if nothing is pending."""
+        return self.vacate_at
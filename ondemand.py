@@ -1,45 +1,38 @@
 #!/usr/bin/env python3
 
 import serial
-import time
 import logging
 import argparse
+import json
 import os
+import sys
+import time
+from datetime import datetime
 
-# -------------------------------
-# Configure logging to file
-# -------------------------------
-logging.basicConfig(
-    filename='serial_communication.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-
-def communicate(device_name, command="R\n", baudrate=115200, timeout=1):
+from serial_session import SessionPool, device_path
+from temp_poller import TemperaturePoller
+
+def communicate(device_name, command="R\n", baudrate=115200, timeout=1, sessions=None):
     """
-    Connects to a serial port, sends a command, and returns the response.
+    Sends a command over the device's serial session and returns the response.
 
     Args:
-        device_name (str): Short device name (e.g., 'txpaa1')
+        device_name (str): Short device name (e.g., 'txpaa1') or port path
         command (str): Command to send (default is 'R\\n')
         baudrate (int): Communication speed
         timeout (int): Timeout in seconds
+        sessions (SessionPool): Sessions to reuse (a one-off pool if omitted)
 
     Returns:
         str or None: Response from the device or None if an error occurred
     """
-    device_path = f"/dev/{device_name}"
+    owned = sessions is None
+    if owned:
+        sessions = SessionPool(timeout=timeout)
 
     try:
-        with serial.Serial(device_path, baudrate, timeout=timeout) as ser:
-            time.sleep(2)  # Allow time for device to initialize
-
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-
-            ser.write(command.encode())     # Send command
-            response = ser.readline().decode().strip()  # Read response
+        session = sessions.get(device_name, baudrate)
+        response = session.query(command.encode())  # Send command and read response
 
         # Print and log using device_name
         print(f"{device_name}: {response}")
@@ -51,6 +44,80 @@ def communicate(device_name, command="R\n", baudrate=115200, timeout=1):
         print(error_msg)
         logging.error(error_msg)
         return None
+    finally:
+        if owned:
+            # A one-off pool must not leave the port open after the call
+            sessions.close_all()
+
+def create_poller(timeout=1):
+    """A poller that asks every device at once over kept-open sessions."""
+    return TemperaturePoller(SessionPool(), command=b"R\n", timeout=timeout, retry_count=1)
+
+def query_devices(poller, devices):
+    """
+    Queries every device at once and logs the replies.
+
+    Args:
+        poller (TemperaturePoller): Poller owning the kept-open sessions
+        devices (list): Device names or port paths
+
+    Returns:
+        list of PollResult: One result per device, in the order given
+    """
+    results = poller.poll(devices)
+    for result in results:
+        if result.response is None:
+            logging.error(f"Error with {result.device}: {result.error}")
+        else:
+            logging.info(f"{result.device}: {result.response}")
+    return results
+
+def format_table(results, timestamp):
+    """Readings as an aligned table."""
+    width = max([len(r.device) for r in results] + [len("DEVICE")])
+    lines = [f"{timestamp:%Y-%m-%d %H:%M:%S}", f"{'DEVICE':<{width}}  {'READING':<12}  LATENCY"]
+    for r in results:
+        reading = r.response if r.response is not None else f"ERROR: {r.error}"
+        lines.append(f"{r.device:<{width}}  {reading:<12}  {r.latency * 1000:.0f} ms")
+    return "\n".join(lines)
+
+def format_ndjson(results, timestamp):
+    """Readings as one JSON object per line."""
+    return "\n".join(json.dumps({
+        "time": timestamp.isoformat(timespec='seconds'),
+        "device": r.device,
+        "response": r.response,
+        "latency_ms": round(r.latency * 1000, 1),
+        "error": r.error,
+    }) for r in results)
+
+def watch(poller, devices, interval, ndjson=False):
+    """
+    Re-reads the devices every `interval` seconds over the same open sessions
+    until interrupted, redrawing the table (or streaming NDJSON).
+    """
+    redraw = not ndjson and sys.stdout.isatty()
+    while True:
+        started = time.monotonic()
+        results = query_devices(poller, devices)
+        now = datetime.now()
+        if ndjson:
+            print(format_ndjson(results, now), flush=True)
+        else:
+            if redraw:
+                print("\033[H\033[J", end="")   # Clear the screen
+            print(format_table(results, now) + "\n", flush=True)
+        time.sleep(max(0, started + interval - time.monotonic()))
+
+def positive_interval(value):
+    """argparse type for --watch: a number of seconds greater than zero."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid interval '{value}'") from None
+    if not seconds > 0:
+        raise argparse.ArgumentTypeError(f"interval must be greater than 0, got {value}")
+    return seconds
 
 def main():
     # -------------------------------
@@ -61,29 +128,70 @@ def main():
     )
     parser.add_argument(
         "device_name",
-        nargs='?',  # Makes this argument optional
-        help="Serial device name (e.g., txpaa1). If not provided, defaults to checking txpaa1, txpaa2, txpaa3"
+        nargs='*',  # Makes this argument optional
+        help="Serial device names (e.g., txpaa1). If not provided, defaults to checking txpaa1, txpaa2, txpaa3"
+    )
+    parser.add_argument(
+        "--watch",
+        type=positive_interval,
+        metavar="INTERVAL",
+        help="Keep the ports open and re-read the devices every INTERVAL seconds"
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Print one JSON object per reading instead of text"
     )
     args = parser.parse_args()
 
+    # -------------------------------
+    # Configure logging to file
+    # -------------------------------
+    logging.basicConfig(
+        filename='serial_communication.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
     # Determine which devices to check
     if args.device_name:
-        devices_to_check = [args.device_name]
+        devices_to_check = args.device_name
     else:
         devices_to_check = ["txpaa1", "txpaa2", "txpaa3"]
-        print("No device specified. Checking default devices:", ", ".join(devices_to_check))
+        if not args.ndjson:
+            print("No device specified. Checking default devices:", ", ".join(devices_to_check))
 
-    # Loop through each device and communicate
-    for device in devices_to_check:
-        device_path = f"/dev/{device}"
-
-        if not os.path.exists(device_path):
-            error_msg = f"Device {device_path} does not exist."
-            print(error_msg)
-            logging.error(error_msg)
-            continue
-
-        communicate(device)
+    # All devices are asked at once, so a run takes about as long as one read
+    poller = create_poller()
+    try:
+        if args.watch is not None:
+            watch(poller, devices_to_check, args.watch, args.ndjson)
+            return
+
+        present = []
+        for device in devices_to_check:
+            path = device_path(device)
+            if not os.path.exists(path):
+                error_msg = f"Device {path} does not exist."
+                print(error_msg)
+                logging.error(error_msg)
+                continue
+            present.append(device)
+
+        results = query_devices(poller, present)
+        if args.ndjson:
+            print(format_ndjson(results, datetime.now()))
+        else:
+            for result in results:
+                if result.response is None:
+                    print(f"Error with {result.device}: {result.error}")
+                else:
+                    print(f"{result.device}: {result.response}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.close()
 
 if __name__ == "__main__":
     main()
@@ -80,6 +80,7 @@ class PatliteController:
         """
         self.ip_address = ip_address
         self.port = port
+        self._session_sock: Optional[socket.socket] = None
     
     @contextmanager
     def _connection(self):
@@ -96,6 +97,20 @@ class PatliteController:
         finally:
             sock.close()
     
+    @contextmanager
+    def session(self):
+        """
+        Keep one connection open for every command sent inside the block.
+        
+        Without a session each command opens and closes its own connection.
+        """
+        with self._connection() as sock:
+            self._session_sock = sock
+            try:
+                yield self
+            finally:
+                self._session_sock = None
+    
     def _send_command(self, command: bytes) -> str:
         """
         Send a command to the Patlite device and return response.
@@ -110,6 +125,9 @@ class PatliteController:
             ConnectionError: If communication with the device fails
         """
         try:
+            if self._session_sock is not None:
+                self._session_sock.sendall(command)
+                return self._session_sock.recv(1024).decode('ascii').strip()
             with self._connection() as conn:
                 conn.sendall(command)
                 response = conn.recv(1024).decode('ascii').strip()
@@ -2,69 +2,116 @@
 """
 Patlite Transition Wrapper - Gradually transitions lights from green to amber to red.
 (Buzzer-free version)
+
+The light changes are worked out before the transition starts, and the tower
+is only sent a command at the instants its state actually changes, over one
+PatliteController session.
 """
 
-import subprocess
-import time
 import argparse
+import time
 from datetime import datetime, timedelta
+from typing import List, NamedTuple
+
+from patlite_control import FlashSpeed, LightState, PatliteController
 
 # Default configuration
 DEFAULT_IP = "192.168.1.100"  # Default Patlite IP
-SCRIPT_PATH = "./patlite_controller.py"  # Path to the control script
 DEFAULT_DURATION = 10  # Default duration in minutes
-UPDATE_INTERVAL = 5  # Seconds between updates
 
-def run_command(args):
-    """Run the patlite control command and return success status."""
+
+class TransitionStep(NamedTuple):
+    """Lights to show from a given fraction of the transition onwards."""
+    progress: float
+    red: LightState
+    yellow: LightState
+    green: LightState
+    flash_speed: FlashSpeed = FlashSpeed.MEDIUM
+
+
+ON, OFF, FLASH = LightState.ON, LightState.OFF, LightState.FLASH
+
+# Green → amber → red, switching each light once it passes 10% intensity
+# (the thresholds the original polling loop applied every 5 seconds).
+BASIC_STEPS = [
+    TransitionStep(0.00, OFF, OFF, ON),
+    TransitionStep(0.05, OFF, ON, ON),
+    TransitionStep(0.45, OFF, ON, OFF),
+    TransitionStep(0.55, ON, ON, OFF),
+    TransitionStep(0.95, ON, OFF, OFF),
+]
+
+# Same path, but the incoming light flashes first and speeds up as it takes over.
+FLASH_STEPS = [
+    TransitionStep(0.00, OFF, OFF, ON),
+    TransitionStep(0.05, OFF, FLASH, ON, FlashSpeed.SLOW),
+    TransitionStep(0.20, OFF, FLASH, ON, FlashSpeed.MEDIUM),
+    TransitionStep(0.35, OFF, FLASH, ON, FlashSpeed.FAST),
+    TransitionStep(0.45, OFF, ON, OFF),
+    TransitionStep(0.55, FLASH, ON, OFF, FlashSpeed.SLOW),
+    TransitionStep(0.70, FLASH, ON, OFF, FlashSpeed.MEDIUM),
+    TransitionStep(0.85, FLASH, ON, OFF, FlashSpeed.FAST),
+    TransitionStep(0.95, ON, OFF, OFF),
+]
+
+GRADATIONS = {
+    'basic': BASIC_STEPS,
+    'flash': FLASH_STEPS,
+}
+
+
+def build_schedule(duration: timedelta, steps: List[TransitionStep]) -> List[tuple]:
+    """
+    Turn transition steps into (offset seconds, step) pairs.
+
+    Steps that would not change what the tower shows are dropped, so every
+    entry in the schedule is a real state change.
+    """
+    total = duration.total_seconds()
+    schedule = []
+    for step in steps:
+        if schedule and step[1:] == schedule[-1][1][1:]:
+            continue
+        schedule.append((step.progress * total, step))
+    return schedule
+
+
+def apply_step(controller: PatliteController, step: TransitionStep) -> bool:
+    """Send one transition step to the tower and return success status."""
     try:
-        result = subprocess.run(
-            [SCRIPT_PATH] + args,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
+        return controller.control_lights(
+            red=step.red,
+            yellow=step.yellow,
+            green=step.green,
+            flash_speed=step.flash_speed
         )
-        print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error executing command: {e.stderr}")
+    except ConnectionError as e:
+        print(f"Error executing command: {e}")
         return False
 
-def calculate_transition_progress(start_time, duration):
-    """Calculate the transition progress (0.0 to 1.0)."""
-    elapsed = datetime.now() - start_time
-    return min(1.0, elapsed.total_seconds() / duration.total_seconds())
 
-def set_transition_state(progress, ip_address):
-    """
-    Set the light state based on transition progress.
-    0.0 = fully green
-    0.5 = fully amber
-    1.0 = fully red
-    """
-    if progress <= 0.5:
-        # Transition from green to amber
-        amber_intensity = progress * 2  # 0.0 to 1.0
-        green_intensity = 1 - amber_intensity
-        args = [
-            f"--ip={ip_address}",
-            f"--red=off",
-            f"--yellow={'on' if amber_intensity > 0.1 else 'off'}",
-            f"--green={'on' if green_intensity > 0.1 else 'off'}"
-        ]
-    else:
-        # Transition from amber to red
-        red_intensity = (progress - 0.5) * 2  # 0.0 to 1.0
-        amber_intensity = 1 - red_intensity
-        args = [
-            f"--ip={ip_address}",
-            f"--red={'on' if red_intensity > 0.1 else 'off'}",
-            f"--yellow={'on' if amber_intensity > 0.1 else 'off'}",
-            f"--green=off"
-        ]
-    
-    return run_command(args)
+def run_transition(controller: PatliteController, duration: timedelta, steps: List[TransitionStep]) -> bool:
+    """Play the schedule on absolute monotonic deadlines; return False if a command failed."""
+    schedule = build_schedule(duration, steps)
+    start = time.monotonic()
+
+    for offset, step in schedule:
+        delay = start + offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        elapsed = time.monotonic() - start
+        remaining = timedelta(seconds=round(max(duration.total_seconds() - elapsed, 0)))
+        print(f"\nProgress: {step.progress:.1%} | Time remaining: {remaining} "
+              f"(switch {(elapsed - offset) * 1000:+.0f} ms from plan)")
+        if not apply_step(controller, step):
+            return False
+
+    delay = start + duration.total_seconds() - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    return True
+
 
 def parse_arguments():
     """Parse command line arguments."""
@@ -72,59 +119,56 @@ def parse_arguments():
         description="Patlite Transition Wrapper - Gradually transitions lights from green to amber to red",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
-    
+
     parser.add_argument(
         "--ip",
         default=DEFAULT_IP,
         help="IP address of the Patlite device"
     )
-    
+
     parser.add_argument(
         "--transition-duration",
         type=int,
         default=DEFAULT_DURATION,
         help="Transition duration in minutes"
     )
-    
+
+    parser.add_argument(
+        "--gradations",
+        choices=sorted(GRADATIONS),
+        default="basic",
+        help="basic: steady lights only; flash: incoming light flashes with a speed ramp"
+    )
+
     return parser.parse_args()
 
 def main():
     """Run the full transition sequence."""
     args = parse_arguments()
     transition_duration = timedelta(minutes=args.transition_duration)
-    
+    steps = GRADATIONS[args.gradations]
+
     print(f"Starting {transition_duration} transition from green to red")
     print(f"Current time: {datetime.now().strftime('%H:%M:%S')}")
     print(f"Will complete at: {(datetime.now() + transition_duration).strftime('%H:%M:%S')}")
-    
-    # Initial state - green only
-    if not run_command([f"--ip={args.ip}", "--red=off", "--yellow=off", "--green=on"]):
-        return
-    
-    start_time = datetime.now()
-    
+    print(f"Light changes planned: {len(build_schedule(transition_duration, steps))}")
+
+    controller = PatliteController(args.ip)
     try:
-        while True:
-            progress = calculate_transition_progress(start_time, transition_duration)
-            print(f"\nProgress: {progress:.1%} | Time remaining: "
-                  f"{transition_duration - (datetime.now() - start_time)}")
-            
-            if not set_transition_state(progress, args.ip):
-                print("Transition aborted due to error")
-                return
-            
-            if progress >= 1.0:
+        with controller.session():
+            try:
+                if not run_transition(controller, transition_duration, steps):
+                    print("Transition aborted due to error")
+                    return
+                # The last scheduled step already left the tower red only
                 print("\nTransition complete!")
-                break
-                
-            time.sleep(UPDATE_INTERVAL)
-            
-    except KeyboardInterrupt:
-        print("\nTransition interrupted by user")
-        run_command([f"--ip={args.ip}", "--off"])
-    
-    # Final state - red only
-    run_command([f"--ip={args.ip}", "--red=on", "--yellow=off", "--green=off"])
+            except KeyboardInterrupt:
+                print("\nTransition interrupted by user")
+                controller.turn_all_off()
+                # Final state - red only
+                apply_step(controller, TransitionStep(1.0, ON, OFF, OFF))
+    except ConnectionError as e:
+        print(f"Connection error: {e}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Port Watcher - Notice serial device nodes appearing and disappearing.
+
+Uses Linux inotify (through ctypes, no extra packages) on the directories that
+hold the watched ports, e.g. /dev for /dev/ttyACM0 or /dev/serial/by-id for a
+by-id link, so a replugged Arduino can be reopened as soon as udev creates its
+node instead of on the next retry timer. Where inotify is unavailable the
+watcher degrades to plain timeouts.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify flags (linux/inotify.h)
+IN_ATTRIB = 0x00000004        # udev fixes permissions after creating the node
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+APPEAR_MASK = IN_CREATE | IN_MOVED_TO | IN_ATTRIB
+VANISH_MASK = IN_DELETE | IN_MOVED_FROM
+EVENT_HEADER = struct.Struct('iIII')    # wd, mask, cookie, name length
+FALLBACK_INTERVAL = 10.0                # Seconds slept per wait when inotify is unavailable
+
+PortEvent = Tuple[str, bool]            # (port path, node present)
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class PortWatcher:
+    """
+    Reports (path, present) events for the ports passed to watch().
+
+    The watcher's fileno() can be registered with selectors/select; call
+    read_events() when it becomes readable. wait_for() blocks until one port
+    appears.
+    """
+
+    def __init__(self) -> None:
+        self._fd: Optional[int] = None
+        self._dirs: Dict[int, str] = {}             # watch descriptor -> directory
+        self._ports: Dict[str, Set[str]] = {}       # directory -> watched names
+        libc = _load_libc()
+        if libc is None:
+            logger.warning("inotify is not available; falling back to retry timers")
+            return
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}; falling back to retry timers")
+            return
+        self._libc = libc
+        self._fd = fd
+
+    @property
+    def available(self) -> bool:
+        """False when inotify could not be set up (callers must keep their timers)."""
+        return self._fd is not None
+
+    def fileno(self) -> int:
+        if self._fd is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        return self._fd
+
+    def watch(self, path: str) -> bool:
+        """Start reporting events for a port path. Returns False if it cannot be watched."""
+        directory, name = os.path.split(path)
+        if self._fd is None:
+            return False
+        if directory not in self._ports:
+            wd = self._libc.inotify_add_watch(self._fd, directory.encode(), APPEAR_MASK | VANISH_MASK)
+            if wd < 0:
+                logger.warning(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+                return False
+            self._dirs[wd] = directory
+            self._ports[directory] = set()
+        self._ports[directory].add(name)
+        return True
+
+    def read_events(self) -> List[PortEvent]:
+        """Drain pending inotify events and return those for watched ports."""
+        if self._fd is None:
+            return []
+        events: List[PortEvent] = []
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost; report every port so callers re-check them
+                    events.extend(self._all_ports())
+                    continue
+                directory = self._dirs.get(wd)
+                if mask & IN_IGNORED:
+                    self._forget(wd)
+                    continue
+                if directory is None or name not in self._ports.get(directory, ()):
+                    continue
+                events.append((os.path.join(directory, name), not mask & VANISH_MASK))
+        return events
+
+    def _all_ports(self) -> List[PortEvent]:
+        return [
+            (path, os.path.exists(path))
+            for directory, names in self._ports.items()
+            for path in (os.path.join(directory, n) for n in names)
+        ]
+
+    def _forget(self, wd: int) -> None:
+        # The watched directory itself went away (e.g. /dev/serial/by-id)
+        directory = self._dirs.pop(wd, None)
+        if directory is not None:
+            logger.warning(f"{directory} was removed; its ports are no longer watched")
+            self._ports.pop(directory, None)
+
+    def wait(self, timeout: Optional[float] = None) -> List[PortEvent]:
+        """Block until there are port events or the timeout passes."""
+        if self._fd is None:
+            time.sleep(FALLBACK_INTERVAL if timeout is None else timeout)
+            return []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return []
+            events = self.read_events()
+            if events:
+                return events
+
+    def wait_for(self, path: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until `path` appears (or changes) or the timeout passes.
+
+        Returns True if the port was reported present, False on timeout.
+        Without inotify this sleeps for the timeout (FALLBACK_INTERVAL if
+        there is none) and reports whether the node exists.
+        """
+        missing = not os.path.exists(path)
+        if not self.watch(path):
+            time.sleep(FALLBACK_INTERVAL if timeout is None else timeout)
+            return os.path.exists(path)
+        # Drop events queued since the last wait (they would end this one at
+        # once), then catch a node that appeared before the drain
+        self.read_events()
+        if missing and os.path.exists(path):
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            for event_path, present in self.wait(remaining):
+                if event_path == path and present:
+                    return True
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print serial port plug/unplug events")
+    parser.add_argument('ports', nargs='+', help="Port paths, e.g. /dev/ttyACM0")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    watcher = PortWatcher()
+    for port in args.ports:
+        watcher.watch(port)
+        print(f"{port}: {'present' if os.path.exists(port) else 'absent'}")
+    try:
+        while True:
+            for port, present in watcher.wait():
+                print(f"{time.strftime('%H:%M:%S')} {port}: {'appeared' if present else 'removed'}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
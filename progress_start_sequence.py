@@ -6,25 +6,24 @@ This script runs a full LED cycle from Green → Yellow → Amber → Red over a
 Each phase receives an equal portion of time. A live progress bar shows elapsed/remaining time.
 """
 
-import subprocess
-import time
 import argparse
-from typing import Tuple, List
+import logging
 import sys
+from typing import List, Optional
+
+from sequence_engine import (
+    DEFAULT_TOWER_IP, Phase, SequenceEngine, SequenceHooks,
+    describe_phases, describe_sequence, equal_phases
+)
+from signal_tower import open_tower
+from timeline import Timeline
+from timing_report import report
 
 
 # ========================
 # Configuration
 # ========================
 
-COLOR_SEQUENCE: List[Tuple[str, int]] = [
-    ("green", 10),
-    ("yellow", 9),
-    ("amber", 8),
-    ("red", 7),
-]
-
-CONTROLLER_SCRIPT_PATH = "/home/labuser/jazzeryj/la6_controller.py"
 DEFAULT_DURATION_MINUTES = 5
 PROGRESS_BAR_LENGTH = 40
 
@@ -33,30 +32,6 @@ PROGRESS_BAR_LENGTH = 40
 # Helper Functions
 # ========================
 
-def run_led_command(color_code: int, verbose: bool) -> None:
-    """Run the external controller script to change the LED color."""
-    if verbose:
-        print(f"Setting LED to code {color_code}...")
-
-    try:
-        result = subprocess.run(
-            ["python3", CONTROLLER_SCRIPT_PATH, "T", str(color_code)],
-            check=True,
-            capture_output=verbose,
-            text=verbose,
-        )
-
-        if verbose:
-            if result.stdout:
-                print("STDOUT:", result.stdout)
-            if result.stderr:
-                print("STDERR:", result.stderr)
-
-    except subprocess.CalledProcessError as e:
-        print(f"\nFailed to set LED to code {color_code}: {e}")
-        sys.exit(1)
-
-
 def format_time(seconds: float) -> str:
     """Format seconds into MM:SS string for display."""
     mins, secs = divmod(int(seconds), 60)
@@ -79,21 +54,33 @@ def clear_line() -> None:
     sys.stdout.flush()
 
 
-def log_phase(phase_num: int, color_name: str, color_code: int) -> None:
+def log_phase(phase_num: int, color_name: str, color_code: Optional[int]) -> None:
     """Log the start of a new LED phase."""
-    print(f"\n[Phase {phase_num}] Setting LED to '{color_name}' ({color_code})")
+    code = f" ({color_code})" if color_code is not None else ""
+    print(f"\n[Phase {phase_num}] Setting LED to '{color_name}'{code}")
+
+
+class ProgressHooks(SequenceHooks):
+    """Show phase changes and a live progress bar while each phase is held."""
+
+    def on_start(self, phases: List[Phase], total_seconds: float) -> None:
+        self.phase_count = len(phases)
+
+    def on_phase(self, index: int, phase: Phase) -> None:
+        clear_line()
+        log_phase(index + 1, phase.name, phase.state.group)
+        label = "Next change" if index < self.phase_count - 1 else "Cycle ends"
+        print(f"{label} in {phase.duration / 60:.1f} minutes:")
+
+    def on_tick(self, phase_elapsed: float, phase_duration: float,
+                total_elapsed: float, total_seconds: float) -> None:
+        update_progress_bar(phase_elapsed, phase_duration, prefix="⏳ Waiting")
 
+    def on_error(self, index: int, phase: Phase, error: Exception) -> None:
+        print(f"\nFailed to set LED to '{phase.name}': {error}")
 
-def wait_with_progress(duration_seconds: float, verbose: bool) -> None:
-    """Wait for a given duration while showing a live progress bar."""
-    start_time = time.monotonic()
-    while True:
-        elapsed = time.monotonic() - start_time
-        if elapsed >= duration_seconds:
-            break
-        update_progress_bar(elapsed, duration_seconds, prefix="⏳ Waiting")
-        time.sleep(0.1)
-    clear_line()
+    def on_finish(self, completed: bool) -> None:
+        clear_line()
 
 
 def exit_gracefully(*_) -> None:
@@ -106,22 +93,25 @@ def exit_gracefully(*_) -> None:
 # Main Logic
 # ========================
 
-def run_led_cycle(duration_minutes: float, verbose: bool) -> None:
+def run_led_cycle(phases: List[Phase], ip: str = DEFAULT_TOWER_IP, timing_report: Optional[str] = None) -> None:
     """Run the full LED cycle with configurable timing and visual feedback."""
-    total_seconds = duration_minutes * 60
-    interval_seconds = total_seconds / len(COLOR_SEQUENCE)
-
-    print(f"\nStarting LED cycle over {duration_minutes:.1f} minute(s):")
-    print("Colors: Green (10) → Yellow (9) → Amber (8) → Red (7)\n")
-
-    for i, (color_name, color_code) in enumerate(COLOR_SEQUENCE):
-        log_phase(i + 1, color_name, color_code)
-        run_led_command(color_code, verbose)
+    try:
+        tower = open_tower(ip)
+    except (ConnectionError, OSError) as e:
+        print(f"Error: could not reach tower {ip}: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        if i < len(COLOR_SEQUENCE) - 1:
-            print(f"Next change in {interval_seconds / 60:.1f} minutes:")
-            wait_with_progress(interval_seconds, verbose)
+    with tower:
+        engine = SequenceEngine(tower, phases, ProgressHooks())
+        try:
+            completed = engine.run()
+        except KeyboardInterrupt:
+            engine.stop()
+            raise
 
+    report(engine, timing_report)
+    if not completed:
+        sys.exit(1)
     print("\nLED cycle complete.")
 
 
@@ -138,12 +128,42 @@ def main() -> None:
         "--verbose",
         "-v",
         action="store_true",
-        help="Enable detailed logging including script output",
+        help="Log planned versus actual switch times for each phase",
+    )
+    parser.add_argument(
+        "--timeline",
+        "-t",
+        help="Timeline JSON file to run instead of the equal Green → Red split",
+    )
+    parser.add_argument(
+        "--ip",
+        default=DEFAULT_TOWER_IP,
+        help=f"IP address of the tower (default: {DEFAULT_TOWER_IP})",
+    )
+    parser.add_argument(
+        "--timing-report",
+        metavar="PATH",
+        help="Export per-phase switch timing to PATH (.csv or .json)",
     )
     args = parser.parse_args()
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.timeline:
+        try:
+            phases = Timeline.load(args.timeline).compile_phases(args.ip)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nStarting timeline {args.timeline}:")
+        print(f"Phases: {describe_phases(phases)}\n")
+    else:
+        phases = equal_phases(args.duration * 60)
+        print(f"\nStarting LED cycle over {args.duration:.1f} minute(s):")
+        print(f"Colors: {describe_sequence()}\n")
 
     try:
-        run_led_cycle(args.duration, args.verbose)
+        run_led_cycle(phases, args.ip, args.timing_report)
     except KeyboardInterrupt:
         exit_gracefully()
 
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Results Writer - Buffered appends to the temperature results files.
+
+The monitors used to open /var/log/temperature_results.txt once per reading
+(or per cycle), which on SD-card-backed hosts costs an open/close and a
+metadata update every time. A ResultsWriter keeps the file open and buffers
+lines, writing them out in one append when:
+
+  * the buffer reaches `buffer_size` bytes;
+  * `flush_interval` seconds have passed since the oldest buffered line
+    (checked by a background thread, so lines are not held through a long
+    sleep between checks);
+  * a line is written with urgent=True, e.g. an over-threshold reading that
+    may be followed by a power-off.
+
+Each append is made under an exclusive flock() on the file, so several
+monitors can share one results file without interleaving partial batches.
+The file is reopened if it is rotated away. FSYNC_POLICIES decides when the
+data is also forced to the card.
+"""
+
+import argparse
+import fcntl
+import logging
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+BUFFER_SIZE = 4096          # Bytes buffered before a flush
+FLUSH_INTERVAL = 60.0       # Seconds a line may wait in the buffer
+FSYNC_POLICIES = (
+    "never",                # Leave write-back to the kernel
+    "urgent",               # fsync() flushes triggered by an urgent line
+    "always",               # fsync() every flush
+)
+
+
+class ResultsWriter:
+    """
+    Buffered, lock-protected appender for one results file.
+
+    write() and flush() are thread-safe. The file is opened on the first
+    flush, so creating a writer does not touch the disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        buffer_size: int = BUFFER_SIZE,
+        flush_interval: Optional[float] = FLUSH_INTERVAL,
+        fsync: str = "urgent"
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {', '.join(FSYNC_POLICIES)}, not '{fsync}'")
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._fd: Optional[int] = None
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._oldest: Optional[float] = None    # Monotonic time of the oldest buffered line
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, name="results-writer", daemon=True)
+            self._flusher.start()
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, line: str, urgent: bool = False) -> None:
+        """Buffer one line (a newline is added if missing); urgent lines are flushed at once."""
+        if not line.endswith('\n'):
+            line += '\n'
+        data = line.encode()
+        with self._lock:
+            if self._closed.is_set():
+                raise ValueError(f"write to closed results writer for {self.path}")
+            self._buffer.append(data)
+            self._buffered += len(data)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if urgent or self._buffered >= self.buffer_size:
+                self._flush(sync=urgent and self.fsync != "never")
+
+    def flush(self, sync: bool = False) -> None:
+        """Write out buffered lines; sync=True also fsyncs whatever the policy."""
+        with self._lock:
+            self._flush(sync)
+
+    def _flush(self, sync: bool = False) -> None:
+        if not self._buffer:
+            return
+        data = b''.join(self._buffer)
+        try:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                if sync or self.fsync == "always":
+                    os.fsync(fd)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except OSError as e:
+            # Keep the lines; they are retried on the next flush
+            logger.error(f"Cannot write {len(self._buffer)} result line(s) to {self.path}: {e}")
+            self._close_fd()
+            return
+        self._buffer.clear()
+        self._buffered = 0
+        self._oldest = None
+
+    def _open(self) -> int:
+        if self._fd is not None:
+            # Reopen if the file was rotated or removed since it was opened
+            try:
+                current = os.stat(self.path)
+                opened = os.fstat(self._fd)
+                if (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino):
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            logger.info(f"{self.path} was rotated; reopening it")
+            self._close_fd()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        return self._fd
+
+    def _close_fd(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval / 2):
+            with self._lock:
+                if self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval:
+                    self._flush()
+
+    def close(self) -> None:
+        """Flush (and fsync unless the policy is "never") and close the file."""
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._flush(sync=self.fsync != "never")
+            self._close_fd()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Append stdin lines to a results file through a ResultsWriter")
+    parser.add_argument('path', help="Results file")
+    parser.add_argument('--buffer-size', type=int, default=BUFFER_SIZE, help="Bytes buffered before a flush")
+    parser.add_argument('--interval', type=float, default=FLUSH_INTERVAL, help="Seconds a line may wait")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default="urgent", help="When to fsync")
+    parser.add_argument('--urgent', metavar='TEXT', help="Flush at once after lines containing TEXT")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    with ResultsWriter(args.path, args.buffer_size, args.interval, args.fsync) as writer:
+        for line in sys.stdin:
+            writer.write(line, urgent=bool(args.urgent and args.urgent in line))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Sensor Simulator - Pseudo-terminals that behave like the txpaa Arduinos.
+
+Each simulated device is a pty whose far end answers `R` the way SEN0256.ino
+does: `Serial.print(temp, 1)` with no line ending. Replies can be delayed,
+noisy, drifting or ramping, and a device can send garbage, stay silent or
+disconnect. On a disconnect the pty is torn down and a new one appears after a
+while, like an unplugged and replugged Arduino.
+
+Every device is reached through a stable symlink (<directory>/txpaaN), so the
+monitors use the same name across reconnects; device_path() accepts these
+paths as device names. One thread serves all devices from a selector.
+"""
+
+import argparse
+import logging
+import os
+import pty
+import random
+import selectors
+import tempfile
+import threading
+import time
+import tty
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+BASE_TEMPERATURE = 25.0     # °C
+LATENCY = 0.01              # Mean reply delay in seconds (SEN0256 read + 115200 baud)
+RECONNECT_DELAY = 2.0       # Seconds a disconnected device stays away
+
+
+@dataclass
+class SensorProfile:
+    """How simulated devices behave; the rates are probabilities per request."""
+    base: float = BASE_TEMPERATURE
+    noise: float = 0.0              # Standard deviation of each reading, °C
+    drift: float = 0.0              # Slow baseline drift, °C per hour
+    latency: float = LATENCY        # Mean reply delay; each reply takes 0.5-1.5x this
+    garbage_rate: float = 0.0       # Reply with line noise instead of a reading
+    drop_rate: float = 0.0          # Do not reply at all
+    disconnect_rate: float = 0.0    # Unplug instead of replying
+    reconnect_delay: float = RECONNECT_DELAY
+    newline: bool = False           # SEN0256.ino sends none
+
+    def __post_init__(self) -> None:
+        for name in ('garbage_rate', 'drop_rate', 'disconnect_rate'):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+
+
+@dataclass
+class SimStats:
+    """Counters over all devices."""
+    requests: int = 0
+    replies: int = 0
+    garbage: int = 0
+    dropped: int = 0
+    disconnects: int = 0
+
+
+@dataclass
+class _Ramp:
+    start: float                    # Monotonic time the ramp begins
+    rate: float                     # °C per second
+    limit: Optional[float]          # Temperature the ramp stops at
+
+    def offset(self, base: float, now: float) -> float:
+        rise = max(now - self.start, 0.0) * self.rate
+        if self.limit is not None:
+            rise = min(rise, self.limit - base) if self.rate >= 0 else max(rise, self.limit - base)
+        return rise
+
+
+@dataclass
+class _Device:
+    name: str
+    link: str                       # Stable path the monitors open
+    base: float
+    master: Optional[int] = None
+    slave: Optional[int] = None     # Kept open so the master never reads EIO between clients
+    ramps: List[_Ramp] = field(default_factory=list)
+    back_at: Optional[float] = None # Monotonic time a disconnected device reappears
+
+
+class SensorSimulator:
+    """
+    A set of simulated temperature sensors.
+
+    Use start()/stop() (or a with block); `paths` are the device names to
+    hand to the monitors. temperature(), set_base() and ramp() inspect and
+    steer individual devices while the simulator runs.
+    """
+
+    def __init__(
+        self,
+        count: int,
+        profile: Optional[SensorProfile] = None,
+        directory: Optional[str] = None,
+        prefix: str = 'txpaa',
+        seed: Optional[int] = None
+    ) -> None:
+        self.profile = profile or SensorProfile()
+        self.directory = directory or tempfile.mkdtemp(prefix='sensor_sim.')
+        self.stats = SimStats()
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._selector = selectors.DefaultSelector()
+        self._pending: List[Tuple[float, int, bytes]] = []     # (due, device index, reply)
+        self._started = time.monotonic()
+        self._wake_r, self._wake_w = os.pipe()
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(self.directory, exist_ok=True)
+        self.devices = [
+            _Device(f"{prefix}{i + 1}", os.path.join(self.directory, f"{prefix}{i + 1}"), self.profile.base)
+            for i in range(count)
+        ]
+        for index in range(count):
+            self._plug(index)
+
+    @property
+    def paths(self) -> List[str]:
+        return [device.link for device in self.devices]
+
+    def __enter__(self) -> "SensorSimulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -- steering ------------------------------------------------------------
+
+    def temperature(self, index: int, now: Optional[float] = None) -> float:
+        """Noise-free temperature of a device."""
+        now = time.monotonic() if now is None else now
+        device = self.devices[index]
+        with self._lock:
+            value = device.base + self.profile.drift * (now - self._started) / 3600
+            for ramp in device.ramps:
+                value += ramp.offset(device.base, now)
+        return value
+
+    def set_base(self, index: int, value: float) -> None:
+        with self._lock:
+            self.devices[index].base = value
+
+    def ramp(self, index: int, rate: float, limit: Optional[float] = None, delay: float = 0.0) -> float:
+        """
+        Make a device's temperature climb (or fall) at `rate` °C/s from `delay`
+        seconds from now, stopping at `limit`. Returns the monotonic start time.
+        """
+        start = time.monotonic() + delay
+        with self._lock:
+            self.devices[index].ramps.append(_Ramp(start, rate, limit))
+        return start
+
+    def crossing_time(self, index: int, threshold: float) -> Optional[float]:
+        """Monotonic time a device's ramps take it over `threshold` (None if they never do)."""
+        device = self.devices[index]
+        for ramp in device.ramps:
+            if ramp.rate > 0 and (ramp.limit is None or ramp.limit > threshold):
+                return ramp.start + max(threshold - device.base, 0.0) / ramp.rate
+        return None
+
+    def disconnect(self, index: int, duration: Optional[float] = None) -> None:
+        """Unplug a device; it comes back on a new pty after `duration` seconds."""
+        with self._lock:
+            self._unplug(index, self.profile.reconnect_delay if duration is None else duration)
+        os.write(self._wake_w, b'x')
+
+    # -- pty handling --------------------------------------------------------
+
+    def _plug(self, index: int) -> None:
+        device = self.devices[index]
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+        device.master, device.slave, device.back_at = master, slave, None
+        # Swap the link in one rename, like udev updating a by-id link
+        temporary = f"{device.link}.new"
+        if os.path.lexists(temporary):
+            os.unlink(temporary)
+        os.symlink(os.ttyname(slave), temporary)
+        os.replace(temporary, device.link)
+        self._selector.register(master, selectors.EVENT_READ, index)
+
+    def _unplug(self, index: int, duration: Optional[float]) -> None:
+        """Tear down a device's pty; it is plugged back in after `duration` seconds (None: never)."""
+        device = self.devices[index]
+        if device.master is None:
+            return
+        self._selector.unregister(device.master)
+        os.close(device.master)
+        os.close(device.slave)
+        device.master = device.slave = None
+        self._pending = [p for p in self._pending if p[1] != index]
+        if os.path.lexists(device.link):
+            os.unlink(device.link)
+        if duration is not None:
+            device.back_at = time.monotonic() + duration
+            self.stats.disconnects += 1
+
+    # -- serving -------------------------------------------------------------
+
+    def _reply(self, index: int) -> Optional[bytes]:
+        """What a device sends back for one `R` (None: nothing)."""
+        roll = self._random.random()
+        profile = self.profile
+        if roll < profile.disconnect_rate:
+            self._unplug(index, profile.reconnect_delay)
+            return None
+        roll -= profile.disconnect_rate
+        if roll < profile.drop_rate:
+            self.stats.dropped += 1
+            return None
+        roll -= profile.drop_rate
+        if roll < profile.garbage_rate:
+            self.stats.garbage += 1
+            return self._random.choice([
+                bytes(self._random.randrange(256) for _ in range(self._random.randint(1, 8))),
+                b'nan',
+                b'\x00\xff',
+                b'-',
+            ])
+        value = self.temperature(index)
+        if profile.noise:
+            value += self._random.gauss(0.0, profile.noise)
+        text = f"{value:.1f}"
+        if profile.newline:
+            text += '\n'
+        return text.encode()
+
+    def _handle(self, index: int) -> None:
+        device = self.devices[index]
+        try:
+            data = os.read(device.master, 1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            # Nobody holds the tty; nothing to answer
+            return
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(data.count(b'R')):
+                self.stats.requests += 1
+                reply = self._reply(index)
+                if device.master is None:
+                    return
+                if reply is not None:
+                    delay = self.profile.latency * self._random.uniform(0.5, 1.5)
+                    self._pending.append((now + delay, index, reply))
+
+    def _flush_due(self, now: float) -> None:
+        with self._lock:
+            due = [p for p in self._pending if p[0] <= now]
+            self._pending = [p for p in self._pending if p[0] > now]
+            for _, index, reply in due:
+                device = self.devices[index]
+                if device.master is None:
+                    continue
+                try:
+                    os.write(device.master, reply)
+                    self.stats.replies += 1
+                except OSError as e:
+                    logger.debug(f"Cannot answer on {device.link}: {e}")
+            for index, device in enumerate(self.devices):
+                if device.back_at is not None and device.back_at <= now:
+                    self._plug(index)
+
+    def _next_deadline(self) -> Optional[float]:
+        with self._lock:
+            deadlines = [p[0] for p in self._pending]
+            deadlines += [d.back_at for d in self.devices if d.back_at is not None]
+        return min(deadlines) if deadlines else None
+
+    def _serve(self) -> None:
+        while self._running:
+            deadline = self._next_deadline()
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    os.read(self._wake_r, 64)
+                else:
+                    self._handle(key.data)
+            self._flush_due(time.monotonic())
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="sensor-sim", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and remove every pty and link."""
+        self._running = False
+        os.write(self._wake_w, b'x')
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            for index, device in enumerate(self.devices):
+                self._unplug(index, None)
+                device.back_at = None
+        self._selector.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate SEN0256 temperature sensors on pseudo-terminals")
+    parser.add_argument('-n', '--count', type=int, default=3, help="Number of devices")
+    parser.add_argument('--dir', help="Directory for the device links (default: a new temporary one)")
+    parser.add_argument('--base', type=float, default=BASE_TEMPERATURE, help="Starting temperature, °C")
+    parser.add_argument('--noise', type=float, default=0.0, help="Reading noise (standard deviation), °C")
+    parser.add_argument('--drift', type=float, default=0.0, help="Baseline drift, °C per hour")
+    parser.add_argument('--latency', type=float, default=LATENCY, help="Mean reply delay, seconds")
+    parser.add_argument('--garbage', type=float, default=0.0, help="Fraction of garbage replies")
+    parser.add_argument('--drop', type=float, default=0.0, help="Fraction of requests left unanswered")
+    parser.add_argument('--disconnect', type=float, default=0.0, help="Fraction of requests that unplug the device")
+    parser.add_argument('--ramp', nargs=2, type=float, metavar=('RATE', 'DELAY'),
+                        help="Ramp the first device at RATE °C/s starting DELAY seconds from now")
+    parser.add_argument('--seed', type=int, help="Random seed")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    profile = SensorProfile(
+        base=args.base, noise=args.noise, drift=args.drift, latency=args.latency,
+        garbage_rate=args.garbage, drop_rate=args.drop, disconnect_rate=args.disconnect
+    )
+    with SensorSimulator(args.count, profile, args.dir, seed=args.seed) as sim:
+        if args.ramp:
+            sim.ramp(0, args.ramp[0], delay=args.ramp[1])
+        for path in sim.paths:
+            print(path, flush=True)
+        try:
+            while True:
+                time.sleep(10)
+                stats = sim.stats
+                logger.info(f"{stats.requests} requests, {stats.replies} replies, {stats.garbage} garbage, "
+                            f"{stats.dropped} dropped, {stats.disconnects} disconnects; "
+                            f"{sim.devices[0].name} at {sim.temperature(0):.1f}°C")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Sequence Engine - Runs a timed colour sequence on a signal tower in-process.
+
+Replaces launching `la6_controller.py T <code>` as a subprocess for every
+phase: the tower is driven through signal_tower over one connection that is
+held for the whole sequence. Front ends (terminal progress bar, Tk) follow
+the sequence through SequenceHooks.
+"""
+
+import itertools
+import logging
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from la6_controller import DEFAULT_IP
+from signal_tower import NAMED_STATES, SignalTower, TowerState, resolve_state
+
+logger = logging.getLogger(__name__)
+
+# ========================
+# Configuration
+# ========================
+
+# Colour names in order; signal_tower maps each to a PNS smart-mode group
+# (green 10, yellow 9, amber 8, red 7) or the equivalent Patlite lights.
+COLOR_SEQUENCE: List[str] = ["green", "yellow", "amber", "red"]
+
+DEFAULT_TOWER_IP = DEFAULT_IP
+TICK_INTERVAL = 0.1  # Seconds between on_tick callbacks
+START_LEAD = 0.05    # Seconds between all towers being connected and the first switch
+MAX_SKEW = 0.020     # Seconds of cross-tower skew tolerated before a warning is logged
+
+
+@dataclass
+class Phase:
+    """One step of a sequence: a tower state held for a duration."""
+    name: str
+    duration: float  # seconds
+    state: Optional[TowerState] = None  # Defaults to the named signal_tower state
+
+    def __post_init__(self) -> None:
+        if self.state is None:
+            self.state = resolve_state(self.name)
+
+
+def phase_offsets(phases: Sequence[Phase]) -> List[float]:
+    """Offsets (seconds from the start) at which each phase begins, plus the end."""
+    return [0.0] + list(itertools.accumulate(phase.duration for phase in phases))
+
+
+def equal_phases(total_seconds: float, names: Sequence[str] = COLOR_SEQUENCE) -> List[Phase]:
+    """Split a total duration evenly across the given colours."""
+    interval = total_seconds / len(names)
+    return [Phase(name, interval) for name in names]
+
+
+def describe_sequence(names: Sequence[str] = COLOR_SEQUENCE) -> str:
+    """Human-readable summary, e.g. 'Green (10) → Yellow (9) → ...'."""
+    return " → ".join(f"{name.capitalize()} ({NAMED_STATES[name].group})" for name in names)
+
+
+def describe_phases(phases: Sequence[Phase]) -> str:
+    """Summary of an arbitrary phase list, e.g. 'Green 2.0m → Red 0.5m'."""
+    return " → ".join(f"{phase.name.capitalize()} {phase.duration / 60:.1f}m" for phase in phases)
+
+
+@dataclass
+class SwitchRecord:
+    """When one tower was asked to switch, relative to the sequence start."""
+    ip: str
+    index: int
+    name: str
+    planned: float
+    issued: float
+    acked: Optional[float] = None
+    error: Optional[Exception] = None
+
+
+class SequenceHooks:
+    """Callbacks invoked by SequenceEngine. Override the ones you need."""
+
+    def on_start(self, phases: List[Phase], total_seconds: float) -> None:
+        pass
+
+    def on_phase(self, index: int, phase: Phase) -> None:
+        """Called just before the tower is switched to a phase."""
+        pass
+
+    def on_tick(self, phase_elapsed: float, phase_duration: float,
+                total_elapsed: float, total_seconds: float) -> None:
+        """Called every tick while a phase is being held."""
+        pass
+
+    def on_switch(self, record: SwitchRecord) -> None:
+        """Called after each tower switch with its timing (from a worker thread for fleet sequences)."""
+        pass
+
+    def on_error(self, index: int, phase: Phase, error: Exception) -> None:
+        """Called when a switch fails (from a worker thread for fleet sequences)."""
+        pass
+
+    def on_finish(self, completed: bool) -> None:
+        """Called once at the end; completed is False if stopped or aborted."""
+        pass
+
+
+class SequenceEngine:
+    """
+    Drives one tower through a list of phases over a single connection.
+
+    Every switch is scheduled on an absolute time.monotonic() deadline measured
+    from the start of the sequence, so late commands or slow ticks in one phase
+    do not push back the phases after it.
+    """
+
+    def __init__(
+        self,
+        tower: SignalTower,
+        phases: List[Phase],
+        hooks: Optional[SequenceHooks] = None,
+        stop_on_error: bool = True,
+        tick_interval: float = TICK_INTERVAL
+    ) -> None:
+        self.tower = tower
+        self.phases = phases
+        self.hooks = hooks or SequenceHooks()
+        self.stop_on_error = stop_on_error
+        self.tick_interval = tick_interval
+        self.offsets = phase_offsets(phases)
+        self.records: List[SwitchRecord] = []
+        self.finished_at: Optional[float] = None  # Seconds from start at which a completed run ended
+        self._stop = threading.Event()
+
+    @property
+    def total_seconds(self) -> float:
+        return self.offsets[-1]
+
+    def stop(self) -> None:
+        """Ask a running sequence to stop at the next tick (thread-safe)."""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def _wait_until(self, index: int, start: float) -> None:
+        """Hold phase `index` until the next deadline, reporting progress every tick."""
+        phase = self.phases[index]
+        phase_start = start + self.offsets[index]
+        deadline = start + self.offsets[index + 1]
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            self.hooks.on_tick(now - phase_start, phase.duration, now - start, self.total_seconds)
+            self._stop.wait(min(self.tick_interval, deadline - now))
+
+    def run(self) -> bool:
+        """
+        Run the sequence to completion.
+
+        Returns:
+            True if every phase ran, False if stopped or aborted on error
+        """
+        self._stop.clear()
+        self.records = []
+        self.finished_at = None
+        self.tower.connection.connect()
+        self.hooks.on_start(self.phases, self.total_seconds)
+        start = time.monotonic()
+        completed = True
+
+        for i, phase in enumerate(self.phases):
+            if self._stop.is_set():
+                completed = False
+                break
+
+            self.hooks.on_phase(i, phase)
+            actual = time.monotonic() - start
+            logger.info(f"Phase {i+1}/{len(self.phases)} '{phase.name}': planned +{self.offsets[i]:.3f}s, "
+                        f"actual +{actual:.3f}s (drift {(actual - self.offsets[i]) * 1000:+.1f} ms)")
+            record = SwitchRecord(self.tower.ip, i, phase.name, self.offsets[i], actual)
+            try:
+                self.tower.set_state(phase.state)
+                record.acked = time.monotonic() - start
+            except (ConnectionError, ValueError) as e:
+                logger.error(f"Failed to set tower {self.tower.ip} to '{phase.name}': {e}")
+                record.error = e
+            self.records.append(record)
+            self.hooks.on_switch(record)
+            if record.error is not None:
+                self.hooks.on_error(i, phase, record.error)
+                if self.stop_on_error:
+                    completed = False
+                    break
+
+            self._wait_until(i, start)
+
+        if self._stop.is_set():
+            completed = False
+        if completed:
+            self.finished_at = time.monotonic() - start
+            logger.info(f"Sequence finished {(self.finished_at - self.total_seconds) * 1000:+.1f} ms "
+                        f"from its {self.total_seconds:.3f}s target")
+        self.hooks.on_finish(completed)
+        return completed
+
+
+class FleetSequenceEngine:
+    """
+    Runs a sequence on several towers so that each switch lands on all of them together.
+
+    Every tower gets its own worker thread with a connection opened up front
+    and every frame encoded before the first deadline. Workers share one
+    absolute start time and each sends its frame at start + offset, so towers
+    switch in parallel instead of one after another. The cross-tower skew of
+    every switch is logged and kept in `records`.
+    """
+
+    def __init__(
+        self,
+        towers: Sequence[SignalTower],
+        phases: Union[List[Phase], Dict[str, List[Phase]]],
+        hooks: Optional[SequenceHooks] = None,
+        max_skew: float = MAX_SKEW,
+        tick_interval: float = TICK_INTERVAL
+    ) -> None:
+        """
+        Args:
+            towers: Towers to drive
+            phases: One phase list for every tower, or a phase list per tower IP
+            hooks: Progress callbacks, driven by the first tower's phases
+            max_skew: Skew in seconds above which a switch is logged as a warning
+            tick_interval: Seconds between on_tick callbacks
+        """
+        self.towers = list(towers)
+        if not self.towers:
+            raise ValueError("FleetSequenceEngine needs at least one tower")
+        self.plans: List[Tuple[SignalTower, List[Phase]]] = [
+            (tower, phases[tower.ip] if isinstance(phases, dict) else phases)
+            for tower in self.towers
+        ]
+        self.phases = self.plans[0][1]
+        self.offsets = phase_offsets(self.phases)
+        self.hooks = hooks or SequenceHooks()
+        self.max_skew = max_skew
+        self.tick_interval = tick_interval
+        self.records: List[SwitchRecord] = []
+        self.finished_at: Optional[float] = None  # Seconds from start at which a completed run ended
+        self._records_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._start = 0.0
+
+    @property
+    def start_time(self) -> float:
+        """time.monotonic() value of the first switch (valid once on_start has been called)."""
+        return self._start
+
+    @property
+    def total_seconds(self) -> float:
+        return max(phase_offsets(phases)[-1] for _, phases in self.plans)
+
+    def stop(self) -> None:
+        """Ask a running sequence to stop (thread-safe)."""
+        self._stop.set()
+
+    def _set_start(self) -> None:
+        self._start = time.monotonic() + START_LEAD
+
+    def _run_tower(
+        self,
+        tower: SignalTower,
+        phases: List[Phase],
+        frames: List[bytes],
+        ready: threading.Barrier
+    ) -> None:
+        offsets = phase_offsets(phases)
+        try:
+            tower.connection.connect()
+        except OSError as e:
+            logger.error(f"Could not pre-open tower {tower.ip}: {e}")
+        except BaseException:
+            # Release the main thread and the other workers instead of leaving them on the barrier
+            ready.abort()
+            raise
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            return
+
+        for i, (phase, frame) in enumerate(zip(phases, frames)):
+            if self._stop.wait(max(0.0, self._start + offsets[i] - time.monotonic())):
+                return
+            issued = time.monotonic()
+            record = SwitchRecord(tower.ip, i, phase.name, offsets[i], issued - self._start)
+            try:
+                tower.send_frame(frame)
+                record.acked = time.monotonic() - self._start
+            except (ConnectionError, ValueError) as e:
+                logger.error(f"Failed to set tower {tower.ip} to '{phase.name}': {e}")
+                record.error = e
+            with self._records_lock:
+                self.records.append(record)
+            self.hooks.on_switch(record)
+            if record.error is not None:
+                self.hooks.on_error(i, phase, record.error)
+
+    def _report_skew(self) -> None:
+        by_offset: Dict[float, List[SwitchRecord]] = {}
+        for record in self.records:
+            by_offset.setdefault(round(record.planned, 6), []).append(record)
+
+        for planned, records in sorted(by_offset.items()):
+            issued = [r.issued for r in records]
+            acked = [r.acked for r in records if r.acked is not None]
+            issue_skew = max(issued) - min(issued)
+            ack_skew = max(acked) - min(acked) if len(acked) > 1 else 0.0
+            message = (f"Switch at +{planned:.3f}s on {len(records)} tower(s): "
+                       f"issue skew {issue_skew * 1000:.1f} ms, ACK skew {ack_skew * 1000:.1f} ms, "
+                       f"latest ACK +{(max(acked) - planned) * 1000 if acked else float('nan'):.1f} ms")
+            if max(issue_skew, ack_skew) > self.max_skew:
+                logger.warning(message)
+            else:
+                logger.info(message)
+
+    def run(self) -> bool:
+        """
+        Run the sequence on every tower.
+
+        Returns:
+            True if every switch on every tower succeeded, False otherwise
+        """
+        self._stop.clear()
+        self.records = []
+        self.finished_at = None
+        # Encode every frame before any worker starts, so a bad state raises here
+        # instead of inside a worker that the others are waiting for
+        frames = {}
+        for tower, phases in self.plans:
+            try:
+                frames[tower.ip] = [tower.encode(phase.state) for phase in phases]
+            except (ValueError, struct.error) as e:
+                raise ValueError(f"Cannot encode the sequence for tower {tower.ip}: {e}") from e
+
+        ready = threading.Barrier(len(self.towers) + 1, action=self._set_start)
+        workers = [
+            threading.Thread(
+                target=self._run_tower, args=(tower, phases, frames[tower.ip], ready),
+                name=f"tower-{tower.ip}", daemon=True
+            )
+            for tower, phases in self.plans
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            logger.error("A tower worker failed before the sequence started")
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+            self.hooks.on_finish(False)
+            return False
+
+        self.hooks.on_start(self.phases, self.total_seconds)
+        deadlines = [self._start + offset for offset in self.offsets]
+        for i, phase in enumerate(self.phases):
+            if self._stop.wait(max(0.0, deadlines[i] - time.monotonic())):
+                break
+            self.hooks.on_phase(i, phase)
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now >= deadlines[i + 1]:
+                    break
+                self.hooks.on_tick(now - deadlines[i], phase.duration, now - self._start, self.total_seconds)
+                self._stop.wait(min(self.tick_interval, deadlines[i + 1] - now))
+
+        for worker in workers:
+            worker.join()
+        if not self._stop.is_set():
+            self.finished_at = time.monotonic() - self._start
+        self._report_skew()
+
+        expected = sum(len(phases) for _, phases in self.plans)
+        completed = (not self._stop.is_set() and len(self.records) == expected
+                     and all(record.error is None for record in self.records))
+        self.hooks.on_finish(completed)
+        return completed
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Serial Session - Keep-open connections to the txpaa temperature Arduinos.
+
+Opening the port raises DTR, which resets an Arduino: that is why every script
+used to sleep 1-2 s after opening and then close the port again (dropping DTR
+via HUPCL, so the next open resets the board once more). A SerialSession opens
+the device once, clears HUPCL so that closing it no longer drops DTR, and
+reuses the connection for every query; it is only reopened after an error.
+
+SEN0256.ino answers `R` with `Serial.print(temp, 1)` and no line ending, so a
+reply is taken to be complete once the line has been quiet for INTER_BYTE_GAP
+(or a newline arrives) instead of waiting for readline() to time out.
+
+pyserial is only used to open and configure the port: its read() and write()
+call select(), which fails for descriptors above FD_SETSIZE (1024), and every
+open port costs five descriptors (the tty and two abort pipes). Sessions do
+their I/O on the non-blocking fd directly and wait with poll().
+"""
+
+import argparse
+import logging
+import os
+import select
+import termios
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+import serial
+
+from port_watcher import PortWatcher
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_BAUD_RATE = 115200
+READ_TIMEOUT = 1.0          # Seconds to wait for the first byte of a reply
+INTER_BYTE_GAP = 0.02       # Seconds of silence that end a reply (~230 byte times at 115200)
+BOOT_DELAY = 2.0            # Seconds an Arduino needs after a DTR reset (bootloader + setup())
+TEMPERATURE_COMMAND = b'R'
+
+
+def device_path(device: str) -> str:
+    """Port path for a device name: '/dev/<name>' unless the name already contains a '/'."""
+    return device if '/' in device else f"/dev/{device}"
+
+
+class SerialSession:
+    """
+    One kept-open serial connection to a device.
+
+    query() is thread-safe; a failed query closes the port so that the next
+    one reopens it, and a query is retried once on a freshly opened port.
+    """
+
+    def __init__(
+        self,
+        device: str,
+        baudrate: int = DEFAULT_BAUD_RATE,
+        timeout: float = READ_TIMEOUT,
+        gap: float = INTER_BYTE_GAP,
+        boot_delay: float = BOOT_DELAY
+    ) -> None:
+        self.device = device
+        self.path = device_path(device)
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.gap = gap
+        self.boot_delay = boot_delay
+        self.lock = threading.Lock()
+        self._serial: Optional[serial.Serial] = None
+        self._opened_at = 0.0
+        self._fresh = False         # No reply seen since the port was opened
+
+    @property
+    def is_open(self) -> bool:
+        return self._serial is not None
+
+    def fileno(self) -> int:
+        """File descriptor of the open port (opening it if needed)."""
+        return self._open().fileno()
+
+    def _open(self) -> serial.Serial:
+        if self._serial is None:
+            logger.debug(f"Opening {self.path}")
+            ser = serial.Serial(self.path, self.baudrate, timeout=0, write_timeout=self.timeout)
+            try:
+                # Keep DTR raised when the port is closed, so neither this
+                # process's reopen nor the next process's open resets the board
+                attrs = termios.tcgetattr(ser.fileno())
+                attrs[2] &= ~termios.HUPCL
+                termios.tcsetattr(ser.fileno(), termios.TCSANOW, attrs)
+            except termios.error as e:
+                logger.debug(f"Cannot clear HUPCL on {self.path}: {e}")
+            self._serial = ser
+            self._opened_at = time.monotonic()
+            self._fresh = True
+        return self._serial
+
+    def close(self) -> None:
+        """Close the port; the next query reopens it."""
+        with self.lock:
+            self._close()
+
+    def discard(self) -> None:
+        """Close the port after an error, for callers already holding the lock."""
+        self._close()
+
+    def _close(self) -> None:
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except (serial.SerialException, OSError):
+                pass
+            self._serial = None
+
+    def read_available(self, ser: serial.Serial) -> bytes:
+        """Read what has arrived on a port that polled readable."""
+        try:
+            data = os.read(ser.fileno(), 4096)
+        except BlockingIOError:
+            return b''
+        if not data:
+            raise serial.SerialException(f"{self.path} reports readiness to read but returned no data")
+        return data
+
+    def read_reply(self, ser: serial.Serial, timeout: float) -> bytes:
+        """Read until a newline or an INTER_BYTE_GAP of silence, waiting up to `timeout` for the first byte."""
+        poller = select.poll()
+        poller.register(ser.fileno(), select.POLLIN)
+        reply = b''
+        wait = timeout
+        while True:
+            if not poller.poll(wait * 1000):
+                return reply
+            data = self.read_available(ser)
+            reply += data
+            if b'\n' in data:
+                return reply
+            if data:
+                wait = self.gap
+
+    def send(self, command: bytes) -> serial.Serial:
+        """Open the port if needed, discard stale input and send a command."""
+        ser = self._open()
+        ser.reset_input_buffer()
+        fd = ser.fileno()
+        while command:
+            try:
+                command = command[os.write(fd, command):]
+            except BlockingIOError:
+                poller = select.poll()
+                poller.register(fd, select.POLLOUT)
+                if not poller.poll(self.timeout * 1000):
+                    raise serial.SerialTimeoutException(f"Write timeout on {self.path}")
+        return ser
+
+    def boot_wait(self) -> Optional[float]:
+        """
+        Seconds still to wait for a board reset by opening the port, or None.
+
+        Only a port that has not answered since it was opened can be waiting
+        on a reset; callers that got no reply wait this long and resend.
+        """
+        if not self._fresh:
+            return None
+        return max(self._opened_at + self.boot_delay - time.monotonic(), 0.0)
+
+    def answered(self) -> None:
+        """Record that the device replied on the current port."""
+        self._fresh = False
+
+    def _exchange(self, command: bytes) -> bytes:
+        ser = self.send(command)
+        reply = self.read_reply(ser, self.timeout)
+        wait = None if reply else self.boot_wait()
+        if wait is not None:
+            # Opening the port probably reset the board (first open since it was
+            # plugged in); wait for it to boot and ask again
+            logger.debug(f"No reply from freshly opened {self.path}; waiting {wait:.1f}s for it to boot")
+            time.sleep(wait)
+            ser = self.send(command)
+            reply = self.read_reply(ser, self.timeout)
+        if reply:
+            self.answered()
+        return reply
+
+    def query(self, command: bytes = TEMPERATURE_COMMAND) -> str:
+        """
+        Send a command and return the decoded, stripped reply.
+
+        Returns an empty string if the device did not answer in time.
+
+        Raises:
+            serial.SerialException: If the port cannot be opened or fails twice
+        """
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    reply = self._exchange(command)
+                    return reply.decode(errors='replace').strip()
+                except (serial.SerialException, OSError) as e:
+                    self._close()
+                    if attempt:
+                        if isinstance(e, serial.SerialException):
+                            raise
+                        raise serial.SerialException(f"{self.path}: {e}") from e
+                    logger.debug(f"Reopening {self.path} after error: {e}")
+            return ''
+
+
+class SessionPool:
+    """
+    One shared SerialSession per device.
+
+    With a PortWatcher the pool tracks which device nodes exist: present()
+    is False for a port whose node is missing (e.g. /dev/txpaa2 while its
+    Arduino is unplugged), so callers can skip it instead of retrying blind,
+    and a session is closed when its node is removed or recreated, so a
+    replugged device is reopened on the next query. Call refresh() before a
+    cycle to apply the events.
+    """
+
+    def __init__(self, watcher: Optional[PortWatcher] = None, **settings) -> None:
+        self.settings = settings
+        self.watcher = watcher
+        self._sessions: Dict[Tuple[str, int], SerialSession] = {}
+        self._missing: Set[str] = set()     # Watched port paths whose node is gone
+        self._lock = threading.Lock()
+
+    def get(self, device: str, baudrate: int = DEFAULT_BAUD_RATE) -> SerialSession:
+        with self._lock:
+            key = (device_path(device), baudrate)
+            if key not in self._sessions:
+                self._sessions[key] = SerialSession(device, baudrate, **self.settings)
+                if self.watcher is not None and self.watcher.watch(key[0]) and not os.path.exists(key[0]):
+                    self._missing.add(key[0])
+            return self._sessions[key]
+
+    def present(self, device: str) -> bool:
+        """False if the watcher knows the device's node is missing (always True without one)."""
+        return device_path(device) not in self._missing
+
+    def refresh(self) -> None:
+        """Apply the watcher's pending plug/unplug events without blocking."""
+        if self.watcher is None:
+            return
+        for path, present in self.watcher.read_events():
+            if present == (path not in self._missing):
+                continue        # e.g. udev adjusting a node that is already there
+            if present:
+                logger.info(f"{path} is back")
+                self._missing.discard(path)
+            else:
+                logger.warning(f"{path} was removed")
+                self._missing.add(path)
+            # The open fd (if any) belongs to the old node
+            with self._lock:
+                sessions = [s for (p, _), s in self._sessions.items() if p == path]
+            for session in sessions:
+                session.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._missing.clear()
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+
+default_pool = SessionPool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query temperature sensors over kept-open sessions")
+    parser.add_argument('devices', nargs='+', help="Device names (e.g. txpaa1) or paths")
+    parser.add_argument('-n', '--count', type=int, default=1, help="Queries per device")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Debug logging")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s [%(levelname)s] %(message)s')
+
+    for device in args.devices:
+        session = default_pool.get(device)
+        for _ in range(args.count):
+            start = time.monotonic()
+            try:
+                reply = session.query()
+            except serial.SerialException as e:
+                print(f"{device}: error: {e}")
+                break
+            print(f"{device}: {reply or '(no reply)'} ({(time.monotonic() - start) * 1000:.0f} ms)")
+    default_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+Signal Tower - A common interface over PNS (LA6/LA-POE) and Patlite ASCII towers.
+
+Detects which protocol a tower speaks on first contact, caches the answer per
+IP, and keeps one pooled connection per tower so that mixed fleets can be set
+to "red/amber/green" in a single parallel call.
+"""
+
+import argparse
+import logging
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+from lapoe_controller import COMMAND_MAP, PNS_NAK, PNS_PRODUCT_ID
+from patlite_control import BuzzerState, FlashSpeed, LightState
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_PORT = 10000
+CONNECT_TIMEOUT = 2.0       # Seconds allowed for connect/send/receive
+PROBE_TIMEOUT = 0.5         # Seconds to wait for an answer while detecting the protocol
+PNS_ACK = 0x06
+
+PROTOCOL_PNS = 'pns'
+PROTOCOL_PATLITE = 'patlite'
+PROTOCOLS = (PROTOCOL_PNS, PROTOCOL_PATLITE)
+
+# PNS run-control pattern bytes (see status_lights.LED_PATTERNS)
+PNS_LIGHT_PATTERNS = {
+    LightState.OFF: 0x00,
+    LightState.ON: 0x01,
+}
+PNS_FLASH_PATTERNS = {      # LightState.FLASH by TowerState.flash_speed
+    FlashSpeed.SLOW: 0x02,
+    FlashSpeed.MEDIUM: 0x03,
+    FlashSpeed.FAST: 0x04,
+}
+PNS_BUZZER_PATTERNS = {
+    BuzzerState.OFF: 0x00,
+    BuzzerState.ON: 0x01,
+    BuzzerState.FLASH: 0x02,
+}
+PNS_NO_CHANGE = 0x09
+
+PATLITE_STATUS_COMMAND = b"$SR\r"
+DISPATCH_RETRY_DELAY = 5.0  # Seconds before a dispatcher retries a failed send
+
+
+@dataclass(frozen=True)
+class TowerState:
+    """Protocol-neutral description of what a tower should show."""
+    red: LightState = LightState.OFF
+    amber: LightState = LightState.OFF
+    green: LightState = LightState.OFF
+    blue: LightState = LightState.OFF          # PNS towers only (LED4)
+    buzzer: Optional[BuzzerState] = None       # None leaves the buzzer unchanged
+    flash_speed: FlashSpeed = FlashSpeed.MEDIUM
+    group: Optional[int] = None                # PNS smart-mode group, used instead of the lights when set
+
+
+# Named states shared by the sequence and motion tools. The smart-mode groups
+# are the codes those scripts used to pass to `la6_controller.py T <code>`;
+# Patlite towers have no smart mode and show the equivalent light combination
+# (yellow is amber + green, blue is a flashing green).
+NAMED_STATES: Dict[str, TowerState] = {
+    'off': TowerState(),
+    'red': TowerState(red=LightState.ON, group=7),
+    'amber': TowerState(amber=LightState.ON, group=8),
+    'yellow': TowerState(amber=LightState.ON, green=LightState.ON, group=9),
+    'green': TowerState(green=LightState.ON, group=10),
+    'blue': TowerState(blue=LightState.ON, green=LightState.FLASH, group=11),
+}
+
+StateLike = Union[str, TowerState]
+
+
+def resolve_state(state: StateLike) -> TowerState:
+    """Turn a state name (e.g. 'red') into a TowerState."""
+    if isinstance(state, TowerState):
+        return state
+    try:
+        return NAMED_STATES[state.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown tower state '{state}'. Choose from: {', '.join(NAMED_STATES)}") from None
+
+
+class TowerConnection:
+    """A persistent TCP connection to one tower, reopened on demand."""
+
+    def __init__(self, ip: str, port: int = DEFAULT_PORT, timeout: float = CONNECT_TIMEOUT) -> None:
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+
+    def _open(self) -> socket.socket:
+        if self._sock is None:
+            logger.debug(f"Connecting to {self.ip}:{self.port}")
+            try:
+                sock = socket.create_connection((self.ip, self.port), timeout=self.timeout)
+            except socket.error as e:
+                raise ConnectionError(f"Unable to connect to {self.ip}:{self.port}") from e
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+        return self._sock
+
+    def connect(self) -> None:
+        """Open the connection now instead of on the first exchange."""
+        with self.lock:
+            self._open()
+
+    def _close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self) -> None:
+        """Close the connection; the next exchange reopens it."""
+        with self.lock:
+            self._close()
+
+    def exchange(self, frame: bytes, timeout: Optional[float] = None) -> bytes:
+        """
+        Send a frame and return the device's reply.
+
+        A connection that has gone stale is reopened once before giving up.
+
+        Args:
+            frame: Bytes to send
+            timeout: Reply timeout in seconds (defaults to the connection timeout)
+
+        Returns:
+            The raw reply (may be empty if the device closed the connection)
+        """
+        with self.lock:
+            for attempt in range(2):
+                sock = self._open()
+                try:
+                    sock.settimeout(timeout or self.timeout)
+                    sock.sendall(frame)
+                    reply = sock.recv(1024)
+                    if reply or attempt:
+                        return reply
+                except socket.timeout:
+                    self._close()
+                    raise ConnectionError(f"Timed out waiting for {self.ip}:{self.port}") from None
+                except socket.error as e:
+                    if attempt:
+                        self._close()
+                        raise ConnectionError(f"Communication error with {self.ip}:{self.port}: {e}") from e
+                # Peer closed or reset the connection; reconnect and resend once
+                logger.debug(f"Reconnecting to {self.ip}:{self.port}")
+                self._close()
+            return b''
+
+
+class ConnectionPool:
+    """One shared TowerConnection per (ip, port)."""
+
+    def __init__(self, timeout: float = CONNECT_TIMEOUT) -> None:
+        self.timeout = timeout
+        self._connections: Dict[Tuple[str, int], TowerConnection] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ip: str, port: int = DEFAULT_PORT) -> TowerConnection:
+        with self._lock:
+            key = (ip, port)
+            if key not in self._connections:
+                self._connections[key] = TowerConnection(ip, port, self.timeout)
+            return self._connections[key]
+
+    def close_all(self) -> None:
+        with self._lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+
+
+default_pool = ConnectionPool()
+
+# Protocol detected for each (ip, port), shared by every pool in the process
+_protocol_cache: Dict[Tuple[str, int], str] = {}
+_protocol_lock = threading.Lock()
+
+
+def detect_protocol(connection: TowerConnection) -> str:
+    """
+    Work out which protocol a tower speaks, caching the answer per IP.
+
+    A PNS status request is tried first; a PNS tower answers with the product
+    ID or an ACK/NAK byte. Otherwise the connection is reopened (to drop any
+    half-read reply) and a Patlite `$SR` status request is tried.
+    """
+    key = (connection.ip, connection.port)
+    with _protocol_lock:
+        if key in _protocol_cache:
+            return _protocol_cache[key]
+
+    protocol = None
+    try:
+        reply = connection.exchange(struct.pack('>2ssx', PNS_PRODUCT_ID, COMMAND_MAP['get-status']), PROBE_TIMEOUT)
+        if reply[:2] == PNS_PRODUCT_ID or reply[:1] in (bytes([PNS_ACK]), bytes([PNS_NAK])):
+            protocol = PROTOCOL_PNS
+    except ConnectionError as e:
+        logger.debug(f"PNS probe of {connection.ip} failed: {e}")
+
+    if protocol is None:
+        connection.close()
+        reply = connection.exchange(PATLITE_STATUS_COMMAND, PROBE_TIMEOUT)
+        if reply.startswith(PATLITE_STATUS_COMMAND[:3]):
+            protocol = PROTOCOL_PATLITE
+        else:
+            raise ConnectionError(f"Unable to identify the protocol spoken by {connection.ip}:{connection.port}")
+
+    logger.info(f"Detected {protocol} protocol on {connection.ip}:{connection.port}")
+    with _protocol_lock:
+        _protocol_cache[key] = protocol
+    return protocol
+
+
+class SignalTower:
+    """Base class for a tower driven over a pooled connection."""
+
+    protocol: Optional[str] = None
+
+    def __init__(self, connection: TowerConnection) -> None:
+        self.connection = connection
+
+    @property
+    def ip(self) -> str:
+        return self.connection.ip
+
+    def encode(self, state: StateLike) -> bytes:
+        """Build the frame that puts the tower in the given state."""
+        raise NotImplementedError
+
+    def check_reply(self, frame: bytes, reply: bytes) -> None:
+        """Raise if the reply is not an acknowledgement of the frame."""
+        raise NotImplementedError
+
+    def send_frame(self, frame: bytes) -> None:
+        """Send a pre-encoded frame and wait for the device to acknowledge it."""
+        self.check_reply(frame, self.connection.exchange(frame))
+
+    def set_state(self, state: StateLike) -> None:
+        """Put the tower in a named state (e.g. 'red') or an explicit TowerState."""
+        self.send_frame(self.encode(state))
+
+    def set_lights(
+        self,
+        red: LightState = LightState.OFF,
+        amber: LightState = LightState.OFF,
+        green: LightState = LightState.OFF,
+        buzzer: Optional[BuzzerState] = None,
+        flash_speed: FlashSpeed = FlashSpeed.MEDIUM
+    ) -> None:
+        """Set the three common lights directly."""
+        self.set_state(TowerState(red=red, amber=amber, green=green, buzzer=buzzer, flash_speed=flash_speed))
+
+    def off(self) -> None:
+        """Turn all lights and the buzzer off."""
+        self.set_state(TowerState(buzzer=BuzzerState.OFF))
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> 'SignalTower':
+        self.connection.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.connection.ip}:{self.connection.port})"
+
+
+class PnsTower(SignalTower):
+    """LA6/LA-POE tower speaking the binary PNS protocol."""
+
+    protocol = PROTOCOL_PNS
+
+    def encode(self, state: StateLike) -> bytes:
+        state = resolve_state(state)
+        if state.group is not None:
+            return struct.pack('>2ssxHB', PNS_PRODUCT_ID, COMMAND_MAP['smart-mode'], 1, state.group)
+        return struct.pack(
+            '>2ssx6B',
+            PNS_PRODUCT_ID,
+            COMMAND_MAP['run-control'],
+            *(self._light_pattern(light, state.flash_speed)
+              for light in (state.red, state.amber, state.green, state.blue, LightState.OFF)),
+            PNS_NO_CHANGE if state.buzzer is None else PNS_BUZZER_PATTERNS[state.buzzer]
+        )
+
+    @staticmethod
+    def _light_pattern(light: LightState, flash_speed: FlashSpeed) -> int:
+        if light is LightState.FLASH:
+            return PNS_FLASH_PATTERNS[flash_speed]
+        return PNS_LIGHT_PATTERNS[light]
+
+    def check_reply(self, frame: bytes, reply: bytes) -> None:
+        if not reply:
+            raise ConnectionError("No response received from device")
+        if reply[0] == PNS_NAK:
+            raise ValueError('Device returned NAK (Negative Acknowledge)')
+
+
+class PatliteTower(SignalTower):
+    """Patlite tower speaking the `$KE` ASCII protocol."""
+
+    protocol = PROTOCOL_PATLITE
+
+    def encode(self, state: StateLike) -> bytes:
+        state = resolve_state(state)
+        cmd = f"$KE{state.red.value}{state.amber.value}{state.green.value}"
+        cmd += f"{state.buzzer.value}" if state.buzzer is not None else "*"
+        cmd += f"{state.flash_speed.value}\r"
+        return cmd.encode('ascii')
+
+    def check_reply(self, frame: bytes, reply: bytes) -> None:
+        if not reply:
+            raise ConnectionError("No response received from device")
+        if reply.strip() != frame.strip():
+            raise ValueError(f"Unexpected reply from Patlite: {reply.decode('ascii', 'replace').strip()}")
+
+
+TOWER_CLASSES = {tower_class.protocol: tower_class for tower_class in (PnsTower, PatliteTower)}
+
+
+def open_tower(
+    ip: str,
+    port: int = DEFAULT_PORT,
+    protocol: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None
+) -> SignalTower:
+    """
+    Get a tower handle on a pooled connection.
+
+    Args:
+        ip: Tower IP address
+        port: Tower port number
+        protocol: 'pns' or 'patlite'; detected on first contact when None
+        pool: Connection pool to use (defaults to the process-wide pool)
+    """
+    connection = (pool or default_pool).get(ip, port)
+    if protocol is None:
+        protocol = detect_protocol(connection)
+    if protocol not in TOWER_CLASSES:
+        raise ValueError(f"Unknown protocol '{protocol}'. Choose from: {', '.join(PROTOCOLS)}")
+    return TOWER_CLASSES[protocol](connection)
+
+
+class TowerFleet:
+    """A set of towers, possibly of mixed protocols, driven in parallel."""
+
+    def __init__(
+        self,
+        ips: Iterable[str],
+        port: int = DEFAULT_PORT,
+        protocol: Optional[str] = None,
+        pool: Optional[ConnectionPool] = None
+    ) -> None:
+        self.port = port
+        self.protocol = protocol
+        self.pool = pool or default_pool
+        self.ips = list(dict.fromkeys(ips))
+        self._towers: Dict[str, SignalTower] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.ips)), thread_name_prefix='tower')
+
+    def tower(self, ip: str) -> SignalTower:
+        """Get (and on first use, detect) the tower at the given IP."""
+        if ip not in self._towers:
+            self._towers[ip] = open_tower(ip, self.port, self.protocol, self.pool)
+        return self._towers[ip]
+
+    def _apply(self, ip: str, state: StateLike) -> None:
+        self.tower(ip).set_state(state)
+
+    def set_state(self, state: Union[StateLike, Mapping[str, StateLike]]) -> Dict[str, Optional[Exception]]:
+        """
+        Set every tower at once.
+
+        Args:
+            state: One state for all towers, or a mapping of IP to state
+
+        Returns:
+            Mapping of IP to the error raised for that tower (None on success)
+        """
+        assignments = state if isinstance(state, Mapping) else {ip: state for ip in self.ips}
+        futures = {ip: self._executor.submit(self._apply, ip, value) for ip, value in assignments.items()}
+        results: Dict[str, Optional[Exception]] = {}
+        for ip, future in futures.items():
+            try:
+                future.result()
+                results[ip] = None
+            except Exception as e:
+                logger.error(f"Failed to set tower {ip}: {e}")
+                results[ip] = e
+        return results
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for tower in self._towers.values():
+            tower.close()
+
+    def __enter__(self) -> 'TowerFleet':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class TowerDispatcher:
+    """
+    Sends states to one tower from a background thread.
+
+    submit() never blocks: it replaces whatever state is still waiting to be
+    sent, so a slow or unreachable tower only ever receives the latest state.
+    The tower connection is opened once and kept for the dispatcher's life;
+    a failed send is retried after DISPATCH_RETRY_DELAY unless a newer state
+    arrives first.
+
+    A submitted state may carry a trace object. Once that state is settled,
+    on_done(trace, issued, acked, error) is called from the dispatcher thread
+    with the monotonic times the command was issued and acknowledged; issued
+    is None if the state was replaced before it was sent.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        port: int = DEFAULT_PORT,
+        protocol: Optional[str] = None,
+        pool: Optional[ConnectionPool] = None,
+        retry_delay: float = DISPATCH_RETRY_DELAY,
+        on_done: Optional[Callable[[Any, Optional[float], Optional[float], Optional[Exception]], None]] = None
+    ) -> None:
+        self.ip = ip
+        self.port = port
+        self.protocol = protocol
+        self.pool = pool
+        self.retry_delay = retry_delay
+        self.on_done = on_done
+        self._tower: Optional[SignalTower] = None
+        self._pending: Optional[Tuple[StateLike, Any]] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"dispatch-{ip}", daemon=True)
+        self._thread.start()
+
+    def submit(self, state: StateLike, trace: Any = None) -> None:
+        """Queue a state for the tower, replacing any state not yet sent."""
+        with self._condition:
+            replaced = self._pending
+            self._pending = (state, trace)
+            self._condition.notify()
+        if replaced is not None:
+            logger.debug(f"Dropping unsent state {replaced[0]!r} for {self.ip}")
+            self._settle(replaced[1], None, None, None)
+
+    def _settle(self, trace: Any, issued: Optional[float], acked: Optional[float], error: Optional[Exception]) -> None:
+        if trace is not None and self.on_done is not None:
+            try:
+                self.on_done(trace, issued, acked, error)
+            except Exception:
+                logger.exception("Dispatch callback failed")
+
+    def _send(self, state: StateLike, trace: Any) -> bool:
+        issued = None
+        try:
+            if self._tower is None:
+                self._tower = open_tower(self.ip, self.port, self.protocol, self.pool)
+            issued = time.monotonic()
+            self._tower.set_state(state)
+        except (ConnectionError, ValueError) as e:
+            logger.error(f"Failed to set tower {self.ip} to {state!r}: {e}")
+            self._settle(trace, issued, None, e)
+            return False
+        self._settle(trace, issued, time.monotonic(), None)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                (state, trace), self._pending = self._pending, None
+
+            if not self._send(state, trace):
+                with self._condition:
+                    # Retry later unless a newer state has already replaced it
+                    # (the trace was settled by the failure, so retries carry none)
+                    if self._closed:
+                        return
+                    if self._pending is None:
+                        self._pending = (state, None)
+                    self._condition.wait(self.retry_delay)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Send any pending state, then stop the thread and close the connection."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        if self._tower is not None:
+            self._tower.close()
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse and validate command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Signal Tower - Drive PNS and Patlite towers through one interface",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""Examples:
+  %(prog)s --ip 172.18.3.200 --state red                   # Set one tower
+  %(prog)s --ip 172.18.3.200 --ip 192.168.1.100 --state green  # Set a mixed fleet
+  %(prog)s --ip 192.168.1.100 --detect                     # Report the protocol only
+"""
+    )
+    parser.add_argument('--ip', action='append', required=True,
+                        help="Tower IP address (repeat for several towers)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"Tower port (default: {DEFAULT_PORT})")
+    parser.add_argument('--protocol', choices=PROTOCOLS,
+                        help="Skip detection and assume this protocol")
+    parser.add_argument('--state', type=str.lower, choices=list(NAMED_STATES),
+                        help="State to show on every tower")
+    parser.add_argument('--detect', action='store_true',
+                        help="Only detect and print each tower's protocol")
+    parser.add_argument('--verbose', action='store_true',
+                        help='Enable debug logging')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Main function to handle command-line interface."""
+    args = parse_arguments()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    with TowerFleet(args.ip, args.port, args.protocol) as fleet:
+        if args.detect or not args.state:
+            failed = False
+            for ip in fleet.ips:
+                try:
+                    print(f"{ip}: {fleet.tower(ip).protocol}")
+                except ConnectionError as e:
+                    print(f"{ip}: {e}", file=sys.stderr)
+                    failed = True
+            sys.exit(1 if failed else 0)
+
+        results = fleet.set_state(args.state)
+        for ip, error in results.items():
+            print(f"{ip}: {'OK' if error is None else f'FAILED ({error})'}")
+        if any(results.values()):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,6 @@ Simple Temperature Monitor
 Checks temperature on 3 devices every 5 minutes.
 Powers off system if any device gets too hot.
 """
-import serial
 import subprocess
 import logging
 import time
@@ -13,6 +12,11 @@ import sys
 import re
 from datetime import datetime
 
+from port_watcher import PortWatcher
+from results_writer import ResultsWriter
+from serial_session import SessionPool
+from temp_poller import TemperaturePoller
+
 # Settings
 DEVICES = ["txpaa1", "txpaa2", "txpaa3"]
 MAX_TEMP = 180.0
@@ -22,41 +26,37 @@ CHECK_EVERY = 300  # seconds (5 minutes)
 LOG_FILE = '/var/log/temperature_monitor.log'
 TEMP_FILE = '/var/log/temperature_results.txt'
 
-# Setup logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s'
-)
+# Readings are written in batches through one open file; hot readings go straight to disk
+results = None  # Opened in main()
 
 # Handle Ctrl+C gracefully
 def shutdown(signum, frame):
     logging.info("Shutting down")
-    sys.exit(0)
+    sys.exit(0)  # main() flushes the results on the way out
 
-signal.signal(signal.SIGTERM, shutdown)
-signal.signal(signal.SIGINT, shutdown)
+# Asks all devices at once; connections stay open between checks (no reset/wake-up wait)
+poller = None  # Created in main()
 
-def get_temperature(device):
-    """Get temperature from one device"""
+def get_temperatures(devices):
+    """Get temperature from every device at once"""
     
-    try:
-        with serial.Serial(f"/dev/{device}", 115200, timeout=1) as conn:
-            time.sleep(1)  # Let device wake up
-            conn.write(b'R\n')  # Ask for temperature
-            response = conn.readline().decode().strip()
-            
-            # Find the number in the response
-            match = re.search(r'\d+\.?\d*', response)
-            if match:
-                return float(match.group())
-            else:
-                logging.warning(f"No temperature found in {device} response: {response}")
-                return None
-                
-    except Exception as e:
-        logging.error(f"Failed to read {device}: {e}")
-        return None
+    temps = {}
+    for result in poller.poll(devices):
+        device, response = result.device, result.response
+        temps[device] = None
+        
+        if response is None:
+            logging.error(f"Failed to read {device}: {result.error}")
+            continue
+        
+        # Find the number in the response
+        match = re.search(r'\d+\.?\d*', response)
+        if match:
+            temps[device] = float(match.group())
+        else:
+            logging.warning(f"No temperature found in {device} response: {response}")
+    
+    return temps
 
 def power_off():
     """Emergency power off"""
@@ -72,9 +72,10 @@ def check_all_devices():
     """Check temperature on all devices"""
     
     emergency = False
+    temps = get_temperatures(DEVICES)
     
     for device in DEVICES:
-        temp = get_temperature(device)
+        temp = temps[device]
         
         if temp is None:
             continue  # Skip failed readings
@@ -83,8 +84,7 @@ def check_all_devices():
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         # Save to results file
-        with open(TEMP_FILE, 'a') as f:
-            f.write(f"{timestamp} - [{device}] {temp}°C\n")
+        results.write(f"{timestamp} - [{device}] {temp}°C", urgent=temp > MAX_TEMP)
         
         # Log to main log
         logging.info(f"[{device}] {temp}°C")
@@ -100,6 +100,18 @@ def check_all_devices():
 
 def main():
     """Main monitoring loop"""
+    global results, poller
+    
+    # Setup logging
+    logging.basicConfig(
+        filename=LOG_FILE,
+        level=logging.INFO,
+        format='%(asctime)s - %(message)s'
+    )
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    results = ResultsWriter(TEMP_FILE, flush_interval=60, fsync='urgent')
+    poller = TemperaturePoller(SessionPool(PortWatcher()), command=b'R\n', baudrate=115200, retry_count=1)
     
     logging.info("Temperature monitor started")
     
@@ -112,6 +124,9 @@ def main():
         logging.info("Stopped by user")
     except Exception as e:
         logging.critical(f"Critical error: {e}")
+    finally:
+        results.close()
+        poller.close()
 
 if __name__ == "__main__":
     main()
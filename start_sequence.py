@@ -1,66 +1,128 @@
 #!/usr/bin/env python3
 """
-LED Cycle Launcher - Launches la6_controller.py with different color codes
-to simulate a gradual LED transition from Green → Yellow → Amber → Red
-over a configurable time period.
+LED Cycle Launcher - Drives one or more LA-POE towers through a gradual LED
+transition from Green → Yellow → Amber → Red over a configurable time period,
+or through the phases of a timeline file. Several towers switch together.
 """
 
-import subprocess
-import time
 import argparse
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
-# Color code mapping
-COLOR_SEQUENCE = [
-    ('green', 10),
-    ('yellow', 9),
-    ('amber', 8),
-    ('red', 7)
-]
-
-CONTROLLER_SCRIPT = "/home/labuser/jazzeryj/la6_controller.py"
+from sequence_engine import (
+    DEFAULT_TOWER_IP, FleetSequenceEngine, Phase, SequenceEngine, SequenceHooks,
+    describe_phases, describe_sequence, equal_phases
+)
+from signal_tower import SignalTower, open_tower
+from timeline import Timeline
+from timing_report import report
 
 DEFAULT_CYCLE_DURATION_MINUTES = 5  # Default cycle duration in minutes
 
-def run_led_command(color_code: int):
-    """Run the controller script with the given color code."""
-    print(f"Running: {CONTROLLER_SCRIPT} T {color_code}")
+
+class ConsoleHooks(SequenceHooks):
+    """Print each phase change as it happens."""
+
+    def on_start(self, phases: List[Phase], total_seconds: float) -> None:
+        self.phase_count = len(phases)
+
+    def on_phase(self, index: int, phase: Phase) -> None:
+        code = f" ({phase.state.group})" if phase.state.group is not None else ""
+        print(f"[Phase {index+1}/{self.phase_count}] Setting LED to '{phase.name}'{code}")
+        label = "next change" if index < self.phase_count - 1 else "the cycle ends"
+        print(f"Waiting for {phase.duration / 60:.2f} minutes before {label}...\n")
+
+    def on_error(self, index: int, phase: Phase, error: Exception) -> None:
+        print(f"Error setting LED to '{phase.name}': {error}")
+
+
+def cycle_leds(phases: List[Phase], ip: str = DEFAULT_TOWER_IP, timing_report: Optional[str] = None):
+    """Run the given phases on the tower, each on its own absolute deadline."""
     try:
-        subprocess.run([
-            "python3", CONTROLLER_SCRIPT, "T", str(color_code)
-        ], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command for color code {color_code}: {e}")
-
-def cycle_leds(duration_minutes: float):
-    """
-    Cycle through the LED colors over the specified duration.
-    Each color gets an equal amount of time.
-    """
-    total_seconds = duration_minutes * 60
-    interval_seconds = total_seconds / len(COLOR_SEQUENCE)
-
-    print(f"\nStarting LED cycle over {duration_minutes:.1f} minute(s):")
-    print("Colors: Green (10) → Yellow (9) → Amber (8) → Red (7)\n")
-
-    for i, (color_name, color_code) in enumerate(COLOR_SEQUENCE):
-        print(f"[Phase {i+1}/{len(COLOR_SEQUENCE)}] Setting LED to '{color_name}' ({color_code})")
-        run_led_command(color_code)
-
-        if i < len(COLOR_SEQUENCE) - 1:
-            print(f"Waiting for {interval_seconds / 60:.2f} minutes before next change...")
-            time.sleep(interval_seconds)
-            print()
+        tower = open_tower(ip)
+    except (ConnectionError, OSError) as e:
+        logging.error(f"Could not reach tower {ip}: {e}")
+        return
+
+    with tower:
+        engine = SequenceEngine(tower, phases, ConsoleHooks(), stop_on_error=False)
+        engine.run()
 
     print("\n✅ LED cycle complete.")
+    report(engine, timing_report)
+
+def open_towers(ips: List[str]) -> List[SignalTower]:
+    """Open the towers in parallel, reporting and skipping the unreachable ones."""
+    towers = []
+    with ThreadPoolExecutor(max_workers=len(ips)) as executor:
+        futures = {ip: executor.submit(open_tower, ip) for ip in ips}
+    errors = []
+    for ip, future in futures.items():
+        try:
+            towers.append(future.result())
+        except (ConnectionError, OSError) as e:
+            logging.error(f"Could not reach tower {ip}: {e}")
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        # Do not leak the connections that did open
+        for tower in towers:
+            tower.close()
+        raise errors[0]
+    return towers
+
+def cycle_fleet(plans: Dict[str, List[Phase]], timing_report: Optional[str] = None):
+    """Run the phases on several towers at once, switching them together."""
+    towers = open_towers(list(plans))
+    if not towers:
+        logging.error("No tower could be reached")
+        return
+    try:
+        engine = FleetSequenceEngine(towers, plans, ConsoleHooks())
+        engine.run()
+    finally:
+        for tower in towers:
+            tower.close()
+
+    print("\n✅ LED cycle complete.")
+    report(engine, timing_report)
 
 def main():
     parser = argparse.ArgumentParser(description="Control LA-POE LEDs with a timed color cycle.")
     parser.add_argument("--duration", "-d", type=float, default=DEFAULT_CYCLE_DURATION_MINUTES,
                         help=f"Duration of the full LED cycle in minutes (default: {DEFAULT_CYCLE_DURATION_MINUTES} min)")
+    parser.add_argument("--timeline", "-t",
+                        help="Timeline JSON file to run instead of the equal Green → Red split")
+    parser.add_argument("--ip", action="append",
+                        help=f"IP address of the tower; repeat to run several in sync (default: {DEFAULT_TOWER_IP})")
+    parser.add_argument("--timing-report", metavar="PATH",
+                        help="Export per-phase switch timing to PATH (.csv or .json)")
 
     args = parser.parse_args()
+    ips = list(dict.fromkeys(args.ip or [DEFAULT_TOWER_IP]))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.timeline:
+        try:
+            timeline = Timeline.load(args.timeline)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        plans = {ip: timeline.compile_phases(ip) for ip in ips}
+        print(f"\nStarting timeline {args.timeline}:")
+        print(f"Phases: {describe_phases(plans[ips[0]])}\n")
+    else:
+        plans = {ip: equal_phases(args.duration * 60) for ip in ips}
+        print(f"\nStarting LED cycle over {args.duration:.1f} minute(s):")
+        print(f"Colors: {describe_sequence()}\n")
 
-    cycle_leds(args.duration)
+    if len(ips) == 1:
+        cycle_leds(plans[ips[0]], ips[0], args.timing_report)
+    else:
+        print(f"Towers: {', '.join(ips)}\n")
+        cycle_fleet(plans, args.timing_report)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Temp Metrics - Prometheus metrics for the temperature monitors.
+
+A small registry of gauges, counters and histograms rendered in the
+Prometheus text exposition format (no prometheus_client needed). The metrics
+can be scraped from a built-in HTTP endpoint (MetricsServer, /metrics) or
+written atomically for node_exporter's textfile collector (write_textfile).
+
+MonitorMetrics holds the metrics a monitor updates after each cycle:
+
+  temp_monitor_temperature_celsius{device}           last good reading
+  temp_monitor_read_latency_seconds{device}          histogram, request to final outcome
+  temp_monitor_read_failures_total{device}           polls where every attempt failed
+  temp_monitor_read_retries_total{device}            attempts beyond the first
+  temp_monitor_over_temp_count{device}               consecutive over-threshold polls
+  temp_monitor_cycle_duration_seconds                histogram, one check of all due devices
+  temp_monitor_last_cycle_timestamp_seconds          when the last check finished
+  temp_monitor_emergencies_total                     checks that called for a power-off
+"""
+
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Defaults
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CYCLE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """One metric family; samples are keyed by label values."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, not {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        return []
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self.samples())
+        return lines
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def remove(self, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(Gauge):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}     # Per bucket, then +Inf
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def samples(self) -> Iterable[str]:
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(self._sums[key])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    """The metrics one process exposes."""
+
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if any(m.name == metric.name for m in self._metrics):
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def write_textfile(registry: Registry, path: str) -> None:
+    """Write the metrics for node_exporter's textfile collector (atomically, as it requires)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.', suffix='.prom.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(registry.render())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class MetricsServer:
+    """Serves a registry on http://<address>:<port>/metrics from a daemon thread."""
+
+    def __init__(self, registry: Registry, port: int, address: str = '') -> None:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                logger.debug(f"Metrics request from {self.address_string()}: {format % args}")
+
+        self._server = ThreadingHTTPServer((address, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics on {address or '*'}:{self.port}/metrics")
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+class MonitorMetrics:
+    """The temperature monitor metrics, updated once per cycle."""
+
+    def __init__(self, registry: Optional[Registry] = None) -> None:
+        self.registry = registry or Registry()
+        register = self.registry.register
+        self.temperature = register(Gauge(
+            'temp_monitor_temperature_celsius', "Last good temperature reading", ['device']))
+        self.read_latency = register(Histogram(
+            'temp_monitor_read_latency_seconds', "Time from the first request to the final outcome of a read",
+            ['device'], LATENCY_BUCKETS))
+        self.read_failures = register(Counter(
+            'temp_monitor_read_failures_total', "Reads where every attempt failed", ['device']))
+        self.read_retries = register(Counter(
+            'temp_monitor_read_retries_total', "Read attempts beyond the first", ['device']))
+        self.over_temp = register(Gauge(
+            'temp_monitor_over_temp_count', "Consecutive readings over the threshold", ['device']))
+        self.cycle_duration = register(Histogram(
+            'temp_monitor_cycle_duration_seconds', "Duration of one check of all due devices",
+            buckets=CYCLE_BUCKETS))
+        self.last_cycle = register(Gauge(
+            'temp_monitor_last_cycle_timestamp_seconds', "Unix time the last check finished"))
+        self.emergencies = register(Counter(
+            'temp_monitor_emergencies_total', "Checks that called for a power-off"))
+
+    def record_read(self, device: str, latency: float, attempts: int, failed: bool) -> None:
+        """Record one device's poll outcome (e.g. from a temp_poller.PollResult)."""
+        self.read_latency.observe(latency, device=device)
+        self.read_retries.inc(max(attempts - 1, 0), device=device)
+        self.read_failures.inc(1 if failed else 0, device=device)
+
+    def record_cycle(
+        self,
+        duration: float,
+        temperatures: Iterable[Tuple[str, Optional[float]]],
+        over_temp_counts: Dict[str, int],
+        emergency: bool
+    ) -> None:
+        """Record the outcome of a check."""
+        for device, temp in temperatures:
+            if temp is not None:
+                self.temperature.set(temp, device=device)
+        for device, count in over_temp_counts.items():
+            self.over_temp.set(count, device=device)
+        self.cycle_duration.observe(duration)
+        self.last_cycle.set(time.time())
+        self.emergencies.inc(1 if emergency else 0)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Temperature Poller - Query many serial temperature sensors concurrently.
+
+An asyncio event loop owns one SerialSession per device and waits on the
+session file descriptors with loop.add_reader(), so every `R` query of a cycle
+is in flight at once without a thread per device. Each device has its own
+reply timeout, retries and retry delay, and a cycle takes as long as its
+slowest device instead of the sum of all of them. With burst > 1 each device
+is asked several times in quick succession over its open session, so callers
+can filter out glitches within one cycle. Given a SessionPool with a
+PortWatcher, a device whose node is missing fails at once instead of being
+retried, until its node reappears.
+
+Synchronous callers use poll(); the event loop is private to the poller.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import serial
+
+from serial_session import SerialSession, SessionPool, TEMPERATURE_COMMAND
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEVICE_TIMEOUT = 1.0        # Seconds to wait for the first byte of a reply
+RETRY_COUNT = 3             # Attempts per device per cycle
+RETRY_DELAY = 0.5           # Seconds between attempts
+
+
+@dataclass
+class PollResult:
+    """Outcome of one device's query in a cycle."""
+    device: str
+    response: Optional[str]         # None if every attempt failed
+    attempts: int
+    latency: float                  # Seconds from the first request to the final outcome
+    error: Optional[str] = None
+    samples: List[str] = field(default_factory=list)    # Every accepted reply of a burst
+
+
+class TemperaturePoller:
+    """Runs concurrent queries over kept-open sessions."""
+
+    def __init__(
+        self,
+        sessions: Optional[SessionPool] = None,
+        command: bytes = TEMPERATURE_COMMAND,
+        baudrate: int = 115200,
+        timeout: float = DEVICE_TIMEOUT,
+        retry_count: int = RETRY_COUNT,
+        retry_delay: float = RETRY_DELAY,
+        device_timeouts: Optional[Dict[str, float]] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+        burst: int = 1
+    ) -> None:
+        self.sessions = sessions or SessionPool()
+        self.command = command
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.retry_count = max(retry_count, 1)
+        self.retry_delay = retry_delay
+        self.device_timeouts = device_timeouts or {}
+        self.accept = accept        # Replies it rejects are retried like failures
+        self.burst = max(burst, 1)  # Replies gathered per device per cycle
+        self._loop = asyncio.new_event_loop()
+
+    async def _readable(self, fd: int, timeout: float) -> bool:
+        """Wait until fd is readable; False on timeout."""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await asyncio.wait_for(ready, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(fd)
+
+    async def _read_reply(self, session: SerialSession, ser: serial.Serial, timeout: float) -> bytes:
+        """Async counterpart of SerialSession.read_reply()."""
+        reply = b''
+        wait = timeout
+        while await self._readable(ser.fileno(), wait):
+            data = session.read_available(ser)
+            reply += data
+            if b'\n' in data:
+                break
+            if data:
+                wait = session.gap
+        return reply
+
+    async def _exchange(self, session: SerialSession, timeout: float) -> str:
+        ser = session.send(self.command)
+        reply = await self._read_reply(session, ser, timeout)
+        wait = None if reply else session.boot_wait()
+        if wait is not None:
+            # The open probably reset the board; let it boot and ask again
+            logger.debug(f"No reply from freshly opened {session.path}; waiting {wait:.1f}s for it to boot")
+            await asyncio.sleep(wait)
+            ser = session.send(self.command)
+            reply = await self._read_reply(session, ser, timeout)
+        if reply:
+            session.answered()
+        return reply.decode(errors='replace').strip()
+
+    async def _burst(self, session: SerialSession, timeout: float, first: str) -> List[str]:
+        """Gather the rest of a burst; failed or rejected samples are skipped, not retried."""
+        samples = [first]
+        for _ in range(self.burst - 1):
+            try:
+                response = await self._exchange(session, timeout)
+            except (serial.SerialException, OSError) as e:
+                logger.debug(f"Burst read failed on {session.path}: {e}")
+                session.discard()
+                break
+            if response and (self.accept is None or self.accept(response)):
+                samples.append(response)
+        return samples
+
+    async def read(self, device: str) -> PollResult:
+        """Query one device, retrying on errors and empty replies."""
+        session = self.sessions.get(device, self.baudrate)
+        if not self.sessions.present(device):
+            # Its node is gone; the pool's watcher says when it is plugged back in
+            return PollResult(device, None, 0, 0.0, f"{session.path} is not present")
+        timeout = self.device_timeouts.get(device, self.timeout)
+        start = time.monotonic()
+        error = None
+        for attempt in range(1, self.retry_count + 1):
+            try:
+                response = await self._exchange(session, timeout)
+                if response and (self.accept is None or self.accept(response)):
+                    samples = await self._burst(session, timeout, response)
+                    return PollResult(device, response, attempt, time.monotonic() - start, samples=samples)
+                error = f"unusable reply '{response}'" if response else "no reply"
+            except (serial.SerialException, OSError) as e:
+                session.discard()
+                error = str(e)
+            logger.warning(f"Attempt {attempt} failed on {device}: {error}")
+            if attempt < self.retry_count:
+                await asyncio.sleep(self.retry_delay)
+        return PollResult(device, None, self.retry_count, time.monotonic() - start, error)
+
+    async def poll_async(self, devices: Sequence[str]) -> List[PollResult]:
+        self.sessions.refresh()
+        return list(await asyncio.gather(*(self.read(d) for d in devices)))
+
+    def poll(self, devices: Sequence[str]) -> List[PollResult]:
+        """Query every device concurrently and return the results in device order."""
+        return self._loop.run_until_complete(self.poll_async(devices))
+
+    def close(self) -> None:
+        self.sessions.close_all()
+        self._loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Poll temperature sensors concurrently")
+    parser.add_argument('devices', nargs='+', help="Device names (e.g. txpaa1) or paths")
+    parser.add_argument('--timeout', type=float, default=DEVICE_TIMEOUT, help="Reply timeout per device")
+    parser.add_argument('--retries', type=int, default=RETRY_COUNT, help="Attempts per device")
+    parser.add_argument('--burst', type=int, default=1, help="Replies gathered per device")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    poller = TemperaturePoller(timeout=args.timeout, retry_count=args.retries, burst=args.burst)
+    start = time.monotonic()
+    for result in poller.poll(args.devices):
+        outcome = ", ".join(result.samples) if result.response is not None else f"FAILED ({result.error})"
+        print(f"{result.device}: {outcome} [{result.latency * 1000:.0f} ms, {result.attempts} attempt(s)]")
+    print(f"Cycle: {(time.monotonic() - start) * 1000:.0f} ms")
+    poller.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Temp Store - Append-only binary time series of temperature readings.
+
+The results files hold free-form lines such as
+`2025-05-04 12:00:00 - [txpaa1] 42.0°C` that every analysis re-parses with
+strptime. A TempStore keeps the same readings as fixed-width 16-byte records
+(timestamp, device id, status, value) that NumPy maps straight into a
+structured array:
+
+  <root>/devices.json   device name -> id (locked while it is updated)
+  <root>/<id>.bin       one segment per device, records in time order
+  <root>/<id>.idx       sparse index: the timestamp of every INDEX_STRIDE-th record
+
+A range query binary-searches the small index to find the few blocks that can
+hold the range and only then touches the segment, so months of data are
+sliced in milliseconds without reading them.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import re
+import struct
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Constants
+DEFAULT_STORE = '/var/log/temperature_store'
+RECORD_FORMAT = '<dHBxf'    # timestamp, device id, status, pad, value (°C)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('device', '<u2'),
+    ('status', 'u1'),
+    ('pad', 'u1'),
+    ('value', '<f4'),
+])
+INDEX_DTYPE = np.dtype('<f8')
+INDEX_STRIDE = 1024         # Records per sparse index entry
+
+STATUS_OK = 0
+STATUS_READ_ERROR = 1       # value is NaN
+STATUS_OVERHEAT = 2         # Reading over the monitor's threshold
+STATUS_PREDICTED = 3        # Below the threshold but projected to pass it
+STATUS_NAMES = {
+    STATUS_OK: 'ok',
+    STATUS_READ_ERROR: 'read error',
+    STATUS_OVERHEAT: 'overheat',
+    STATUS_PREDICTED: 'predicted overheat',
+}
+
+# Lines written by the monitors and by the older loggers the graph scripts read
+LINE_PATTERNS = (
+    re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) - \[(.+?)\] (?:Temperature: )?([-+]?\d*\.?\d+)°C'),
+    re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) - (.+?): ([-+]?\d*\.?\d+)°C'),
+    re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) - \[(.+?)\] (READ_ERROR)'),
+)
+
+
+class TempStore:
+    """A directory of per-device reading segments."""
+
+    def __init__(self, root: str = DEFAULT_STORE) -> None:
+        self.root = root
+        self.device_path = os.path.join(root, 'devices.json')
+        self._device_ids: Dict[str, int] = {}
+        self._segments: Dict[int, int] = {}     # device id -> open segment fd
+
+    # -- device ids ---------------------------------------------------------
+
+    def _read_devices(self) -> Dict[str, int]:
+        try:
+            with open(self.device_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def device_id(self, name: str) -> int:
+        """Id for a device name, registering it on first use."""
+        if name not in self._device_ids:
+            os.makedirs(self.root, exist_ok=True)
+            # Lock so that several monitors never hand out the same id twice
+            with open(self.device_path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                content = f.read()
+                devices = json.loads(content) if content else {}
+                if name not in devices:
+                    devices[name] = len(devices)
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(devices, f, indent=2)
+                    f.flush()
+            self._device_ids = devices
+        return self._device_ids[name]
+
+    def devices(self) -> Dict[int, str]:
+        """Map of device id to name."""
+        return {i: name for name, i in self._read_devices().items()}
+
+    def _segment_path(self, device: int, suffix: str = 'bin') -> str:
+        return os.path.join(self.root, f"{device}.{suffix}")
+
+    # -- writing -------------------------------------------------------------
+
+    def append(
+        self,
+        device: str,
+        value: Optional[float],
+        status: int = STATUS_OK,
+        timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Record one reading; value None is stored as a read error.
+
+        The record and, every INDEX_STRIDE records, its index entry are written
+        under an exclusive lock on the segment, so several monitors can append
+        to one device.
+        """
+        device_id = self.device_id(device)
+        if value is None:
+            value, status = float('nan'), STATUS_READ_ERROR
+        timestamp = time.time() if timestamp is None else timestamp
+        record = struct.pack(RECORD_FORMAT, timestamp, device_id, status, value)
+
+        fd = self._segments.get(device_id)
+        if fd is None:
+            fd = os.open(self._segment_path(device_id), os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            self._segments[device_id] = fd
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            size = os.fstat(fd).st_size
+            position = size // RECORD_SIZE
+            if size % RECORD_SIZE:
+                # Drop a record torn by a crash so the segment stays aligned
+                os.ftruncate(fd, position * RECORD_SIZE)
+            os.write(fd, record)
+            if position % INDEX_STRIDE == 0:
+                index = os.open(self._segment_path(device_id, 'idx'), os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC, 0o644)
+                try:
+                    os.pwrite(index, struct.pack('<d', timestamp), position // INDEX_STRIDE * INDEX_DTYPE.itemsize)
+                finally:
+                    os.close(index)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def extend(self, readings: Iterable[Tuple[str, Optional[float], int, float]]) -> None:
+        """Append (device, value, status, timestamp) readings."""
+        for device, value, status, timestamp in readings:
+            self.append(device, value, status, timestamp)
+
+    def close(self) -> None:
+        for fd in self._segments.values():
+            os.close(fd)
+        self._segments.clear()
+
+    # -- reading -------------------------------------------------------------
+
+    def load(self, device: str) -> np.ndarray:
+        """Every record of a device as a read-only structured array (memory-mapped)."""
+        device_id = self._read_devices().get(device)
+        if device_id is None:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return self._map(device_id)
+
+    def _map(self, device_id: int) -> np.ndarray:
+        try:
+            size = os.path.getsize(self._segment_path(device_id))
+        except FileNotFoundError:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        count = size // RECORD_SIZE     # Ignore a torn record at the end
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self._segment_path(device_id), dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+    def _index(self, device_id: int) -> np.ndarray:
+        try:
+            return np.fromfile(self._segment_path(device_id, 'idx'), dtype=INDEX_DTYPE)
+        except FileNotFoundError:
+            return np.empty(0, dtype=INDEX_DTYPE)
+
+    def _locate(self, records: np.ndarray, index: np.ndarray, t: Optional[float], default: int) -> int:
+        """Position of the first record at or after t, searching only the block the index points to."""
+        if t is None:
+            return default
+        following = int(np.searchsorted(index, t, side='left'))
+        lo = min(max(following - 1, 0) * INDEX_STRIDE, len(records))
+        # The last block runs to the end (its index entry may lag a crash)
+        hi = len(records) if following >= len(index) else min(following * INDEX_STRIDE + 1, len(records))
+        return lo + int(np.searchsorted(records['time'][lo:hi], t, side='left'))
+
+    def series(self, device: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Records of one device with start <= time < end, as a view of the mapped segment."""
+        device_id = self._read_devices().get(device)
+        if device_id is None:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        records = self._map(device_id)
+        index = self._index(device_id)
+        lo = self._locate(records, index, start, 0)
+        hi = self._locate(records, index, end, len(records))
+        return records[lo:hi]
+
+    def readings(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        devices: Optional[Sequence[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """series() for every device (or the given ones), keyed by name."""
+        names = devices if devices is not None else sorted(self._read_devices())
+        return {name: self.series(name, start, end) for name in names}
+
+    def last_time(self) -> Optional[float]:
+        """Timestamp of the newest record in the store."""
+        ends = [float(r['time'][-1]) for r in (self.load(n) for n in self._read_devices()) if len(r)]
+        return max(ends) if ends else None
+
+
+def parse_line(line: str) -> Optional[Tuple[float, str, Optional[float]]]:
+    """(timestamp, device, °C or None for READ_ERROR) from a results file line."""
+    for pattern in LINE_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            stamp, device, value = match.groups()
+            timestamp = datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').timestamp()
+            return timestamp, device, None if value == 'READ_ERROR' else float(value)
+    return None
+
+
+def import_text(store: TempStore, path: str, threshold: Optional[float] = None) -> Tuple[int, int]:
+    """
+    Append the readings of a text results file to the store.
+
+    Lines are sorted per device first, since the index relies on time order.
+    Returns (imported, skipped) line counts.
+
+    Raises:
+        ValueError: If a device's readings would start before its newest stored
+            record (nothing is imported then)
+    """
+    parsed = []
+    skipped = 0
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            reading = parse_line(line)
+            if reading is None:
+                skipped += 1
+            else:
+                parsed.append(reading)
+    parsed.sort(key=lambda r: (r[1], r[0]))
+    first: Dict[str, float] = {}
+    for timestamp, device, _ in parsed:
+        first.setdefault(device, timestamp)
+    for device, timestamp in first.items():
+        stored = store.load(device)
+        if len(stored) and timestamp < stored['time'][-1]:
+            newest = datetime.fromtimestamp(float(stored['time'][-1])).strftime('%Y-%m-%d %H:%M:%S')
+            raise ValueError(f"{path} has {device} readings older than its newest stored record ({newest}); "
+                             f"appending them would break the store's time order")
+    for timestamp, device, value in parsed:
+        status = STATUS_OVERHEAT if value is not None and threshold is not None and value > threshold else STATUS_OK
+        store.append(device, value, status, timestamp)
+    return len(parsed), skipped
+
+
+def local_offsets(times: np.ndarray) -> np.ndarray:
+    """
+    Host UTC offset in seconds at each timestamp, so times across a DST change
+    convert to the local time they were recorded in.
+
+    Offsets only change on quarter-hour boundaries, so one lookup per distinct
+    quarter hour is enough.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    quarters, inverse = np.unique(np.floor(times / 900), return_inverse=True)
+    offsets = np.array([
+        datetime.fromtimestamp(q * 900).astimezone().utcoffset().total_seconds() for q in quarters
+    ])
+    return offsets[inverse].reshape(times.shape)
+
+
+def parse_time(value: str) -> float:
+    """Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM[:SS]' local time to a timestamp."""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Invalid time '{value}'")
+
+
+def summarize(readings: Dict[str, np.ndarray]) -> List[str]:
+    """Printable per-device statistics."""
+    lines = []
+    for device, records in readings.items():
+        valid = records['value'][records['status'] != STATUS_READ_ERROR]
+        lines.append(f"{device}: {len(records)} readings")
+        if len(records) == 0:
+            continue
+        lines.append(f"  From {datetime.fromtimestamp(records['time'][0]):%Y-%m-%d %H:%M:%S} "
+                     f"to {datetime.fromtimestamp(records['time'][-1]):%Y-%m-%d %H:%M:%S}")
+        if len(valid):
+            lines.append(f"  Average {valid.mean():.2f}°C, min {valid.min():.2f}°C, "
+                         f"max {valid.max():.2f}°C, median {np.median(valid):.2f}°C")
+        counts = np.bincount(records['status'], minlength=len(STATUS_NAMES))
+        lines.append("  " + ", ".join(f"{STATUS_NAMES.get(s, s)}: {c}" for s, c in enumerate(counts) if c))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Temperature reading store")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="Store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    summary = commands.add_parser('summary', help="Statistics per device")
+    summary.add_argument('--start', type=parse_time, help="Only readings from this local time")
+    summary.add_argument('--end', type=parse_time, help="Only readings before this local time")
+    summary.add_argument('--device', action='append', help="Only this device (repeatable)")
+    imports = commands.add_parser('import', help="Append a text results file")
+    imports.add_argument('file', help="e.g. /var/log/temperature_results.txt")
+    imports.add_argument('--threshold', type=float, help="Mark readings above this as overheats")
+    args = parser.parse_args()
+
+    store = TempStore(args.store)
+    if args.command == 'import':
+        try:
+            imported, skipped = import_text(store, args.file, args.threshold)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        finally:
+            store.close()
+        print(f"Imported {imported} readings from {args.file} ({skipped} lines skipped)")
+        return
+
+    if not os.path.exists(store.device_path):
+        print(f"Error: {store.root} is not a temperature store")
+        sys.exit(1)
+    start = time.monotonic()
+    readings = store.readings(args.start, args.end, args.device)
+    elapsed = time.monotonic() - start
+    print("\n".join(summarize(readings)))
+    print(f"Query: {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from temp_store import STATUS_READ_ERROR, TempStore, local_offsets
+
+COLUMNS = ['datetime', 'room', 'temperature']
+
 
 def parse_temperature_line(line):
     """Parse a single line of temperature data."""
@@ -37,10 +41,32 @@ def read_temperature_data(filename):
             else:
                 invalid_lines.append(line.strip())
 
-    df = pd.DataFrame(data, columns=['datetime', 'room', 'temperature'])
+    df = pd.DataFrame(data, columns=COLUMNS)
     return df, invalid_lines, total_lines
 
 
+def read_store_data(root, days_to_show):
+    """Read the last days_to_show days of readings from a temp_store directory."""
+    store = TempStore(str(root))
+    end = store.last_time()
+    if end is None:
+        return pd.DataFrame(columns=COLUMNS), [], 0
+
+    # The store keeps UTC timestamps; the text files hold local time (per
+    # reading, so data across a DST change is not shifted by an hour)
+    frames = []
+    total = 0
+    for room, records in store.readings(start=end - days_to_show * 86400).items():
+        total += len(records)
+        records = records[records['status'] != STATUS_READ_ERROR]
+        frames.append(pd.DataFrame({
+            'datetime': pd.to_datetime(records['time'] + local_offsets(records['time']), unit='s'),
+            'room': room,
+            'temperature': records['value'].astype(float),
+        }))
+    return pd.concat(frames, ignore_index=True), [], total
+
+
 def clean_temperature_data(df, min_temp, max_temp, z_threshold=3):
     """Remove temperature outliers using absolute limits and z-score method."""
     stats = {'original_count': len(df), 'removed_absolute': 0, 'removed_zscore': 0}
@@ -78,7 +104,10 @@ def generate_summary(df):
 
 def process_temperature_data(filename, days_to_show, min_temp, max_temp):
     """Process and visualize temperature data."""
-    df, invalid_lines, total_lines = read_temperature_data(filename)
+    if Path(filename).is_dir():
+        df, invalid_lines, total_lines = read_store_data(filename, days_to_show)
+    else:
+        df, invalid_lines, total_lines = read_temperature_data(filename)
     
     # Filter for the last X days
     end_date = df['datetime'].max()
@@ -158,7 +187,7 @@ def process_temperature_data(filename, days_to_show, min_temp, max_temp):
 
 def main():
     parser = argparse.ArgumentParser(description='Process and visualize temperature data from a file.')
-    parser.add_argument('filename', type=Path, help='Path to the temperature data file')
+    parser.add_argument('filename', type=Path, help='Path to the temperature data file or temp_store directory')
     parser.add_argument('-d', '--days', type=int, default=7, help='Number of days to show (default: 7)')
     parser.add_argument('--min-temp', type=float, default=20, help='Minimum valid temperature in Celsius (default: 20)')
     parser.add_argument('--max-temp', type=float, default=50, help='Maximum valid temperature in Celsius (default: 50)')
@@ -9,6 +9,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from temp_store import STATUS_READ_ERROR, TempStore, local_offsets
+
+COLUMNS = ['datetime', 'room', 'temperature_c', 'temperature_f']
+
 def parse_temperature_line(line):
     """
     Parse a single line of temperature data.
@@ -61,9 +65,41 @@ def read_temperature_data(filename):
             else:
                 invalid_lines.append(line.strip())
 
-    df = pd.DataFrame(data, columns=['datetime', 'room', 'temperature_c', 'temperature_f'])
+    df = pd.DataFrame(data, columns=COLUMNS)
     return df, invalid_lines, total_lines
 
+def read_store_data(root, days_to_show):
+    """
+    Read the last days_to_show days of readings from a temp_store directory.
+    
+    Args:
+    root (str): Path to the store directory.
+    days_to_show (int): Number of days to read, counted back from the newest reading.
+
+    Returns:
+    tuple: (DataFrame, list of invalid lines, total record count)
+    """
+    store = TempStore(str(root))
+    end = store.last_time()
+    if end is None:
+        return pd.DataFrame(columns=COLUMNS), [], 0
+
+    # The store keeps UTC timestamps; the text files hold local time (per
+    # reading, so data across a DST change is not shifted by an hour)
+    frames = []
+    total = 0
+    for room, records in store.readings(start=end - days_to_show * 86400).items():
+        total += len(records)
+        records = records[records['status'] != STATUS_READ_ERROR]
+        celsius = records['value'].astype(float)
+        frames.append(pd.DataFrame({
+            'datetime': pd.to_datetime(records['time'] + local_offsets(records['time']), unit='s'),
+            'room': room,
+            'temperature_c': celsius,
+            'temperature_f': celsius * 9 / 5 + 32,
+        }))
+    return pd.concat(frames, ignore_index=True), [], total
+
 def clean_temperature_data(df, min_temp_c, max_temp_c, z_threshold=3):
     """
     Remove temperature outliers using absolute limits and z-score method.
@@ -136,7 +172,10 @@ def process_temperature_data(filename, days_to_show, min_temp_c, max_temp_c):
     min_temp_c (float): Minimum valid temperature in Celsius.
     max_temp_c (float): Maximum valid temperature in Celsius.
     """
-    df, invalid_lines, total_lines = read_temperature_data(filename)
+    if Path(filename).is_dir():
+        df, invalid_lines, total_lines = read_store_data(filename, days_to_show)
+    else:
+        df, invalid_lines, total_lines = read_temperature_data(filename)
     
     # Filter for the last X days
     end_date = df['datetime'].max()
@@ -240,7 +279,7 @@ def main():
     Main function to parse command-line arguments and run the data processing.
     """
     parser = argparse.ArgumentParser(description='Process and visualize temperature data from a file.')
-    parser.add_argument('filename', type=Path, help='Path to the temperature data file')
+    parser.add_argument('filename', type=Path, help='Path to the temperature data file or temp_store directory')
     parser.add_argument('-d', '--days', type=int, default=7, help='Number of days to show (default: 7)')
     parser.add_argument('--min-temp', type=float, default=20, 
                         help='Minimum valid temperature in Celsius (default: 20)')
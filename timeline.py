@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Timeline Files - Declarative colour sequences for the start_sequence tools.
+
+A timeline is a JSON file describing named states, per-phase durations,
+repeats and per-tower overrides:
+
+    {
+      "states": {
+        "warning": {"amber": "flash", "buzzer": "on"},
+        "go": "green"
+      },
+      "phases": [
+        {"state": "go", "duration": "4m"},
+        {"state": "yellow", "duration": 90},
+        {"state": "warning", "duration": "1m30s"},
+        {"state": "red", "duration": "3m"}
+      ],
+      "repeat": 1,
+      "towers": {
+        "172.18.3.201": {"repeat": 2, "phases": [{"state": "red", "duration": "5m"}]}
+      }
+    }
+
+A state is either the name of a signal_tower state ("red", "green", ...) or
+an object with any of red/amber/green/blue ("off", "on", "flash"),
+buzzer ("off", "on", "flash"), flash_speed ("slow", "medium", "fast") and
+group (PNS smart-mode group, 7-11). A phase may name a state or give a
+state object inline. Durations are seconds or strings such as "90s",
+"2.5m", "500ms", "1h" or "1m30s". A tower override may replace "phases",
+"repeat" and add to "states".
+
+compile_phases() expands a timeline into the flat phase list that
+sequence_engine runs on absolute monotonic deadlines.
+"""
+
+import argparse
+import json
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from patlite_control import BuzzerState, FlashSpeed, LightState
+from sequence_engine import Phase
+from signal_tower import NAMED_STATES, TowerState
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(ms|h|m|s)')
+DURATION_UNITS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+LIGHT_FIELDS = ('red', 'amber', 'green', 'blue')
+INLINE_STATE_NAME = 'custom'  # Phase name shown for a state object given inline in a phase
+MIN_SMART_GROUP = 7   # PNS smart-mode groups of the LED colours (red 7 ... blue 11)
+MAX_SMART_GROUP = 11
+
+
+def parse_duration(value: Union[int, float, str]) -> float:
+    """Convert 90, "90s", "2.5m" or "1m30s" into seconds."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    elif isinstance(value, str):
+        text = value.strip().lower()
+        try:
+            seconds = float(text)
+        except ValueError:
+            parts = DURATION_PATTERN.findall(text)
+            if not parts or DURATION_PATTERN.sub('', text).strip():
+                raise ValueError(f"Invalid duration '{value}'") from None
+            seconds = sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+    else:
+        raise ValueError(f"Invalid duration {value!r}")
+
+    if seconds <= 0:
+        raise ValueError(f"Duration must be positive, got {value!r}")
+    return seconds
+
+
+def _parse_enum(enum_class, value: str, field: str):
+    try:
+        return enum_class[str(value).upper()]
+    except KeyError:
+        choices = ', '.join(str(member) for member in enum_class)
+        raise ValueError(f"Invalid {field} '{value}'. Choose from: {choices}") from None
+
+
+def parse_state(spec: Union[str, Dict[str, Any]], states: Dict[str, TowerState]) -> TowerState:
+    """Build a TowerState from a state name or a state object."""
+    if isinstance(spec, str):
+        try:
+            return states[spec.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown state '{spec}'") from None
+    if not isinstance(spec, dict):
+        raise ValueError(f"Invalid state definition {spec!r}")
+
+    unknown = set(spec) - set(LIGHT_FIELDS) - {'buzzer', 'flash_speed', 'group'}
+    if unknown:
+        raise ValueError(f"Unknown state field(s): {', '.join(sorted(unknown))}")
+
+    fields: Dict[str, Any] = {
+        light: _parse_enum(LightState, spec[light], light) for light in LIGHT_FIELDS if light in spec
+    }
+    if 'buzzer' in spec:
+        fields['buzzer'] = _parse_enum(BuzzerState, spec['buzzer'], 'buzzer')
+    if 'flash_speed' in spec:
+        fields['flash_speed'] = _parse_enum(FlashSpeed, spec['flash_speed'], 'flash_speed')
+    if 'group' in spec:
+        try:
+            group = int(spec['group'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid group {spec['group']!r}") from None
+        if not MIN_SMART_GROUP <= group <= MAX_SMART_GROUP:
+            raise ValueError(f"Group must be between {MIN_SMART_GROUP} and {MAX_SMART_GROUP}, got {group}")
+        fields['group'] = group
+    return TowerState(**fields)
+
+
+class Timeline:
+    """A parsed timeline file."""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict) or 'phases' not in data:
+            raise ValueError("Timeline must be an object with a 'phases' list")
+        self.data = data
+        self.towers: Dict[str, Dict[str, Any]] = data.get('towers', {})
+        # Validate the default and every override up front
+        self.compile_phases()
+        for ip in self.towers:
+            self.compile_phases(ip)
+
+    @classmethod
+    def load(cls, path: str) -> 'Timeline':
+        """Read and validate a timeline file."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Timeline {path} is not valid JSON: {e}") from e
+        try:
+            return cls(data)
+        except ValueError as e:
+            raise ValueError(f"Timeline {path}: {e}") from e
+
+    def _states(self, override: Dict[str, Any]) -> Dict[str, TowerState]:
+        states = dict(NAMED_STATES)
+        for definitions in (self.data.get('states', {}), override.get('states', {})):
+            for name, spec in definitions.items():
+                states[name.lower()] = parse_state(spec, states)
+        return states
+
+    def compile_phases(self, ip: Optional[str] = None) -> List[Phase]:
+        """
+        Expand the timeline for one tower into a flat list of phases.
+
+        Args:
+            ip: Tower IP whose overrides apply (None for the default timeline)
+        """
+        override = self.towers.get(ip, {}) if ip else {}
+        states = self._states(override)
+        phase_specs = override.get('phases', self.data['phases'])
+        repeat = int(override.get('repeat', self.data.get('repeat', 1)))
+        if not phase_specs:
+            raise ValueError("Timeline has no phases")
+        if repeat < 1:
+            raise ValueError(f"repeat must be at least 1, got {repeat}")
+
+        cycle = []
+        for number, spec in enumerate(phase_specs, start=1):
+            try:
+                state = spec['state']
+                name = state.lower() if isinstance(state, str) else INLINE_STATE_NAME
+                cycle.append(Phase(name, parse_duration(spec['duration']), parse_state(state, states)))
+            except (KeyError, TypeError):
+                raise ValueError(f"Phase {number} needs a 'state' and a 'duration'") from None
+            except ValueError as e:
+                raise ValueError(f"Phase {number}: {e}") from None
+        return cycle * repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate a timeline file and print its schedule.")
+    parser.add_argument("timeline", help="Path to the timeline JSON file")
+    parser.add_argument("--ip", help="Show the schedule for this tower's overrides")
+    args = parser.parse_args()
+
+    try:
+        phases = Timeline.load(args.timeline).compile_phases(args.ip)
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"Error: {e}\n")
+
+    offset = 0.0
+    for number, phase in enumerate(phases, start=1):
+        print(f"{number:3d}  +{offset:9.3f}s  {phase.name:<10} {phase.duration:.3f}s")
+        offset += phase.duration
+    print(f"End  +{offset:9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Timing Report - Phase-switch accuracy summary for the sequence runners.
+
+Uses the SwitchRecords kept by sequence_engine (planned time, command-issue
+time and device-ACK time of every switch) to show how closely a cycle
+followed its plan: maximum drift, command latency percentiles and the
+end-of-cycle overrun. Reports can be exported as JSON or CSV.
+"""
+
+import csv
+import json
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+from sequence_engine import SwitchRecord
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for an empty sequence)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(records: List[SwitchRecord], total_seconds: float, finished_at: Optional[float]) -> Dict[str, Any]:
+    """
+    Summarize a run.
+
+    Args:
+        records: Switch records from SequenceEngine or FleetSequenceEngine
+        total_seconds: Planned cycle length
+        finished_at: Seconds from the start at which the cycle ended (None if it never did)
+
+    Returns:
+        Dict of summary statistics, all times in seconds
+    """
+    drifts = [r.issued - r.planned for r in records]
+    latencies = [r.acked - r.issued for r in records if r.acked is not None]
+    ack_drifts = [r.acked - r.planned for r in records if r.acked is not None]
+    return {
+        "switches": len(records),
+        "failed": sum(1 for r in records if r.error is not None),
+        "max_drift": max(drifts, key=abs) if drifts else None,
+        "max_ack_drift": max(ack_drifts) if ack_drifts else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_max": max(latencies) if latencies else None,
+        "planned_duration": total_seconds,
+        "actual_duration": finished_at,
+        "overrun": finished_at - total_seconds if finished_at is not None else None,
+    }
+
+
+def _ms(value: Optional[float], signed: bool = False) -> str:
+    if value is None:
+        return "n/a"
+    return f"{value * 1000:+.1f} ms" if signed else f"{value * 1000:.1f} ms"
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Render a summary as the lines printed at the end of a run."""
+    lines = [
+        "Timing report:",
+        f"  Switches: {summary['switches']} ({summary['failed']} failed)",
+        f"  Max drift (issue vs plan): {_ms(summary['max_drift'], signed=True)}",
+        f"  Max ACK vs plan: {_ms(summary['max_ack_drift'], signed=True)}",
+        f"  Command latency p50/p95/max: {_ms(summary['latency_p50'])} / "
+        f"{_ms(summary['latency_p95'])} / {_ms(summary['latency_max'])}",
+    ]
+    if summary["overrun"] is not None:
+        lines.append(f"  Cycle: planned {summary['planned_duration']:.3f}s, "
+                     f"overrun {_ms(summary['overrun'], signed=True)}")
+    else:
+        lines.append("  Cycle: did not complete")
+    return "\n".join(lines)
+
+
+def export(path: str, records: List[SwitchRecord], summary: Dict[str, Any]) -> None:
+    """
+    Write the per-switch records and summary to a file.
+
+    A .csv path gets one row per switch; anything else gets JSON with
+    both the summary and the records.
+    """
+    rows = [
+        {
+            "ip": r.ip,
+            "phase": r.index + 1,
+            "state": r.name,
+            "planned": round(r.planned, 6),
+            "issued": round(r.issued, 6),
+            "acked": round(r.acked, 6) if r.acked is not None else None,
+            "drift": round(r.issued - r.planned, 6),
+            "latency": round(r.acked - r.issued, 6) if r.acked is not None else None,
+            "error": str(r.error) if r.error is not None else None,
+        }
+        for r in sorted(records, key=lambda r: (r.planned, r.ip))
+    ]
+    with open(path, "w", newline="") as f:
+        if path.lower().endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["ip"])
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump({"summary": summary, "switches": rows}, f, indent=2)
+
+
+def report(engine, path: Optional[str] = None) -> Optional[OSError]:
+    """
+    Print the summary of a finished engine run, then export it if a path is given.
+
+    Returns:
+        The error that stopped the export (already logged), or None
+    """
+    summary = summarize(engine.records, engine.total_seconds, engine.finished_at)
+    print(format_summary(summary))
+    if path:
+        try:
+            export(path, engine.records, summary)
+        except OSError as e:
+            logger.error(f"Could not write timing report {path}: {e}")
+            return e
+    return None
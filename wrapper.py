@@ -4,53 +4,38 @@ LED Cycle Controller - A script to control LA-POE LEDs with a gradual transition
 from Green to Yellow to Amber to Red over 10 minutes.
 """
 
-import time
-import subprocess
-
-# LED Pattern Mapping (based on your system, these values may need to be updated)
-LED_PATTERNS = {
-    'green': 1,
-    'yellow': 2,
-    'amber': 3,
-    'red': 4,
-}
+from sequence_engine import DEFAULT_TOWER_IP, Phase, SequenceEngine, SequenceHooks, equal_phases
+from signal_tower import open_tower
 
 # Total cycle time in seconds (10 minutes)
 TOTAL_CYCLE_TIME = 10 * 60  # 10 minutes
 
-# Interval to change LED colors (2.5 minutes per change)
-INTERVAL = TOTAL_CYCLE_TIME / 4
-
-def set_led_color(color: str):
-    """Set the LED color using the controller script."""
-    led_pattern = LED_PATTERNS.get(color)
-    if led_pattern is None:
-        print(f"Error: Invalid LED color '{color}'")
-        return
-    
-    # Call the controller script to send the LED control command
+class ConsoleHooks(SequenceHooks):
+    """Report each colour change on stdout."""
+
+    def on_phase(self, index: int, phase: Phase) -> None:
+        print(f"Setting LED color to {phase.name}...")
+        print(f"Waiting for {phase.duration / 60} minutes before changing to next color...\n")
+
+    def on_error(self, index: int, phase: Phase, error: Exception) -> None:
+        print(f"Error setting LED color to {phase.name}: {error}")
+
+def cycle_leds(ip: str = DEFAULT_TOWER_IP) -> bool:
+    """Cycle the LEDs through Green, Yellow, Amber, and Red over 10 minutes; False if the tower was unusable."""
     try:
-        print(f"Setting LED color to {color}...")
-        subprocess.run([
-            "python3", "controller.py", "S", str(led_pattern), str(led_pattern), str(led_pattern), str(led_pattern), str(led_pattern), "1"
-        ], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error setting LED color to {color}: {e}")
-
-def cycle_leds():
-    """Cycle the LEDs through Green, Yellow, Amber, and Red over 10 minutes."""
-    colors = ['green', 'yellow', 'amber', 'red']
-    
-    for color in colors:
-        set_led_color(color)
-        print(f"Waiting for {INTERVAL / 60} minutes before changing to next color...\n")
-        time.sleep(INTERVAL)
+        tower = open_tower(ip)
+    except (ConnectionError, OSError, ValueError) as e:
+        print(f"Error: could not reach tower {ip}: {e}")
+        return False
+    with tower:
+        SequenceEngine(tower, equal_phases(TOTAL_CYCLE_TIME), ConsoleHooks(), stop_on_error=False).run()
+    return True
 
 def main():
     """Main function to start the LED cycle."""
     print("Starting LED cycle (Green -> Yellow -> Amber -> Red) over 10 minutes...\n")
-    cycle_leds()
-    print("\nLED cycle complete!")
+    if cycle_leds():
+        print("\nLED cycle complete!")
 
 if __name__ == '__main__':
     main()